@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # app config
@@ -28,6 +28,45 @@ class Settings(BaseSettings):
     QSTASH_CURRENT_SIGNING_KEY: str = ""
     QSTASH_NEXT_SIGNING_KEY: str = ""
 
+    # embeddings
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_CACHE_BACKEND: str = "postgres"  # postgres | local | memory | none
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000  # in-process lru tier (~6kb per vector)
+
+    # note rag chunk retrieval (per-project vector search)
+    CHUNK_EXACT_SCAN_MAX: int = 20000  # projects up to this many chunks: exact scan via idx_chunks_project_id
+    CHUNK_HNSW_EF_SEARCH: int = 64  # floor for hnsw.ef_search; raised per query from k and project selectivity
+    CHUNK_HNSW_MAX_SCAN_TUPLES: int = 50000  # iterative scan budget before falling back to an exact scan
+    CHUNK_PARTIAL_INDEX_MIN: int = 200000  # projects this large get their own partial hnsw index (0 = never)
+
+    # llm result cache (per-chunk extraction etc.)
+    LLM_CACHE_BACKEND: str = "auto"  # auto (redis if upstash configured, else local) | redis | local | none
+    LLM_CACHE_TTL_SECONDS: int = 30 * 86400
+
+    # concept pre-filter (exact ids, case-insensitive; json arrays in env)
+    NODE_FILTER_DENYLIST: List[str] = []
+    NODE_FILTER_ALLOWLIST: List[str] = []
+
+    # embedding knn fast path before the llm validator (scores: share of invalid neighbours)
+    CONCEPT_KNN_ENABLED: bool = True
+    CONCEPT_KNN_K: int = 7
+    CONCEPT_KNN_INVALID_SCORE: float = 0.85  # >= -> invalid without llm
+    CONCEPT_KNN_VALID_SCORE: float = 0.15  # <= -> valid without llm
+    CONCEPT_KNN_MIN_SIMILARITY: float = 0.45  # nearest exemplar must be at least this close to decide
+
+    # adaptive llm concurrency (per provider + api key)
+    LLM_CONCURRENCY_MAX: int = 32
+    LLM_SLOW_CALL_SECONDS: float = 60.0  # successes slower than this don't raise the limit
+
+    # ingestion: min time between extraction progress writes to the job store
+    INGESTION_PROGRESS_INTERVAL_SECONDS: float = 2.0
+
+    # obsidian export worker: batches run back to back until the invocation's time budget runs low
+    EXPORT_BATCH_SIZE: int = 10
+    EXPORT_DEADLINE_MARGIN_SECONDS: float = 60.0  # kept free before the lambda timeout to checkpoint + enqueue
+    EXPORT_TIME_BUDGET_SECONDS: float = 0.0  # budget without a lambda context (0 = run to completion)
+    EXPORT_PROGRESS_INTERVAL_SECONDS: float = 5.0  # min time between export progress writes
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=True,
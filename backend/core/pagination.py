@@ -0,0 +1,41 @@
+"""
+pagination: opaque keyset cursors for list endpoints.
+a cursor is the sort key of the last row served, returned in the X-Next-Cursor header.
+"""
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*key: Any) -> str:
+    raw = json.dumps(list(key), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: Optional[str], size: int, types: Optional[Sequence[Callable[[Any], Any]]] = None
+) -> Optional[List[Any]]:
+    """
+    sort key from a cursor (None for the first page); 400 on anything malformed.
+    types: optional converter per key part (e.g. datetime.fromisoformat, uuid.UUID); a part
+    that fails to convert is malformed too.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if types:
+        try:
+            key = [convert(part) for convert, part in zip(types, key)]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise HTTPException(status_code=400, detail="invalid cursor")
+    return key
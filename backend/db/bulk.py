@@ -0,0 +1,120 @@
+"""
+bulk: COPY-based bulk writers that bypass the orm for large inserts.
+rows are encoded straight into postgres binary copy format (pgvector's binary
+vector representation, jsonb v1) and streamed in bounded batches.
+"""
+import io
+import json
+import logging
+import struct
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)  # signature, flags, header extension
+PGCOPY_TRAILER = struct.pack("!h", -1)
+NULL_FIELD = struct.pack("!i", -1)
+
+CHUNK_COLUMNS = ("id", "file_id", "content", "embedding", "chunk_metadata", "project_id")
+
+
+def _field(payload: bytes) -> bytes:
+    return struct.pack("!i", len(payload)) + payload
+
+
+def encode_uuid(value: Any) -> bytes:
+    if value is None:
+        return NULL_FIELD
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    return _field(value.bytes)
+
+
+def encode_text(value: Optional[str]) -> bytes:
+    if value is None:
+        return NULL_FIELD
+    # postgres text can't hold NUL bytes (pdf extraction occasionally produces them)
+    return _field(value.replace("\x00", "").encode("utf-8"))
+
+
+def encode_vector(values: Optional[Sequence[float]]) -> bytes:
+    """pgvector binary format: int16 dims, int16 unused, float4[dims] (network byte order)"""
+    if values is None:
+        return NULL_FIELD
+    floats = np.asarray(values, dtype=">f4")
+    return _field(struct.pack("!hh", len(floats), 0) + floats.tobytes())
+
+
+def encode_jsonb(value: Any) -> bytes:
+    """jsonb binary format: version byte 1 followed by the json text"""
+    if value is None:
+        return NULL_FIELD
+    return _field(b"\x01" + json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def encode_chunk_row(row: Dict[str, Any]) -> bytes:
+    return b"".join((
+        struct.pack("!h", len(CHUNK_COLUMNS)),
+        encode_uuid(row.get("id") or uuid.uuid4()),
+        encode_uuid(row["file_id"]),
+        encode_text(row["content"]),
+        encode_vector(row.get("embedding")),
+        encode_jsonb(row.get("chunk_metadata") or {}),
+        encode_uuid(row.get("project_id")),
+    ))
+
+
+def _batches(rows: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_chunks(session: Session, rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """
+    streams chunk rows ({file_id, project_id, content, embedding, chunk_metadata[, id]}) into the chunks table
+    with binary COPY, one bounded buffer per batch. runs inside the session's transaction (caller commits).
+    drivers without copy support fall back to a core executemany insert.
+    """
+    connection = session.connection()
+    if connection.dialect.driver != "psycopg2":
+        return _insert_chunks(session, rows, batch_size)
+    raw = connection.connection.driver_connection
+
+    sql = f"COPY chunks ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+    total = 0
+    with raw.cursor() as cursor:
+        for batch in _batches(rows, batch_size):
+            buffer = io.BytesIO()
+            buffer.write(PGCOPY_HEADER)
+            for row in batch:
+                buffer.write(encode_chunk_row(row))
+            buffer.write(PGCOPY_TRAILER)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += len(batch)
+    logger.info(f"copied {total} chunks")
+    return total
+
+
+def _insert_chunks(session: Session, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    from sqlalchemy import insert
+    from db import models
+
+    total = 0
+    for batch in _batches(rows, batch_size):
+        session.execute(insert(models.Chunk), [
+            {**row, "id": row.get("id") or uuid.uuid4(), "chunk_metadata": row.get("chunk_metadata") or {}}
+            for row in batch
+        ])
+        total += len(batch)
+    return total
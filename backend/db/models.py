@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, func
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, Integer, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from pgvector.sqlalchemy import Vector
 from db.session import Base
@@ -15,6 +15,11 @@ class Project(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     project_metadata = Column(JSONB, server_default="{}")
 
+    # keyset paging for /projects/list (newest first per user)
+    __table_args__ = (
+        Index("idx_projects_user_created", "user_id", created_at.desc(), id.desc()),
+    )
+
 class File(Base):
     __tablename__ = "files"
     
@@ -30,13 +35,18 @@ class Chunk(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), index=True)
+    # denormalised from files.project_id so retrieval filters chunks without the join
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     content = Column(Text, nullable=False)
     embedding = Column(Vector(1536))  # openai text-embedding-3-small (1536 dims)
     chunk_metadata = Column(JSONB, server_default="{}")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # global hnsw for large projects (iterative filtered scans); btree for exact per-project scans.
+    # very large projects additionally get a partial hnsw index (services/retrieval_service.py)
     __table_args__ = (
         Index("chunks_embedding_idx", "embedding", postgresql_using="hnsw", postgresql_with={"m": 16, "ef_construction": 64}),
+        Index("idx_chunks_project_id", "project_id"),
     )
 
 class GraphNode(Base):
@@ -53,7 +63,47 @@ class GraphNode(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # index for fast concept lookup within a project
+    # one row per concept within a project; also the upsert conflict target for save_graph
+    __table_args__ = (
+        Index("uq_graph_nodes_project_concept", "project_id", "concept_id", unique=True),
+    )
+
+class GraphEdge(Base):
+    __tablename__ = "graph_edges"
+
+    # normalized copy of graph_nodes.outbound_links / inbound_links, kept in sync by GraphPersistenceService
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    source = Column(String, primary_key=True)
+    target = Column(String, primary_key=True)
+    kind = Column(String, primary_key=True, default="link")
+
+    # the primary key serves (project_id, source) lookups; this one serves inbound walks
     __table_args__ = (
-        Index("idx_project_concept", "project_id", "concept_id"),
+        Index("idx_graph_edges_project_target", "project_id", "target", "source"),
     )
+
+class ConceptChunk(Base):
+    __tablename__ = "concept_chunks"
+
+    # provenance: stored chunks inside the extraction window a concept came from that mention it,
+    # written during ingestion so note generation can skip the embedding call and vector search
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    concept_id = Column(String, primary_key=True)
+    chunk_id = Column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Integer, nullable=False, default=0)  # mentions of the concept or its aliases
+
+    # the primary key serves (project_id, concept_id) lookups; this one serves chunk deletes
+    __table_args__ = (
+        Index("idx_concept_chunks_chunk", "chunk_id"),
+    )
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    # content-addressed: (provider, model, dimensions, sha256(text)) -> vector
+    provider = Column(String, primary_key=True)
+    model = Column(String, primary_key=True)
+    dimensions = Column(Integer, primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import get_settings
 
@@ -24,3 +25,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --- async (api read paths) ---
+# asyncpg engine, created on first use so workers and scripts never need the driver
+
+_async_engine = None
+_async_session_factory = None
+
+def async_database_url(url: str):
+    """DATABASE_URL rewritten for asyncpg (driver swap; libpq-only ssl params translated or dropped)"""
+    u = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(u.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+    return u.set(query=query)
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = async_database_url(settings.DATABASE_URL)
+        connect_args = {}
+        if url.host and "pooler" in url.host:
+            # pgbouncer (neon pooler) in transaction mode can't keep prepared statements
+            connect_args = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        _async_engine = create_async_engine(url, connect_args=connect_args, **engine_kwargs)
+
+        @event.listens_for(_async_engine.sync_engine, "connect")
+        def register_pgvector(dbapi_connection, connection_record):
+            from pgvector.asyncpg import register_vector
+            dbapi_connection.run_async(register_vector)
+
+    return _async_engine
+
+def AsyncSessionLocal():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_session_factory()
+
+async def get_async_db():
+    """fastapi dependency for async database sessions (asyncpg; never blocks the event loop)"""
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -8,8 +8,9 @@ import asyncio
 from db.session import get_db, SessionLocal
 from db import models
 
-# api handler
-api_handler = Mangum(app)
+# api handler (lifespan off: mangum would run shutdown after every invocation and
+# close the pooled llm clients that warm invocations are meant to reuse)
+api_handler = Mangum(app, lifespan="off")
 
 # worker handler
 def worker_handler(event, context):
@@ -64,7 +65,9 @@ def worker_handler(event, context):
                 project_id=project_id,
                 user_id=user_id,
                 gemini_key=gemini_key,
-                openai_key=openai_key
+                openai_key=openai_key,
+                # batches keep running until the invocation nears its timeout
+                remaining_time_ms=getattr(context, "get_remaining_time_in_millis", None),
             )
             
             result = loop.run_until_complete(processor.process())
@@ -1,8 +1,10 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import project, ingest, export, internal, stats
 from core.config import get_settings
 from core.logger import setup_logger
+from services.llm.clients import aclose_all
 import logging
 
 # initialize custom ansi lowercase logging
@@ -12,10 +14,17 @@ logger = logging.getLogger(__name__)
 # initialize settings
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # pooled llm clients live for the whole process; close them on shutdown
+    await aclose_all()
+
 app = FastAPI(
     title="BrainLattice API",
     description="pdf to knowledge graph api",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # cors middleware
@@ -25,6 +34,8 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    # paging cursor + snapshot validator must be readable by the browser client
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # register routers
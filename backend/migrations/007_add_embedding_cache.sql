@@ -0,0 +1,13 @@
+-- migration: add embedding_cache table
+-- description: content-addressed embedding cache shared by every EmbeddingService caller.
+-- keyed by (provider, model, dimensions, sha256(text)); no vector index, lookups are by key only.
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    text_hash CHAR(64) NOT NULL,
+    embedding VECTOR NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (provider, model, dimensions, text_hash)
+);
@@ -0,0 +1,20 @@
+-- migration: unique concept per project on graph_nodes
+-- description: lets save_graph upsert nodes with INSERT ... ON CONFLICT (project_id, concept_id)
+-- instead of wiping the project, so generated notes survive re-ingestion.
+
+-- drop duplicate rows first, keeping the one that has notes (then the most recently updated)
+DELETE FROM graph_nodes g
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY project_id, concept_id
+        ORDER BY (content IS NULL), updated_at DESC NULLS LAST
+    ) AS rn
+    FROM graph_nodes
+) d
+WHERE g.id = d.id AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_graph_nodes_project_concept ON graph_nodes(project_id, concept_id);
+
+-- the unique index serves the same lookups as the old non-unique ones
+DROP INDEX IF EXISTS idx_graph_nodes_project_concept;
+DROP INDEX IF EXISTS idx_project_concept;
@@ -0,0 +1,27 @@
+-- migration: add graph_edges table
+-- description: normalized directed edges (source -> target) per project, so neighbourhood and path
+-- queries hit an index instead of loading whole graph_nodes rows and walking link arrays.
+
+CREATE TABLE IF NOT EXISTS graph_edges (
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'link',
+    PRIMARY KEY (project_id, source, target, kind)
+);
+
+-- the primary key covers outbound walks; this covers inbound walks
+CREATE INDEX IF NOT EXISTS idx_graph_edges_project_target ON graph_edges(project_id, target, source);
+
+-- backfill from the link arrays (outbound as-is, inbound reversed), skipping dangling links
+INSERT INTO graph_edges (project_id, source, target, kind)
+SELECT e.project_id, e.source, e.target, 'link'
+FROM (
+    SELECT project_id, concept_id AS source, unnest(outbound_links) AS target FROM graph_nodes
+    UNION
+    SELECT project_id, unnest(inbound_links) AS source, concept_id AS target FROM graph_nodes
+) e
+WHERE e.source <> e.target
+  AND EXISTS (SELECT 1 FROM graph_nodes n WHERE n.project_id = e.project_id AND n.concept_id = e.source)
+  AND EXISTS (SELECT 1 FROM graph_nodes n WHERE n.project_id = e.project_id AND n.concept_id = e.target)
+ON CONFLICT DO NOTHING;
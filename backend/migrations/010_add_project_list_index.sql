@@ -0,0 +1,5 @@
+-- migration: keyset index for project listing
+-- description: /projects/list pages by (created_at, id) newest first within a user.
+-- graph node pages use the (project_id, concept_id) unique index from 008.
+
+CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects(user_id, created_at DESC, id DESC);
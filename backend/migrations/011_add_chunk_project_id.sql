@@ -0,0 +1,17 @@
+-- migration: add chunks.project_id
+-- description: denormalise the owning project onto chunks so note retrieval filters by an indexed
+-- column instead of joining files, and so per-project partial hnsw indexes can be declared.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS project_id UUID REFERENCES projects(id) ON DELETE CASCADE;
+
+UPDATE chunks c
+SET project_id = f.project_id
+FROM files f
+WHERE c.file_id = f.id
+  AND c.project_id IS NULL;
+
+-- exact (brute-force) scans for small and medium projects
+CREATE INDEX IF NOT EXISTS idx_chunks_project_id ON chunks(project_id);
+
+-- 001 (chunks_embedding_idx) and 006 (idx_chunk_embedding) built the same global hnsw index; keep one
+DROP INDEX IF EXISTS idx_chunk_embedding;
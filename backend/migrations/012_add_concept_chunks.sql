@@ -0,0 +1,15 @@
+-- migration: add concept_chunks table
+-- description: concept -> stored chunk provenance recorded during ingestion (chunks inside the
+-- extraction window a concept was extracted from that mention it). note generation reads these
+-- before falling back to vector search. projects ingested earlier simply have no rows.
+
+CREATE TABLE IF NOT EXISTS concept_chunks (
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    concept_id TEXT NOT NULL,
+    chunk_id UUID NOT NULL REFERENCES chunks(id) ON DELETE CASCADE,
+    score INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, concept_id, chunk_id)
+);
+
+-- the primary key covers per-concept lookups; this covers cascades from chunk deletes
+CREATE INDEX IF NOT EXISTS idx_concept_chunks_chunk ON concept_chunks(chunk_id);
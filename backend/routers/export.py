@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
-from db.session import get_db
+from db.session import get_db, get_async_db
 from db import models
 from core.dependencies import get_user_context, UserContext
 
@@ -56,15 +58,17 @@ async def trigger_obsidian_export(
 @router.get("/project/{project_id}/export/status")
 async def get_export_status(
     project_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
     """get current status of obsidian export"""
     try:
-        project = db.query(models.Project).filter(
-            models.Project.id == project_id,
-            models.Project.user_id == context.user_id
-        ).first()
+        project = (await db.execute(
+            select(models.Project).where(
+                models.Project.id == project_id,
+                models.Project.user_id == context.user_id
+            )
+        )).scalars().first()
         if not project:
             raise HTTPException(status_code=404, detail="project not found")
 
@@ -76,15 +80,17 @@ async def get_export_status(
 @router.get("/project/{project_id}/export/download")
 async def download_obsidian_export(
     project_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
     """get signed download URL for the obsidian vault zip"""
     try:
-        project = db.query(models.Project).filter(
-            models.Project.id == project_id,
-            models.Project.user_id == context.user_id
-        ).first()
+        project = (await db.execute(
+            select(models.Project).where(
+                models.Project.id == project_id,
+                models.Project.user_id == context.user_id
+            )
+        )).scalars().first()
         if not project:
             raise HTTPException(status_code=404, detail="project not found")
 
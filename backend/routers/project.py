@@ -4,23 +4,56 @@ from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
 from db.session import get_db
 from db import models
-from schemas.project import ProjectSaveRequest, ProjectSaveResponse, ProjectGetResponse, UpdateTitleRequest, ProjectTransferRequest, ProjectTransferResponse
-from fastapi import Header
+from schemas.project import ProjectSaveRequest, ProjectSaveResponse, ProjectGetResponse, UpdateTitleRequest, ProjectTransferRequest, ProjectTransferResponse, NotesBulkRequest
+from fastapi import Header, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime, timezone, timedelta
+import asyncio
+import gzip
 import uuid
+import orjson
+from core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from db.session import SessionLocal, get_async_db
 from services.job_service import get_job_service
+from services.retrieval_service import ChunkRetrievalService
+from services.graph.snapshot_service import GraphSnapshotService, etag_matches, node_payload, projection_columns
 
 router = APIRouter()
 
+
+async def _owned_project(db: AsyncSession, project_id: str, user_id: str):
+    return (await db.execute(
+        select(models.Project).where(
+            models.Project.id == project_id,
+            models.Project.user_id == user_id
+        )
+    )).scalars().first()
+
+
+def _build_graph_snapshot(project_id: str, fields: str):
+    # snapshot builds write project_metadata through the sync session; run off the event loop
+    session = SessionLocal()
+    try:
+        project = session.get(models.Project, project_id)
+        return GraphSnapshotService(session).get_or_build(project, fields)
+    finally:
+        session.close()
+
 @router.get("/whoami")
 async def whoami(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
     """get current user info and usage stats"""
     try:
-        project_count = db.query(models.Project).filter(
-            models.Project.user_id == context.user_id
-        ).count()
+        project_count = (await db.execute(
+            select(func.count()).select_from(models.Project).where(
+                models.Project.user_id == context.user_id
+            )
+        )).scalar_one()
         
         return {
             "user_id": context.user_id,
@@ -55,18 +88,35 @@ async def save_project(
 
 @router.get("/projects/list")
 async def list_all_projects(
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="page size; omit for the full list"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
-    """list all projects from postgres filtered by user_id, with live redis progress"""
+    """list projects from postgres filtered by user_id (newest first, keyset paged), with live redis progress"""
     try:
-        projects = db.query(models.Project).filter(
+        query = select(models.Project).where(
             models.Project.user_id == context.user_id
-        ).order_by(models.Project.created_at.desc()).all()
+        )
+        after = decode_cursor(cursor, 2, types=(datetime.fromisoformat, uuid.UUID))
+        if after:
+            query = query.where(
+                tuple_(models.Project.created_at, models.Project.id) < tuple_(literal(after[0]), literal(after[1]))
+            )
+        query = query.order_by(models.Project.created_at.desc(), models.Project.id.desc())
+        if cursor or limit:
+            page_size = limit or 50
+            projects = (await db.execute(query.limit(page_size + 1))).scalars().all()
+            if len(projects) > page_size:
+                projects = projects[:page_size]
+                last = projects[-1]
+                response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at.isoformat(), str(last.id))
+        else:
+            projects = (await db.execute(query)).scalars().all()
         formatted = []
         jobs = get_job_service()
         
-        from datetime import datetime, timezone, timedelta
         now = datetime.now(timezone.utc)
         
         for p in projects:
@@ -82,7 +132,8 @@ async def list_all_projects(
                 job_id = metadata.get("job_id")
                 
                 if job_id:
-                    job = jobs.get_job(job_id)
+                    # redis client is sync
+                    job = await asyncio.to_thread(jobs.get_job, job_id)
                     if job:
                         base_p["progress"] = job.get("progress", 0)
                         
@@ -104,21 +155,20 @@ async def list_all_projects(
             formatted.append(base_p)
             
         return formatted
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"list error: {str(e)}")
 
 @router.get("/project/{project_id}", response_model=ProjectGetResponse)
 async def get_project(
     project_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
     """get project data"""
     try:
-        project = db.query(models.Project).filter(
-            models.Project.id == project_id,
-            models.Project.user_id == context.user_id
-        ).first()
+        project = await _owned_project(db, project_id, context.user_id)
         if project:
             # format response
             return ProjectGetResponse(
@@ -177,6 +227,11 @@ async def delete_project(
                 raise HTTPException(status_code=400, detail="cannot delete a project that is currently processing.")
             db.delete(project)
             db.commit()
+            GraphSnapshotService(db).delete(project_id)
+            try:
+                ChunkRetrievalService(db).drop_project_index(project_id)
+            except Exception:
+                pass  # only very large projects have one; a leftover index holds no rows
             return {"success": True, "message": "deleted"}
         raise HTTPException(status_code=404, detail="not found")
     except HTTPException:
@@ -188,34 +243,206 @@ async def delete_project(
 @router.get("/project/{project_id}/graph")
 async def get_project_graph(
     project_id: str,
-    db: Session = Depends(get_db),
+    fields: str = Query("full", pattern="^(topology|aliases|full)$", description="topology: ids + links; aliases: + aliases/metadata; full: + note content"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="page size (keyset by concept_id); omit for the whole graph"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     context: UserContext = Depends(get_user_context)
 ):
-    """get project graph data"""
+    """
+    get project graph data. whole graph: precomputed gzip snapshot per field projection (etag + If-None-Match).
+    paged (limit/cursor): nodes ordered by concept_id, next page cursor in X-Next-Cursor.
+    """
     try:
-        project = db.query(models.Project).filter(
+        project = await _owned_project(db, project_id, context.user_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="project not found or unauthorized")
+
+        if limit or cursor:
+            page_size = limit or 1000
+            query = select(*projection_columns(fields)).where(models.GraphNode.project_id == project_id)
+            after = decode_cursor(cursor, 1)
+            if after:
+                query = query.where(models.GraphNode.concept_id > after[0])
+            rows = (await db.execute(query.order_by(models.GraphNode.concept_id).limit(page_size + 1))).all()
+            headers = {}
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].concept_id)
+            body = orjson.dumps({"nodes": [node_payload(row, fields) for row in rows]})
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        # memory / object storage hit; a miss builds (and records) the snapshot on a sync session
+        snapshot = await asyncio.to_thread(GraphSnapshotService(None).load, project, fields)
+        if snapshot is None:
+            snapshot = await asyncio.to_thread(_build_graph_snapshot, project_id, fields)
+        etag, payload = snapshot
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        if "gzip" in (accept_encoding or "").lower():
+            return Response(content=payload, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+        return Response(content=gzip.decompress(payload), media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"graph get error: {str(e)}")
+
+@router.get("/project/{project_id}/graph/stream")
+async def stream_project_graph(
+    project_id: str,
+    fields: str = Query("full", pattern="^(topology|aliases|full)$", description="topology: ids + links; aliases: + aliases/metadata; full: + note content"),
+    db: AsyncSession = Depends(get_async_db),
+    context: UserContext = Depends(get_user_context)
+):
+    """stream project graph nodes as ndjson (one node per line) from a server-side cursor"""
+    project = (await db.execute(
+        select(models.Project.id).where(
             models.Project.id == project_id,
             models.Project.user_id == context.user_id
-        ).first()
+        )
+    )).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="project not found or unauthorized")
+
+    def rows():
+        # own session: the request's session may be closed before the body finishes streaming
+        session = SessionLocal()
+        try:
+            query = session.query(*projection_columns(fields)).filter(
+                models.GraphNode.project_id == project_id
+            ).order_by(models.GraphNode.concept_id).execution_options(stream_results=True, yield_per=1000)
+            buffer = []
+            for row in query:
+                buffer.append(orjson.dumps(node_payload(row, fields)))
+                if len(buffer) >= 500:
+                    yield b"\n".join(buffer) + b"\n"
+                    buffer = []
+            if buffer:
+                yield b"\n".join(buffer) + b"\n"
+        finally:
+            session.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+@router.post("/project/{project_id}/notes")
+async def get_node_notes(
+    project_id: str,
+    request: NotesBulkRequest,
+    db: AsyncSession = Depends(get_async_db),
+    context: UserContext = Depends(get_user_context)
+):
+    """get stored notes for a list of concept ids in one query (no generation)"""
+    try:
+        project = await _owned_project(db, project_id, context.user_id)
         if not project:
             raise HTTPException(status_code=404, detail="project not found or unauthorized")
 
-        nodes = db.query(models.GraphNode).filter(models.GraphNode.project_id == project_id).all()
-        
-        formatted_nodes = []
-        for n in nodes:
-            formatted_nodes.append({
-                "id": str(n.concept_id),
-                "aliases": n.aliases or [],
-                "outbound_links": n.outbound_links or [],
-                "inbound_links": n.inbound_links or [],
-                "content": n.content,
-                "metadata": n.node_metadata or {}
-            })
-            
-        return {"nodes": formatted_nodes}
+        requested = list(dict.fromkeys(request.concept_ids))
+        rows = dict((await db.execute(
+            select(models.GraphNode.concept_id, models.GraphNode.content).where(
+                models.GraphNode.project_id == project_id,
+                models.GraphNode.concept_id.in_(requested)
+            )
+        )).all()) if requested else {}
+
+        return {
+            "notes": [
+                {"concept_id": c, "content": rows[c]}
+                for c in requested if c in rows and rows[c]
+            ],
+            # known nodes whose note hasn't been generated yet
+            "pending": [c for c in requested if c in rows and not rows[c]],
+            "missing": [c for c in requested if c not in rows],
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"graph get error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"notes get error: {str(e)}")
+
+@router.get("/project/{project_id}/node/{concept_id}/neighborhood")
+async def get_node_neighborhood(
+    project_id: str,
+    concept_id: str,
+    hops: int = Query(1, ge=1, le=3, description="max link distance from the node"),
+    direction: str = Query("both", pattern="^(out|in|both)$", description="follow links, backlinks or both"),
+    limit: int = Query(200, ge=1, le=2000, description="max nodes returned (nearest first)"),
+    db: AsyncSession = Depends(get_async_db),
+    context: UserContext = Depends(get_user_context)
+):
+    """get the k-hop subgraph around a node (nodes with hop distance + edges among them)"""
+    try:
+        project = await _owned_project(db, project_id, context.user_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="project not found or unauthorized")
+
+        exists = (await db.execute(
+            select(models.GraphNode.id).where(
+                models.GraphNode.project_id == project_id,
+                models.GraphNode.concept_id == concept_id
+            )
+        )).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="node not found")
+
+        from services.graph.query_service import GraphQueryService
+        return await db.run_sync(
+            lambda session: GraphQueryService(session).neighborhood(
+                project_id, concept_id, hops=hops, direction=direction, limit=limit
+            )
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"neighborhood error: {str(e)}")
+
+@router.get("/project/{project_id}/path")
+async def get_shortest_path(
+    project_id: str,
+    source: str = Query(..., description="start concept id"),
+    target: str = Query(..., description="end concept id"),
+    max_depth: int = Query(6, ge=1, le=8, description="max path length in links"),
+    directed: bool = Query(False, description="only follow links in their direction"),
+    db: AsyncSession = Depends(get_async_db),
+    context: UserContext = Depends(get_user_context)
+):
+    """get the shortest link path between two nodes"""
+    try:
+        project = await _owned_project(db, project_id, context.user_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="project not found or unauthorized")
+
+        found = set((await db.execute(
+            select(models.GraphNode.concept_id).where(
+                models.GraphNode.project_id == project_id,
+                models.GraphNode.concept_id.in_([source, target])
+            )
+        )).scalars())
+        missing = [c for c in (source, target) if c not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"node not found: {missing[0]}")
+
+        from services.graph.query_service import GraphQueryService
+        path = await db.run_sync(
+            lambda session: GraphQueryService(session).shortest_path(
+                project_id, source, target, max_depth=max_depth, directed=directed
+            )
+        )
+        return {
+            "source": source,
+            "target": target,
+            "found": path is not None,
+            "path": path or [],
+            "length": len(path) - 1 if path else None,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"path error: {str(e)}")
 
 @router.get("/project/{project_id}/node/{concept_id}/note")
 async def get_node_note(
@@ -261,8 +488,9 @@ async def get_node_note(
             outbound_links=node.outbound_links,
         )
         
-        # persist generated note
+        # persist generated note (the cached graph payload now lacks it)
         node.content = note_content
+        GraphSnapshotService(db).invalidate(project, commit=False)
         db.commit()
         
         return {
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 
 class ProjectTransferRequest(BaseModel):
     source_id: str
@@ -25,3 +25,6 @@ class ProjectGetResponse(BaseModel):
 
 class UpdateTitleRequest(BaseModel):
     title: str
+
+class NotesBulkRequest(BaseModel):
+    concept_ids: List[str] = Field(..., max_length=500)
@@ -0,0 +1,91 @@
+"""
+Benchmark api throughput under concurrent clients: GET /project/{id}/graph and GET /projects/list.
+Each client loops over its share of requests on one keep-alive connection pool; reports
+requests/sec, p50/p99 latency and non-2xx/304 counts per endpoint.
+
+Run it against a running server (uv run uvicorn main:app --workers 1) once on the previous
+build and once on this one, with --label to tell the runs apart, e.g. before/after the async
+database layer (db/session.py get_async_db).
+
+Usage:
+  python scripts/bench_api_concurrency.py --project-id <uuid> --user-id <id>
+  python scripts/bench_api_concurrency.py --project-id <uuid> --user-id <id> --concurrency 50 --requests 2000 --label async
+  python scripts/bench_api_concurrency.py --base-url http://localhost:8000/api --project-id <uuid> --user-id <id> --fields aliases
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_endpoint(client: httpx.AsyncClient, path: str, params: dict, total: int, concurrency: int):
+    """(seconds, latencies in ms, error count) for `total` GETs spread over `concurrency` clients"""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="concurrent rps benchmark for read endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--user-id", required=True, help="owner of the project (X-User-Id)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--fields", default="full", choices=["topology", "aliases", "full"])
+    parser.add_argument("--label", default="", help="tag printed with the results (e.g. before / after)")
+    args = parser.parse_args()
+
+    endpoints = [
+        (f"/project/{args.project_id}/graph", {"fields": args.fields}),
+        ("/projects/list", {}),
+    ]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"X-User-Id": args.user_id, "Accept-Encoding": "gzip"}
+
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=60) as client:
+        # warm up: first graph read may build the snapshot, first query opens pool connections
+        for path, params in endpoints:
+            await run_endpoint(client, path, params, args.concurrency, args.concurrency)
+
+        label = f" [{args.label}]" if args.label else ""
+        print(f"concurrency {args.concurrency}, {args.requests} requests per endpoint{label}")
+        print(f"{'endpoint':<42} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'errors':>7}")
+        for path, params in endpoints:
+            elapsed, latencies, errors = await run_endpoint(client, path, params, args.requests, args.concurrency)
+            name = path.replace(args.project_id, "{id}")
+            print(
+                f"{name:<42} {len(latencies) / elapsed:>8.1f} {percentile(latencies, 0.5):>8.1f} "
+                f"{percentile(latencies, 0.99):>8.1f} {statistics.fmean(latencies):>8.1f} {errors:>7}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
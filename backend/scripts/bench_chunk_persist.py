@@ -0,0 +1,144 @@
+"""
+Benchmark chunk persistence: orm add_all + commit (previous path) vs binary COPY (db/bulk.py).
+Inserts synthetic chunks with 1536-dim embeddings into a throwaway project, reports wall time
+and peak python memory (tracemalloc) per path, then deletes the project (cascade).
+
+Needs DATABASE_URL pointing at a postgres with pgvector and the schema migrated.
+--encode-only skips the database and measures the client-side cost of each path
+(orm objects + vector bind vs copy buffer encoding).
+
+Usage:
+  python scripts/bench_chunk_persist.py
+  python scripts/bench_chunk_persist.py --sizes 1000,10000 --batch-size 1000
+  python scripts/bench_chunk_persist.py --encode-only
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from db import models  # noqa: E402
+from db.bulk import PGCOPY_HEADER, PGCOPY_TRAILER, copy_chunks, encode_chunk_row  # noqa: E402
+from db.session import SessionLocal  # noqa: E402
+
+DIMS = 1536
+
+
+def make_rows(n: int, file_id, seed: int = 0):
+    rng = random.Random(seed)
+    text = "the derivative measures the instantaneous rate of change of a function. " * 12
+    return [
+        {
+            "file_id": file_id,
+            "content": text,
+            "embedding": [rng.uniform(-1, 1) for _ in range(DIMS)],
+            "chunk_metadata": {"header_path": "calculus > derivatives", "chunk": i},
+        }
+        for i in range(n)
+    ]
+
+
+def measure(fn):
+    """(seconds, peak bytes allocated while fn ran)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def orm_insert(rows):
+    session = SessionLocal()
+    try:
+        session.add_all([models.Chunk(**row) for row in rows])
+        session.commit()
+    finally:
+        session.close()
+
+
+def copy_insert(rows, batch_size):
+    session = SessionLocal()
+    try:
+        copy_chunks(session, iter(rows), batch_size=batch_size)
+        session.commit()
+    finally:
+        session.close()
+
+
+def orm_build(rows):
+    """orm objects plus the pgvector bind step flush runs for every row (vector -> text literal)"""
+    from sqlalchemy.dialects import postgresql
+    bind = models.Chunk.__table__.c.embedding.type.bind_processor(postgresql.dialect())
+    objects = [models.Chunk(**row) for row in rows]
+    return sum(len(bind(obj.embedding)) for obj in objects)
+
+
+def copy_encode(rows, batch_size):
+    size = 0
+    for i in range(0, len(rows), batch_size):
+        buffer = PGCOPY_HEADER + b"".join(encode_chunk_row(r) for r in rows[i:i + batch_size]) + PGCOPY_TRAILER
+        size += len(buffer)
+    return size
+
+
+def create_scratch_file():
+    session = SessionLocal()
+    try:
+        project = models.Project(title="bench_chunk_persist", status="complete")
+        session.add(project)
+        session.flush()
+        file = models.File(project_id=project.id, filename="bench.pdf")
+        session.add(file)
+        session.commit()
+        return project.id, file.id
+    finally:
+        session.close()
+
+
+def drop_project(project_id):
+    session = SessionLocal()
+    try:
+        session.query(models.Project).filter(models.Project.id == project_id).delete()
+        session.commit()
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--encode-only", action="store_true", help="no database: client-side cost only")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'path':<6} {'seconds':>9} {'rows/s':>9} {'peak MB':>9}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        if args.encode_only:
+            rows = make_rows(n, uuid.uuid4())
+            paths = [("orm", lambda: orm_build(rows)), ("copy", lambda: copy_encode(rows, args.batch_size))]
+            project_id = None
+        else:
+            project_id, file_id = create_scratch_file()
+            rows = make_rows(n, file_id)
+            paths = [("orm", lambda: orm_insert(rows)), ("copy", lambda: copy_insert(rows, args.batch_size))]
+
+        try:
+            for name, fn in paths:
+                seconds, peak = measure(fn)
+                print(f"{n:>8} {name:<6} {seconds:>9.2f} {n / seconds:>9.0f} {peak / 1e6:>9.1f}")
+        finally:
+            if project_id is not None:
+                drop_project(project_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark project-scoped chunk retrieval as the chunks table grows.
+Fills the table with synthetic tenants (1536-dim vectors drawn around shared topic centroids, so
+every project competes for the same neighbourhoods), then for target projects of a few sizes runs
+top-k queries through:
+  join    the previous query (chunks join files, filter files.project_id, order by cosine distance)
+  service ChunkRetrievalService.search (exact scan / iterative hnsw / partial index by size)
+and reports p50/p99 latency and recall@k against exact numpy ground truth at each table size.
+
+Needs DATABASE_URL pointing at a postgres with pgvector (>= 0.8 for iterative scans) and
+migrations through 011. 1M rows is ~6 GB of vectors plus the global hnsw index, which is
+maintained during the fill, so large sizes take a while. Everything created is deleted at the
+end unless --keep.
+
+Usage:
+  python scripts/bench_chunk_retrieval.py
+  python scripts/bench_chunk_retrieval.py --sizes 100000,1000000,3000000 --project-chunks 2000,50000
+  python scripts/bench_chunk_retrieval.py --sizes 500000 --project-chunks 250000 --partial-index
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from db import models  # noqa: E402
+from db.bulk import copy_chunks  # noqa: E402
+from db.session import SessionLocal  # noqa: E402
+from services.retrieval_service import DIMS, ChunkRetrievalService  # noqa: E402
+
+TOPICS = 64
+
+
+class Corpus:
+    """deterministic synthetic embeddings: topic centroid + noise, unit length"""
+
+    def __init__(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+        topics = self.rng.standard_normal((TOPICS, DIMS)).astype(np.float32)
+        self.topics = topics / np.linalg.norm(topics, axis=1, keepdims=True)
+
+    def vectors(self, n: int) -> np.ndarray:
+        picks = self.rng.integers(0, TOPICS, size=n)
+        noise = self.rng.standard_normal((n, DIMS)).astype(np.float32) * 0.035
+        v = self.topics[picks] + noise
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def create_project(session, title: str):
+    project = models.Project(title=title, status="complete")
+    session.add(project)
+    session.flush()
+    file = models.File(project_id=project.id, filename="bench.pdf")
+    session.add(file)
+    session.commit()
+    return project.id, file.id
+
+
+def insert_chunks(session, corpus: Corpus, project_id, file_id, n: int, batch: int = 5000) -> np.ndarray:
+    """inserts n chunks; returns their vectors (only kept by callers that need ground truth)"""
+    kept = []
+    for start in range(0, n, batch):
+        vectors = corpus.vectors(min(batch, n - start))
+        copy_chunks(session, (
+            {"file_id": file_id, "project_id": project_id, "content": f"chunk {start + i}", "embedding": v}
+            for i, v in enumerate(vectors)
+        ), batch_size=batch)
+        session.commit()
+        kept.append(vectors)
+    return np.concatenate(kept) if kept else np.zeros((0, DIMS), dtype=np.float32)
+
+
+def table_size(session) -> int:
+    return session.execute(text("SELECT count(*) FROM chunks")).scalar_one()
+
+
+def join_query(session, project_id, query, k):
+    return session.query(models.Chunk.id, models.Chunk.content).join(models.File).filter(
+        models.File.project_id == project_id
+    ).order_by(models.Chunk.embedding.cosine_distance(query.tolist())).limit(k).all()
+
+
+def run(session, fn, queries, truth, k):
+    """(p50 ms, p99 ms, recall@k); each query in its own transaction so SET LOCAL resets"""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows = fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        session.commit()
+        hits += len({r.content for r in rows} & expected)
+    latencies.sort()
+    return (
+        statistics.median(latencies),
+        latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        hits / (k * len(queries)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000", help="total chunks in the table at each step")
+    parser.add_argument("--project-chunks", default="2000,50000", help="sizes of the projects being queried")
+    parser.add_argument("--tenant-chunks", type=int, default=5000, help="chunks per filler project")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--partial-index", action="store_true", help="build partial hnsw indexes for the targets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic projects in place")
+    args = parser.parse_args()
+
+    corpus = Corpus(args.seed)
+    session = SessionLocal()
+    created = []
+    try:
+        targets = []
+        for n in (int(s) for s in args.project_chunks.split(",")):
+            project_id, file_id = create_project(session, f"bench_chunk_retrieval target {n}")
+            created.append(project_id)
+            vectors = insert_chunks(session, corpus, project_id, file_id, n)
+            # queries: perturbed copies of the project's own chunks
+            picks = corpus.rng.integers(0, n, size=args.queries)
+            queries = vectors[picks] + corpus.rng.standard_normal((args.queries, DIMS)).astype(np.float32) * 0.02
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            top = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+            truth = [{f"chunk {i}" for i in row} for row in top]
+            targets.append((n, project_id, queries, truth))
+            if args.partial_index:
+                ChunkRetrievalService(session).ensure_project_index(project_id, min_chunks=1)
+
+        print(f"{'table':>10} {'project':>8} {'path':<8} {'plan':<15} {'p50 ms':>8} {'p99 ms':>8} {'recall@' + str(args.k):>9}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            while table_size(session) < size:
+                project_id, file_id = create_project(session, "bench_chunk_retrieval tenant")
+                created.append(project_id)
+                insert_chunks(session, corpus, project_id, file_id, min(args.tenant_chunks, size - table_size(session)))
+            session.execute(text("ANALYZE chunks"))
+            session.commit()
+            rows = table_size(session)
+
+            for n, project_id, queries, truth in targets:
+                service = ChunkRetrievalService(session)
+                paths = [
+                    ("join", lambda q: join_query(session, project_id, q, args.k)),
+                    ("service", lambda q: service.search(str(project_id), q.tolist(), k=args.k)),
+                ]
+                for name, fn in paths:
+                    p50, p99, recall = run(session, fn, queries, truth, args.k)
+                    plan = service.last_plan if name == "service" else "-"
+                    print(f"{rows:>10} {n:>8} {name:<8} {plan:<15} {p50:>8.1f} {p99:>8.1f} {recall:>9.3f}")
+    finally:
+        session.rollback()
+        if not args.keep:
+            for project_id in created:
+                try:
+                    ChunkRetrievalService(session).drop_project_index(project_id)
+                except Exception:
+                    pass
+            session.query(models.Project).filter(models.Project.id.in_(created)).delete(synchronize_session=False)
+            session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark EntityResolver clustering engines on synthetic concept embeddings.
+Compares the dense agglomerative engine with the sparse ann engine on wall time,
+peak memory and agreement (adjusted rand index). No API keys or database needed.
+
+Each run happens in a fresh subprocess; peak memory is the growth of the process
+high-water mark (ru_maxrss) while clustering, on top of the generated embeddings.
+
+Usage:
+  python scripts/bench_entity_resolution.py
+  python scripts/bench_entity_resolution.py --sizes 1000,10000 --max-baseline 10000
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+def make_concepts(n: int, dims: int = 1536, seed: int = 0):
+    """
+    synthetic concept embeddings: ~70% singletons, the rest in groups of 2-4 synonyms.
+    unrelated concepts share a common direction (cosine ~0.3, like real embedding spaces);
+    synonym spread varies per group so some groups straddle the 0.88 threshold.
+    returns (X float32 [n, dims], truth labels).
+    """
+    rng = np.random.default_rng(seed)
+    sizes = []
+    total = 0
+    while total < n:
+        size = 1 if rng.random() < 0.7 else int(rng.integers(2, 5))
+        size = min(size, n - total)
+        sizes.append(size)
+        total += size
+
+    shared = rng.standard_normal(dims).astype(np.float32)
+    shared /= np.linalg.norm(shared)
+
+    X = np.empty((n, dims), dtype=np.float32)
+    truth = np.empty(n, dtype=np.int64)
+    row = 0
+    for label, size in enumerate(sizes):
+        center = rng.standard_normal(dims).astype(np.float32)
+        center = 0.65 * shared + center / np.linalg.norm(center)
+        center /= np.linalg.norm(center)
+        spread = rng.uniform(0.15, 0.45)
+        noise = rng.standard_normal((size, dims)).astype(np.float32) / np.sqrt(dims)
+        X[row:row + size] = center + spread * noise
+        truth[row:row + size] = label
+        row += size
+
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X, truth
+
+
+def _max_rss_mb() -> float:
+    # linux reports kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_one(method: str, n: int, queue):
+    from services.graph.resolver import EntityResolver
+
+    X, truth = make_concepts(n)
+    gc.collect()
+    baseline = _max_rss_mb()
+
+    resolver = EntityResolver(method=method)
+    start = time.perf_counter()
+    labels = resolver.cluster(X)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "seconds": elapsed,
+        "peak_mb": _max_rss_mb() - baseline,
+        "labels": np.asarray(labels),
+        "truth": truth,
+    })
+
+
+def run_isolated(method: str, n: int) -> dict:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_one, args=(method, n, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    from sklearn.metrics import adjusted_rand_score
+
+    parser = argparse.ArgumentParser(description="benchmark entity resolution engines")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma-separated id counts")
+    parser.add_argument(
+        "--max-baseline",
+        type=int,
+        default=10000,
+        help="skip the agglomerative engine above this size (dense matrix is n^2 * 8 bytes)",
+    )
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    header = f"{'ids':>7} | {'engine':<13} | {'wall s':>8} | {'peak mb':>8} | {'ari truth':>9} | {'ari vs agg':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for n in sizes:
+        baseline = None
+        if n <= args.max_baseline:
+            baseline = run_isolated("agglomerative", n)
+            print(
+                f"{n:>7} | {'agglomerative':<13} | {baseline['seconds']:>8.2f} | {baseline['peak_mb']:>8.0f} | "
+                f"{adjusted_rand_score(baseline['truth'], baseline['labels']):>9.4f} | {'-':>10}"
+            )
+
+        ann = run_isolated("ann", n)
+        agreement = (
+            f"{adjusted_rand_score(baseline['labels'], ann['labels']):>10.4f}" if baseline else f"{'skipped':>10}"
+        )
+        print(
+            f"{n:>7} | {'ann':<13} | {ann['seconds']:>8.2f} | {ann['peak_mb']:>8.0f} | "
+            f"{adjusted_rand_score(ann['truth'], ann['labels']):>9.4f} | {agreement}"
+        )
+
+
+if __name__ == "__main__":
+    main()
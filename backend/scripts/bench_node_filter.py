@@ -0,0 +1,106 @@
+"""
+Benchmark the compiled concept pre-filter on the bundled sample graphs.
+Reports which rules fire, how long a pass takes, and how much of the
+concept_validation prompt (chars / estimated tokens) the rules remove
+before anything is sent to the LLM. No API keys or database needed.
+
+--noise mixes in ids typical of raw textbook extraction (dates, headings,
+page refs, authors) since the sample graphs were already cleaned.
+
+Usage:
+  python scripts/bench_node_filter.py
+  python scripts/bench_node_filter.py --noise --repeat 200
+  python scripts/bench_node_filter.py --files path/to/graph.json
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from services.embedding_service import estimate_tokens  # noqa: E402
+from services.graph.node_filter import RuleEngine  # noqa: E402
+from services.llm.concept_validator import ConceptValidator  # noqa: E402
+from services.llm.prompt_service import get_prompt_service  # noqa: E402
+
+SAMPLES_DIR = Path(__file__).resolve().parents[2] / "frontend" / "src" / "data" / "json"
+
+NOISE_IDS = [
+    "november 1859", "march 3, 2004", "2019-09-01", "12/05/1998", "1990s", "2021",
+    "chapter 1", "chapter 12", "section 2.3", "figure 4.1", "table 3", "exercise 5.2",
+    "theorem 3.1", "lemma 2", "appendix a", "lecture 7", "page 112", "pp. 45-47",
+    "ii", "iv", "xii", "introduction", "summary", "preface", "exercises", "references",
+    "bibliography", "contents", "index", "second edition", "isbn 978-0-13-468599-1",
+    "copyright 2016", "preliminary version", "f(x)", "g(t)", "2.5", "(1)", "= 0",
+    "d. r. wilkins", "g h hardy", "bernhard riemann", "carl friedrich gauss",
+    "augustin cauchy", "gottfried leibniz",
+]
+
+
+def load_ids(paths):
+    ids = []
+    for path in paths:
+        with open(path) as f:
+            ids.extend(node["id"] for node in json.load(f)["nodes"])
+    return ids
+
+
+def prompt_size(concept_ids, shard_size):
+    """chars and estimated tokens of every concept_validation prompt the validator would send"""
+    prompts = get_prompt_service()
+    concepts = sorted(set(concept_ids))
+    chars = tokens = calls = 0
+    for i in range(0, len(concepts), shard_size):
+        text = prompts.render(ConceptValidator.TEMPLATE, concept_list=concepts[i:i + shard_size])
+        chars += len(text)
+        tokens += estimate_tokens(text)
+        calls += 1
+    return chars, tokens, calls
+
+
+def pct_cut(before, after):
+    return 100.0 * (before - after) / before if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="*", help="graph json files (default: frontend sample graphs)")
+    parser.add_argument("--noise", action="store_true", help="add typical extraction noise ids")
+    parser.add_argument("--repeat", type=int, default=100, help="timing repetitions")
+    parser.add_argument("--shard-size", type=int, default=150)
+    args = parser.parse_args()
+
+    paths = args.files or sorted(SAMPLES_DIR.glob("*.json"))
+    ids = load_ids(paths)
+    if args.noise:
+        ids += NOISE_IDS
+
+    engine = RuleEngine()
+    invalid, ambiguous = engine.partition(ids)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        engine.partition(ids)
+    per_pass = (time.perf_counter() - start) / args.repeat
+
+    before = prompt_size(ids, args.shard_size)
+    after = prompt_size(ambiguous, args.shard_size)
+
+    print(f"graphs: {', '.join(Path(p).name for p in paths)}{' + noise' if args.noise else ''}")
+    print(f"ids: {len(ids)}  rule hits: {len(invalid)}  ambiguous -> llm: {len(ambiguous)}")
+    print(f"pass time: {per_pass * 1000:.3f} ms ({per_pass * 1e6 / max(len(ids), 1):.2f} us/id)")
+    print()
+    print("rule hits:")
+    for rule, count in Counter(invalid.values()).most_common():
+        print(f"  {rule:<22} {count}")
+    print()
+    print(f"{'validator prompt':<18} {'all ids':>10} {'ambiguous':>10} {'cut':>8}")
+    for label, b, a in zip(("chars", "est. tokens", "llm calls"), before, after):
+        print(f"{label:<18} {b:>10} {a:>10} {pct_cut(b, a):>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
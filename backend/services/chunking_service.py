@@ -27,6 +27,49 @@ def create_extraction_chunks(
     return chunks
 
 
+def locate_chunks(text: str, chunks: List["Chunk"], probe: int = 64) -> List["Chunk"]:
+    """
+    adds source character offsets ("start", "end") to each chunk's metadata.
+    the splitter collapses whitespace where it rejoins paragraphs and sentences, so chunks are
+    found by their first / last words with whitespace-insensitive patterns, scanning forward in
+    document order. chunks that can't be found keep their metadata unchanged.
+    """
+    located = []
+    cursor = 0
+    for chunk in chunks:
+        words = chunk.text.split()
+        if not words:
+            located.append(chunk)
+            continue
+        head = re.compile(r"\s+".join(re.escape(w) for w in _words_within(words, probe)))
+        match = head.search(text, cursor)
+        if not match:
+            located.append(chunk)
+            continue
+        tail_words = _words_within(words[::-1], probe)[::-1]
+        tail = re.compile(r"\s+".join(re.escape(w) for w in tail_words))
+        # whitespace only ever collapses, so the last words can't start before this
+        earliest_tail = match.start() + len(" ".join(words)) - len(" ".join(tail_words)) - 1
+        end_match = tail.search(text, max(match.start(), earliest_tail))
+        end = end_match.end() if end_match else min(len(text), match.start() + len(chunk.text))
+        # metadata dicts are shared between sub-chunks of a section; copy before annotating
+        located.append(Chunk(text=chunk.text, metadata={**chunk.metadata, "start": match.start(), "end": end}))
+        # the splitter's chunks don't overlap: the next one starts after this one
+        cursor = end
+    return located
+
+
+def _words_within(words: List[str], limit: int) -> List[str]:
+    """leading words whose joined length stays within limit (at least one)"""
+    picked, length = [], 0
+    for word in words:
+        if picked and length + len(word) + 1 > limit:
+            break
+        picked.append(word)
+        length += len(word) + 1
+    return picked
+
+
 @dataclass
 class Chunk:
     text: str
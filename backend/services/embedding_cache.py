@@ -0,0 +1,235 @@
+"""
+embeddingcache: content-addressed cache for embedding vectors.
+keys are (provider, model, dimensions, sha256(text)); an in-process lru tier sits in front
+of an optional persistent tier (postgres table or local data/ directory).
+"""
+import hashlib
+import logging
+import os
+import pathlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (provider, model, dimensions, sha256 hex of the cleaned text)
+CacheKey = Tuple[str, str, int, str]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LRUEmbeddingTier:
+    """bounded in-process tier. vectors are kept as float32 arrays to keep memory flat."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._store: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vec = self._store.get(key)
+                if vec is not None:
+                    self._store.move_to_end(key)
+                    found[key] = vec
+        return found
+
+    def put_many(self, entries: Dict[CacheKey, np.ndarray]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, vec in entries.items():
+                self._store[key] = vec
+                self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+class LocalEmbeddingStore:
+    """persistent tier on local disk: data/embedding_cache/<provider>/<model>/<dims>/<hh>/<hash>.f32"""
+
+    def __init__(self, base_dir: str = "data/embedding_cache"):
+        self.base_dir = pathlib.Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: CacheKey) -> pathlib.Path:
+        provider, model, dimensions, digest = key
+        safe_model = model.replace("/", "_")
+        return self.base_dir / provider / safe_model / str(dimensions) / digest[:2] / f"{digest}.f32"
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        found = {}
+        for key in keys:
+            path = self._path(key)
+            try:
+                raw = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"unreadable embedding cache entry {path}: {e}")
+                continue
+            # a vector of the wrong length (e.g. a file left truncated by an older writer) is a miss
+            if len(raw) != key[2] * 4:
+                logger.warning(f"dropping corrupt embedding cache entry {path} ({len(raw)} bytes)")
+                path.unlink(missing_ok=True)
+                continue
+            found[key] = np.frombuffer(raw, dtype="<f4")
+        return found
+
+    def put_many(self, entries: Dict[CacheKey, np.ndarray]):
+        for key, vec in entries.items():
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write then rename (per-writer temp name) so readers never see a partial file
+            tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                tmp.write_bytes(np.asarray(vec, dtype="<f4").tobytes())
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+
+
+class PostgresEmbeddingStore:
+    """persistent tier in the embedding_cache table (migration 007). opens its own session per call."""
+
+    LOOKUP_BATCH = 1000
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        from db.session import SessionLocal
+        from db import models
+
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        # every key in one call shares provider/model/dimensions
+        provider, model, dimensions, _ = keys[0]
+        by_hash = {k[3]: k for k in keys}
+        hashes = list(by_hash)
+
+        found = {}
+        db = SessionLocal()
+        try:
+            for i in range(0, len(hashes), self.LOOKUP_BATCH):
+                rows = db.query(
+                    models.EmbeddingCacheEntry.text_hash,
+                    models.EmbeddingCacheEntry.embedding,
+                ).filter(
+                    models.EmbeddingCacheEntry.provider == provider,
+                    models.EmbeddingCacheEntry.model == model,
+                    models.EmbeddingCacheEntry.dimensions == dimensions,
+                    models.EmbeddingCacheEntry.text_hash.in_(hashes[i:i + self.LOOKUP_BATCH]),
+                ).all()
+                for digest, embedding in rows:
+                    found[by_hash[digest]] = np.asarray(embedding, dtype=np.float32)
+        finally:
+            db.close()
+        return found
+
+    def put_many(self, entries: Dict[CacheKey, np.ndarray]):
+        from sqlalchemy.dialects.postgresql import insert
+        from db.session import SessionLocal
+        from db import models
+
+        if not entries:
+            return
+
+        rows = [
+            {
+                "provider": provider,
+                "model": model,
+                "dimensions": dimensions,
+                "text_hash": digest,
+                "embedding": np.asarray(vec, dtype=np.float32),
+            }
+            for (provider, model, dimensions, digest), vec in entries.items()
+        ]
+
+        db = SessionLocal()
+        try:
+            for i in range(0, len(rows), self.LOOKUP_BATCH):
+                stmt = insert(models.EmbeddingCacheEntry).values(rows[i:i + self.LOOKUP_BATCH])
+                db.execute(stmt.on_conflict_do_nothing())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class EmbeddingCache:
+    """
+    two-tier lookup: lru first, then the persistent store (promoting hits into the lru).
+    persistent-tier failures are logged and treated as misses; they never fail an embedding call.
+    """
+
+    def __init__(self, memory: LRUEmbeddingTier, persistent=None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get_many(self, keys: List[CacheKey]) -> Tuple[Dict[CacheKey, np.ndarray], int, int]:
+        """returns (found, memory_hits, persistent_hits)"""
+        found = self.memory.get_many(keys)
+        memory_hits = len(found)
+
+        persistent_hits = 0
+        remaining = [k for k in keys if k not in found]
+        if remaining and self.persistent is not None:
+            try:
+                stored = self.persistent.get_many(remaining)
+            except Exception as e:
+                logger.warning(f"embedding cache lookup failed, treating as misses: {e}")
+                stored = {}
+            if stored:
+                self.memory.put_many(stored)
+                found.update(stored)
+                persistent_hits = len(stored)
+
+        return found, memory_hits, persistent_hits
+
+    def put_many(self, entries: Dict[CacheKey, np.ndarray]):
+        self.memory.put_many(entries)
+        if self.persistent is not None:
+            try:
+                self.persistent.put_many(entries)
+            except Exception as e:
+                logger.warning(f"embedding cache write failed: {e}")
+
+
+# singleton instance (shared by every EmbeddingService in the process)
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """returns the process-wide cache for the configured backend (postgres | local | memory | none)"""
+    global _embedding_cache
+    backend = settings.EMBEDDING_CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+
+    if _embedding_cache is None:
+        memory = LRUEmbeddingTier(settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        if backend == "postgres":
+            persistent = PostgresEmbeddingStore()
+        elif backend == "local":
+            persistent = LocalEmbeddingStore()
+        else:
+            persistent = None
+        logger.info(f"initializing embedding cache (backend={backend})")
+        _embedding_cache = EmbeddingCache(memory, persistent)
+    return _embedding_cache
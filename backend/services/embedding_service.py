@@ -1,85 +1,267 @@
+import asyncio
 import logging
+import numpy as np
 from core.config import get_settings
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+from tenacity import retry, wait_exponential, stop_after_attempt
+from services.llm.clients import get_async_openai_client, get_gemini_client, get_openai_client
+from services.embedding_cache import CacheKey, EmbeddingCache, get_embedding_cache, text_hash
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# per-provider request limits. token counts are estimated (chars / CHARS_PER_TOKEN), so the
+# request budgets sit below the documented hard caps to leave headroom for estimation error.
+PROVIDER_LIMITS = {
+    "openai": {
+        "max_items_per_request": 2048,
+        "max_tokens_per_request": 250_000,  # hard cap 300k
+        "max_tokens_per_input": 8191,
+    },
+    "gemini": {
+        "max_items_per_request": 100,
+        "max_tokens_per_request": 100_000,
+        "max_tokens_per_input": 2048,
+    },
+}
+
+# conservative chars-per-token estimate (english averages ~4)
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """cheap upper-bound token estimate without a tokenizer"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def plan_batches(
+    texts: List[str],
+    max_items: int,
+    max_tokens: int,
+) -> List[List[int]]:
+    """
+    greedily packs text indices into batches bounded by item count and estimated tokens.
+    preserves input order; every index appears in exactly one batch.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
 class EmbeddingService:
-    """embedding service with openai (primary) and gemini (fallback) gracefully supporting 1536 dimensions"""
-    
-    def __init__(self, gemini_key: str = None, openai_key: str = None):
+    """
+    embedding service with openai (primary) and gemini (fallback) gracefully supporting 1536 dimensions.
+    consults the shared embedding cache first and only sends misses to the provider.
+    """
+
+    def __init__(
+        self,
+        gemini_key: str = None,
+        openai_key: str = None,
+        max_concurrency: int = None,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+    ):
         self.dimensions = 1536
-        
+        self.max_concurrency = max(1, max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY)
+
+        # clients come from the shared pooled registry (services.llm.clients)
+        self._openai_key = openai_key
+        self._gemini_key = gemini_key
         if openai_key:
-            from openai import OpenAI
             self.provider = "openai"
-            self.openai_client = OpenAI(api_key=openai_key)
             self.openai_model = "text-embedding-3-small"
+            self.model = self.openai_model
             logger.info("initialized openai embedding service (BYOK custom key)")
         elif gemini_key:
-            from google import genai
             self.provider = "gemini"
-            self.gemini_client = genai.Client(api_key=gemini_key)
             self.gemini_model = "gemini-embedding-001"
+            self.model = self.gemini_model
             logger.info("initialized gemini embedding service (BYOK custom key)")
         else:
             raise ValueError("No API key provided for EmbeddingService. Strict BYOK is enabled.")
 
+        self.limits = PROVIDER_LIMITS[self.provider]
+        self.cache = (cache or get_embedding_cache()) if use_cache else None
+        self.cache_stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    @property
+    def openai_client(self):
+        return get_openai_client(self._openai_key)
+
+    @property
+    def async_openai_client(self):
+        return get_async_openai_client(self._openai_key)
+
+    @property
+    def gemini_client(self):
+        return get_gemini_client(self._gemini_key)
+
+    def _clean(self, texts: List[str]) -> List[str]:
+        """strip newlines and truncate inputs that would exceed the per-input token cap"""
+        max_chars = self.limits["max_tokens_per_input"] * CHARS_PER_TOKEN
+        cleaned = []
+        for t in texts:
+            t = t.replace("\n", " ")
+            if len(t) > max_chars:
+                logger.warning(f"truncating embedding input from {len(t)} to {max_chars} chars")
+                t = t[:max_chars]
+            cleaned.append(t)
+        return cleaned
+
+    def _plan(self, cleaned_texts: List[str]) -> List[List[int]]:
+        return plan_batches(
+            cleaned_texts,
+            max_items=self.limits["max_items_per_request"],
+            max_tokens=self.limits["max_tokens_per_request"],
+        )
+
+    def _lookup(self, cleaned_texts: List[str]) -> Tuple[List[CacheKey], Dict[CacheKey, Any], List[str]]:
+        """
+        returns (keys per input, cached vectors by key, unique texts still to embed).
+        duplicate texts within one call are embedded once.
+        """
+        keys = [(self.provider, self.model, self.dimensions, text_hash(t)) for t in cleaned_texts]
+
+        found: Dict[CacheKey, Any] = {}
+        if self.cache is not None:
+            found, memory_hits, persistent_hits = self.cache.get_many(list(dict.fromkeys(keys)))
+            self.cache_stats["memory_hits"] += memory_hits
+            self.cache_stats["persistent_hits"] += persistent_hits
+
+        misses: Dict[CacheKey, str] = {}
+        for key, text in zip(keys, cleaned_texts):
+            if key not in found and key not in misses:
+                misses[key] = text
+        self.cache_stats["misses"] += len(misses)
+        return keys, found, list(misses.values())
+
+    def _store(self, miss_texts: List[str], vectors: List[List[float]]) -> Dict[CacheKey, Any]:
+        """writes freshly embedded vectors to the cache, returns them keyed like _lookup"""
+        fresh = {
+            (self.provider, self.model, self.dimensions, text_hash(t)): v
+            for t, v in zip(miss_texts, vectors)
+        }
+        if self.cache is not None and fresh:
+            self.cache.put_many({k: np.asarray(v, dtype=np.float32) for k, v in fresh.items()})
+        return fresh
+
+    @staticmethod
+    def _assemble(keys: List[CacheKey], found: Dict[CacheKey, Any], fresh: Dict[CacheKey, Any]) -> List[List[float]]:
+        out = []
+        for key in keys:
+            vec = fresh.get(key)
+            if vec is None:
+                vec = found[key]
+            out.append(vec.tolist() if isinstance(vec, np.ndarray) else vec)
+        return out
+
     def get_embedding(self, text: str) -> List[float]:
-        """get single vector for text"""
+        """get single vector for text (errors come from get_embeddings, wrapped once)"""
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """batch embed multiple texts (blocking). prefer aget_embeddings from async code."""
+        if not texts:
+            return []
+
         try:
-            # clean text to avoid token issues
-            text = text.replace("\n", " ")
-            
-            if self.provider == "openai":
-                response = self.openai_client.embeddings.create(
-                    input=[text],
-                    model=self.openai_model
-                )
-                return response.data[0].embedding
-            else:
-                from google.genai import types
-                response = self.gemini_client.models.embed_content(
-                    model=self.gemini_model,
-                    contents=text,
-                    config=types.EmbedContentConfig(output_dimensionality=self.dimensions)
-                )
-                return response.embeddings[0].values
-                
+            keys, found, miss_texts = self._lookup(self._clean(texts))
+
+            vectors: List[List[float]] = [None] * len(miss_texts)
+            for batch in self._plan(miss_texts):
+                batch_vectors = self._embed_batch([miss_texts[i] for i in batch])
+                for i, vec in zip(batch, batch_vectors):
+                    vectors[i] = vec
+
+            fresh = self._store(miss_texts, vectors)
+            return self._assemble(keys, found, fresh)
+
         except Exception as e:
-            raise Exception(f"failed to get embedding: {str(e)}")
+            raise Exception(f"failed to get batch embeddings: {str(e)}") from e
 
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """batch embed multiple texts"""
+    async def aget_embedding(self, text: str) -> List[float]:
+        """get single vector for text without blocking the event loop"""
+        return (await self.aget_embeddings([text]))[0]
+
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        batch embed multiple texts asynchronously.
+        cache misses are split into provider-bounded batches, run up to max_concurrency at once,
+        and returned in input order.
+        """
         if not texts:
             return []
-            
+
         try:
-            # clean all texts
-            cleaned_texts = [t.replace("\n", " ") for t in texts]
-            
-            if self.provider == "openai":
-                response = self.openai_client.embeddings.create(
-                    input=cleaned_texts,
-                    model=self.openai_model
-                )
-                return [data.embedding for data in response.data]
-            else:
-                # Gemini embed API: at most 100 contents per batch (OpenAI has a higher limit)
-                from google.genai import types
-                cfg = types.EmbedContentConfig(output_dimensionality=self.dimensions)
-                out: List[List[float]] = []
-                batch_size = 100
-                for i in range(0, len(cleaned_texts), batch_size):
-                    batch = cleaned_texts[i : i + batch_size]
-                    response = self.gemini_client.models.embed_content(
-                        model=self.gemini_model,
-                        contents=batch,
-                        config=cfg,
-                    )
-                    out.extend([data.values for data in response.embeddings])
-                return out
-                
+            cleaned_texts = self._clean(texts)
+            # persistent cache tiers do blocking i/o
+            keys, found, miss_texts = await asyncio.to_thread(self._lookup, cleaned_texts)
+
+            batches = self._plan(miss_texts)
+            sem = asyncio.Semaphore(self.max_concurrency)
+
+            async def run_batch(batch: List[int]) -> List[List[float]]:
+                async with sem:
+                    return await self._aembed_batch([miss_texts[i] for i in batch])
+
+            results = await asyncio.gather(*(run_batch(b) for b in batches))
+
+            vectors: List[List[float]] = [None] * len(miss_texts)
+            for batch, batch_vectors in zip(batches, results):
+                for i, vec in zip(batch, batch_vectors):
+                    vectors[i] = vec
+            if len(batches) > 1:
+                logger.info(f"embedded {len(miss_texts)} texts in {len(batches)} batches")
+
+            fresh = await asyncio.to_thread(self._store, miss_texts, vectors)
+            return self._assemble(keys, found, fresh)
+
         except Exception as e:
-            raise Exception(f"failed to get batch embeddings: {str(e)}")
+            raise Exception(f"failed to get batch embeddings: {str(e)}") from e
+
+    @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """one provider request for an already-bounded batch"""
+        if self.provider == "openai":
+            response = self.openai_client.embeddings.create(
+                input=batch,
+                model=self.openai_model
+            )
+            return [data.embedding for data in response.data]
+
+        from google.genai import types
+        response = self.gemini_client.models.embed_content(
+            model=self.gemini_model,
+            contents=batch,
+            config=types.EmbedContentConfig(output_dimensionality=self.dimensions),
+        )
+        return [data.values for data in response.embeddings]
+
+    @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
+    async def _aembed_batch(self, batch: List[str]) -> List[List[float]]:
+        """one async provider request for an already-bounded batch"""
+        if self.provider == "openai":
+            response = await self.async_openai_client.embeddings.create(
+                input=batch,
+                model=self.openai_model
+            )
+            return [data.embedding for data in response.data]
+
+        from google.genai import types
+        response = await self.gemini_client.aio.models.embed_content(
+            model=self.gemini_model,
+            contents=batch,
+            config=types.EmbedContentConfig(output_dimensionality=self.dimensions),
+        )
+        return [data.values for data in response.embeddings]
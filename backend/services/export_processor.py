@@ -1,19 +1,60 @@
 import logging
-import asyncio
-from typing import List, Optional
+import time
+from typing import Callable, List, Optional, Set
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
+from core.config import get_settings
 from db.session import SessionLocal
 from db import models
 from services.llm.note_service import NodeNoteService
 from services.queue_service import get_queue_service
+from services.graph.snapshot_service import GraphSnapshotService, rebuild_snapshot
 
 logger = logging.getLogger(__name__)
 
+
+class BatchClock:
+    """
+    invocation deadline plus an ewma of batch durations: another batch starts only if the
+    time left covers the expected batch with headroom.
+    """
+
+    def __init__(self, budget_seconds: Optional[float], alpha: float = 0.3, headroom: float = 1.5, now: Callable[[], float] = time.monotonic):
+        self._now = now
+        self.deadline = now() + budget_seconds if budget_seconds is not None else None
+        self.alpha = alpha
+        self.headroom = headroom
+        self.ewma: Optional[float] = None
+        self.batches = 0
+
+    def time_left(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - self._now()
+
+    def record(self, seconds: float):
+        self.batches += 1
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def has_time_for_batch(self) -> bool:
+        # the first batch always runs so every invocation makes progress
+        if self.deadline is None or self.ewma is None:
+            return True
+        return self.time_left() > self.ewma * self.headroom
+
+
+def time_budget(remaining_time_ms: Optional[Callable[[], int]]) -> Optional[float]:
+    """seconds this invocation may spend on batches (None = unbounded)"""
+    settings = get_settings()
+    if remaining_time_ms is not None:
+        return max(0.0, remaining_time_ms() / 1000 - settings.EXPORT_DEADLINE_MARGIN_SECONDS)
+    return settings.EXPORT_TIME_BUDGET_SECONDS or None
+
+
 class ExportProcessor:
     """
     handles batch content generation and vault assembly for obsidian exports.
-    uses a recursive batching strategy to avoid lambda/api timeouts.
+    generates note batches back to back until the invocation's time budget runs low, then
+    checkpoints and re-enqueues itself (lambda/api timeouts never cut a batch short).
     """
 
     def __init__(
@@ -21,18 +62,24 @@ class ExportProcessor:
         project_id: str, 
         user_id: str, 
         gemini_key: str, 
-        openai_key: Optional[str] = None
+        openai_key: Optional[str] = None,
+        remaining_time_ms: Optional[Callable[[], int]] = None,
     ):
         self.project_id = project_id
         self.user_id = user_id
         self.gemini_key = gemini_key
         self.openai_key = openai_key
+        # lambda context.get_remaining_time_in_millis (None outside lambda)
+        self.remaining_time_ms = remaining_time_ms
+        self.settings = get_settings()
         self.note_service = NodeNoteService(gemini_key=gemini_key, openai_key=openai_key)
+        self._last_progress_at = 0.0
 
     async def process(self):
         """
         main entry point for the export worker.
-        decides whether to generate more notes or assemble the final vault.
+        generates missing notes batch by batch while time allows, then either assembles the
+        vault (nothing left) or self-enqueues to continue in a fresh invocation.
         """
         db = SessionLocal()
         try:
@@ -40,24 +87,50 @@ class ExportProcessor:
             if not project:
                 raise ValueError("project not found")
 
-            from sqlalchemy import or_
+            clock = BatchClock(time_budget(self.remaining_time_ms))
+            # counted once per invocation; progress advances from these as batches complete
+            total_nodes = db.query(models.GraphNode).filter(
+                models.GraphNode.project_id == self.project_id
+            ).count()
+            done = total_nodes - self._missing_query(db).count()
+            failed: Set[str] = set()
+            processed = 0
+
+            while True:
+                # find nodes missing content (skipping ones that already failed in this invocation)
+                query = self._missing_query(db)
+                if failed:
+                    query = query.filter(models.GraphNode.concept_id.notin_(failed))
+                missing_nodes = query.limit(self.settings.EXPORT_BATCH_SIZE).all()
+
+                if not missing_nodes:
+                    break
+                if not clock.has_time_for_batch():
+                    logger.info(
+                        f"export time budget nearly spent after {clock.batches} batches "
+                        f"(~{clock.ewma:.1f}s per batch, {clock.time_left():.1f}s left); checkpointing"
+                    )
+                    break
+
+                self._report_progress(db, done, total_nodes, force=processed == 0)
+                batch_start = time.monotonic()
+                generated = await self._process_batch(db, missing_nodes)
+                clock.record(time.monotonic() - batch_start)
 
-            # find nodes missing content (batch processing)
-            missing_nodes = db.query(models.GraphNode).filter(
-                models.GraphNode.project_id == self.project_id,
-                or_(models.GraphNode.content == None, models.GraphNode.content == "")
-            ).limit(10).all() # process in batches of 10
+                failed.update(node.concept_id for node in missing_nodes if node.concept_id not in generated)
+                done += len(generated)
+                processed += len(missing_nodes)
 
-            if missing_nodes:
-                await self._process_batch(db, missing_nodes)
-                # self-enqueue to continue
+            if missing_nodes or failed:
+                # checkpoint: generated notes are committed; continue in a fresh invocation
+                self._report_progress(db, done, total_nodes, force=True)
                 await self._enqueue_next_step()
-                return {"export_status": "batch_partial", "nodes_processed": len(missing_nodes)}
-            else:
-                # all notes generated, move to assembly
-                logger.info(f"all notes generated for project {self.project_id}. moving to assembly.")
-                await self._assemble_vault(db)
-                return {"export_status": "assembly_completed"}
+                return {"export_status": "batch_partial", "nodes_processed": processed, "batches": clock.batches}
+
+            # all notes generated, move to assembly
+            logger.info(f"all notes generated for project {self.project_id}. moving to assembly.")
+            await self._assemble_vault(db)
+            return {"export_status": "assembly_completed", "nodes_processed": processed, "batches": clock.batches}
 
         except Exception as e:
             logger.exception(f"export processing failed for project {self.project_id}")
@@ -66,55 +139,56 @@ class ExportProcessor:
         finally:
             db.close()
 
-    async def _process_batch(self, db: Session, nodes: List[models.GraphNode]):
-        """generates notes for a batch of nodes"""
-        from sqlalchemy import or_
-        total_missing = db.query(models.GraphNode).filter(
+    def _missing_query(self, db: Session):
+        return db.query(models.GraphNode).filter(
             models.GraphNode.project_id == self.project_id,
             or_(models.GraphNode.content == None, models.GraphNode.content == "")
-        ).count()
-        
-        total_nodes = db.query(models.GraphNode).filter(
-            models.GraphNode.project_id == self.project_id
-        ).count()
-
-        progress = int(((total_nodes - total_missing) / total_nodes) * 100) if total_nodes > 0 else 0
-        
-        logger.info(f"project {self.project_id} export progress: {progress}% ({total_nodes - total_missing}/{total_nodes})")
-        
+        )
+
+    def _report_progress(self, db: Session, done: int, total: int, force: bool = False):
+        """writes export progress at most once per EXPORT_PROGRESS_INTERVAL_SECONDS (unless forced)"""
+        now = time.monotonic()
+        if not force and now - self._last_progress_at < self.settings.EXPORT_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress_at = now
+        progress = int((done / total) * 100) if total > 0 else 0
+        logger.info(f"project {self.project_id} export progress: {progress}% ({done}/{total})")
         self._update_metadata(db, {
             "status": "generating",
             "progress": progress,
-            "message": f"generating notes: {total_nodes - total_missing}/{total_nodes}"
+            "message": f"generating notes: {done}/{total}"
         })
 
-        sem = asyncio.Semaphore(10)
-
-        async def process_node(node: models.GraphNode):
-            async with sem:
-                try:
-                    note_content = await self.note_service.generate_note(
-                        db,
-                        str(self.project_id),
-                        node.concept_id,
-                        outbound_links=node.outbound_links,
-                    )
-                    return node, note_content, None
-                except Exception as e:
-                    return node, None, e
-
-        # generate notes concurrently
-        results = await asyncio.gather(*(process_node(node) for node in nodes))
+    async def _process_batch(self, db: Session, nodes: List[models.GraphNode]) -> Set[str]:
+        """generates notes for a batch of nodes and commits them; returns the concept ids that got one"""
+        # one embedding call, one chunk query and one valid-id load for the whole batch;
+        # generation concurrency is governed by the note service's adaptive gemini limiter
+        try:
+            notes = await self.note_service.generate_notes_batch(
+                db,
+                str(self.project_id),
+                [(node.concept_id, node.outbound_links) for node in nodes],
+            )
+        except Exception as e:
+            logger.error(f"failed to generate notes for batch of {len(nodes)}: {e}")
+            # a failed query aborts the transaction; the snapshot invalidation below needs a fresh one
+            db.rollback()
+            notes = {}
 
-        for node, note_content, error in results:
-            if error:
-                logger.error(f"failed to generate note for {node.concept_id}: {error}")
-            elif note_content:
+        generated = set()
+        for node in nodes:
+            note_content = notes.get(node.concept_id)
+            if note_content:
                 node.content = note_content
+                generated.add(node.concept_id)
                 logger.info(f"generated note for {node.concept_id}")
                 
-        # save all completed generation contents
+        # save all completed generation contents (and drop the now-stale graph snapshot)
+        project = db.query(models.Project).filter(models.Project.id == self.project_id).first()
+        if project:
+            GraphSnapshotService(db).invalidate(project, commit=False)
         db.commit()
+        return generated
 
     async def _enqueue_next_step(self):
         """re-publishes the same export task to the queue"""
@@ -161,6 +235,9 @@ class ExportProcessor:
             })
             logger.info(f"successfully assembled and uploaded vault for project {self.project_id}")
 
+            # every note now exists: precompute the graph payload the frontend loads next
+            rebuild_snapshot(db, self.project_id)
+
         except Exception as e:
             logger.exception(f"vault assembly failed for project {self.project_id}")
             self._update_metadata(db, {"status": "failed", "error": f"assembly failed: {str(e)}"})
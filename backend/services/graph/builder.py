@@ -1,7 +1,96 @@
-from typing import List, Dict, Set
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
 from schemas.graph import GraphData, GraphNode
+from services.graph.compact import CompactGraph
 from services.graph.resolver import EntityResolver
 
+
+class GraphAccumulator:
+    """
+    running aggregate of per-chunk extraction results.
+    keeps raw id counts, alias sets and pending (raw) edges instead of every chunk's graphdata,
+    so results can be folded in as each llm call returns and dropped right after.
+    """
+
+    def __init__(self):
+        self.raw_id_counts: Counter = Counter()
+        self.aliases: Dict[str, Dict[str, None]] = {}
+        # dicts as ordered sets of (source, target) raw id pairs
+        self.outbound: Dict[tuple, None] = {}
+        self.inbound: Dict[tuple, None] = {}
+        # raw id -> indices of the extraction chunks it was extracted from (ordered set)
+        self.sources: Dict[str, Dict[int, None]] = {}
+        self.chunks_added = 0
+
+    def add(self, graph: Optional[GraphData], source: Optional[int] = None):
+        """folds one chunk's extraction result into the aggregates (source: extraction chunk index)"""
+        self.chunks_added += 1
+        if not graph:
+            return
+        for n in graph.nodes:
+            self.raw_id_counts[n.id] += 1
+            if source is not None:
+                self.sources.setdefault(n.id, {})[source] = None
+            table = self.aliases.setdefault(n.id, {})
+            for alias in n.aliases:
+                table[alias] = None
+            for target in n.outbound_links:
+                self.outbound[(n.id, target)] = None
+            for parent in n.inbound_links:
+                self.inbound[(parent, n.id)] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.raw_id_counts)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.outbound) + len(self.inbound)
+
+    def summary_nodes(self) -> List[GraphNode]:
+        """one node per unique raw id with merged aliases; all the resolver needs"""
+        return [
+            GraphNode(id=node_id, aliases=list(self.aliases[node_id]))
+            for node_id in self.raw_id_counts
+        ]
+
+    def canonical_sources(self, id_map: Dict[str, str]) -> Dict[str, Set[int]]:
+        """extraction chunk indices per canonical id (union over the raw ids resolved into it)"""
+        merged: Dict[str, Set[int]] = {}
+        for raw_id, chunks in self.sources.items():
+            merged.setdefault(id_map.get(raw_id, raw_id), set()).update(chunks)
+        return merged
+
+    def progress(self) -> Dict[str, int]:
+        return {
+            "chunks_done": self.chunks_added,
+            "raw_concepts": self.node_count,
+            "raw_links": self.edge_count,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """json-serializable form (job-level extraction cache)"""
+        return {
+            "raw_id_counts": dict(self.raw_id_counts),
+            "aliases": {k: list(v) for k, v in self.aliases.items()},
+            "outbound": [list(e) for e in self.outbound],
+            "inbound": [list(e) for e in self.inbound],
+            "sources": {k: list(v) for k, v in self.sources.items()},
+            "chunks_added": self.chunks_added,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GraphAccumulator":
+        acc = cls()
+        acc.raw_id_counts = Counter(data.get("raw_id_counts", {}))
+        acc.aliases = {k: dict.fromkeys(v) for k, v in data.get("aliases", {}).items()}
+        acc.outbound = {tuple(e): None for e in data.get("outbound", [])}
+        acc.inbound = {tuple(e): None for e in data.get("inbound", [])}
+        acc.sources = {k: dict.fromkeys(v) for k, v in data.get("sources", {}).items()}
+        acc.chunks_added = data.get("chunks_added", 0)
+        return acc
+
+
 class GraphBuilder:
     """
     merges raw graph occurrences into consolidated conceptual network
@@ -10,66 +99,49 @@ class GraphBuilder:
 
     def __init__(self, resolver: EntityResolver = None):
         self.resolver = resolver or EntityResolver()
+        self.last_id_map: Dict[str, str] = {}
 
-    def build(self, extracted_graphs: List[GraphData]) -> GraphData:
+    async def build(self, extracted_graphs: List[GraphData]) -> GraphData:
         """merges multiple extracted graphs into one deduplicated result"""
-        raw_nodes = []
+        graph = await self.build_compact(extracted_graphs)
+        return graph.to_graph_data()
+
+    async def build_compact(self, extracted_graphs: List[GraphData]) -> CompactGraph:
+        """same as build, but returns the interned graph for the downstream filter/connect stages"""
+        acc = GraphAccumulator()
         for g in extracted_graphs:
-            raw_nodes.extend(g.nodes)
+            acc.add(g)
+        return await self.finalize(acc)
 
+    async def finalize(self, acc: GraphAccumulator) -> CompactGraph:
+        """resolves entities once over the accumulated summary and materializes the merged graph"""
         # resolve entity mapping (original_id -> canonical_id)
-        id_map = self.resolver.get_id_map(raw_nodes)
+        id_map = await self.resolver.get_id_map(acc.summary_nodes(), acc.raw_id_counts)
+        self.last_id_map = id_map
         valid_canonical_ids = set(id_map.values())
 
         # consolidate nodes (only from extracted nodes, no link-target creation)
-        final_nodes: Dict[str, GraphNode] = {}
-
-        def get_or_create(node_id: str) -> GraphNode:
-            if node_id not in final_nodes:
-                final_nodes[node_id] = GraphNode(
-                    id=node_id,
-                    aliases=[],
-                    outbound_links=[],
-                    inbound_links=[]
-                )
-            return final_nodes[node_id]
-
-        for n in raw_nodes:
-            canonical = id_map.get(n.id, n.id)
-            target = get_or_create(canonical)
+        graph = CompactGraph()
+        for raw_id in acc.raw_id_counts:
+            canonical = id_map.get(raw_id, raw_id)
+            target = graph.intern(canonical)
 
             # merge aliases
-            all_aliases = set(target.aliases)
-            all_aliases.update(n.aliases)
-            if n.id != canonical:
-                all_aliases.add(n.id)
-            target.aliases = list(all_aliases)
-
-            # handle outbound links: map to canonical, drop invalid (target not in graph)
-            for raw_link in n.outbound_links:
-                remapped_link = id_map.get(raw_link, raw_link)
-                if remapped_link not in valid_canonical_ids:
-                    continue  # drop invalid link
-                if remapped_link != canonical and remapped_link not in target.outbound_links:
-                    target.outbound_links.append(remapped_link)
-
-            # handle inbound links (parents): map to canonical, drop invalid
-            for raw_parent in n.inbound_links:
-                remapped_parent = id_map.get(raw_parent, raw_parent)
-                if remapped_parent not in valid_canonical_ids:
-                    continue  # drop invalid link
-                parent_node = get_or_create(remapped_parent)
-                if canonical != remapped_parent and canonical not in parent_node.outbound_links:
-                    parent_node.outbound_links.append(canonical)
-        
-        # re-compute symmetrical inbound_links for all nodes
-        for node in final_nodes.values():
-            node.inbound_links = [] # reset to rebuild from global state
-
-        for node_id, node in final_nodes.items():
-            for target_id in node.outbound_links:
-                if target_id in final_nodes:
-                    if node_id not in final_nodes[target_id].inbound_links:
-                        final_nodes[target_id].inbound_links.append(node_id)
-                        
-        return GraphData(nodes=list(final_nodes.values()))
+            graph.add_aliases(target, acc.aliases[raw_id])
+            if raw_id != canonical:
+                graph.add_aliases(target, [raw_id])
+
+        # handle inbound links (parents): map to canonical, drop invalid (target not in graph)
+        for raw_parent, raw_child in acc.inbound:
+            remapped_parent = id_map.get(raw_parent, raw_parent)
+            if remapped_parent in valid_canonical_ids:
+                graph.add_edge(graph.index[remapped_parent], graph.index[id_map.get(raw_child, raw_child)])
+
+        # handle outbound links: map to canonical, drop invalid
+        # inbound links are maintained symmetrically by add_edge (self-links are dropped there)
+        for raw_source, raw_link in acc.outbound:
+            remapped_link = id_map.get(raw_link, raw_link)
+            if remapped_link in valid_canonical_ids:
+                graph.add_edge(graph.index[id_map.get(raw_source, raw_source)], graph.index[remapped_link])
+
+        return graph
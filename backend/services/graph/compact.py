@@ -0,0 +1,149 @@
+"""
+compactgraph: internal graph representation for the build/filter/connect stages.
+node ids are interned to ints; adjacency and aliases are insertion-ordered sets
+(dicts with None values) so membership checks are O(1) and output order is stable.
+converts to and from schemas.graph.GraphData only at the pipeline edges.
+"""
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from schemas.graph import GraphData, GraphNode
+
+
+class CompactGraph:
+    """directed concept graph with interned integer ids and symmetric in/out adjacency"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.out_adj: List[Dict[int, None]] = []
+        self.in_adj: List[Dict[int, None]] = []
+        self.aliases: List[Dict[str, None]] = []
+        self.content: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.index
+
+    def intern(self, node_id: str) -> int:
+        """returns the int id for node_id, adding an empty node if unseen"""
+        idx = self.index.get(node_id)
+        if idx is None:
+            idx = len(self.ids)
+            self.index[node_id] = idx
+            self.ids.append(node_id)
+            self.out_adj.append({})
+            self.in_adj.append({})
+            self.aliases.append({})
+            self.content.append(None)
+        return idx
+
+    def add_aliases(self, idx: int, aliases: Iterable[str]):
+        table = self.aliases[idx]
+        for alias in aliases:
+            table[alias] = None
+
+    def add_edge(self, src: int, dst: int) -> bool:
+        """adds src -> dst (and the mirrored inbound entry). self-loops are ignored. returns True if new."""
+        if src == dst or dst in self.out_adj[src]:
+            return False
+        self.out_adj[src][dst] = None
+        self.in_adj[dst][src] = None
+        return True
+
+    def has_edge(self, src: int, dst: int) -> bool:
+        return dst in self.out_adj[src]
+
+    def degree(self, idx: int) -> int:
+        """undirected degree (distinct neighbours)"""
+        out_nbrs = self.out_adj[idx]
+        return len(out_nbrs) + sum(1 for n in self.in_adj[idx] if n not in out_nbrs)
+
+    def neighbors(self, idx: int) -> Iterator[int]:
+        """undirected neighbours"""
+        yield from self.out_adj[idx]
+        out_nbrs = self.out_adj[idx]
+        for n in self.in_adj[idx]:
+            if n not in out_nbrs:
+                yield n
+
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        for src, targets in enumerate(self.out_adj):
+            for dst in targets:
+                yield src, dst
+
+    def components(self) -> List[List[int]]:
+        """weakly connected components (bfs, linear in nodes + edges)"""
+        seen = [False] * len(self.ids)
+        components = []
+        for start in range(len(self.ids)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            queue = deque([start])
+            component = []
+            while queue:
+                node = queue.popleft()
+                component.append(node)
+                for nbr in self.neighbors(node):
+                    if not seen[nbr]:
+                        seen[nbr] = True
+                        queue.append(nbr)
+            components.append(component)
+        return components
+
+    def without(self, drop: Set[int]) -> "CompactGraph":
+        """returns a new graph without the given nodes (and every edge touching them)"""
+        g = CompactGraph()
+        remap: Dict[int, int] = {}
+        for idx, node_id in enumerate(self.ids):
+            if idx in drop:
+                continue
+            new = g.intern(node_id)
+            remap[idx] = new
+            g.aliases[new] = dict(self.aliases[idx])
+            g.content[new] = self.content[idx]
+        for src, dst in self.edges():
+            if src in remap and dst in remap:
+                g.add_edge(remap[src], remap[dst])
+        return g
+
+    @classmethod
+    def from_graph_data(cls, graph_data: GraphData) -> "CompactGraph":
+        """
+        interns every node, then every link between existing nodes.
+        outbound and inbound lists are unioned into one directed edge set; dangling links are dropped.
+        """
+        g = cls()
+        for node in graph_data.nodes:
+            idx = g.intern(node.id)
+            g.add_aliases(idx, node.aliases)
+            if node.content is not None:
+                g.content[idx] = node.content
+        index = g.index
+        for node in graph_data.nodes:
+            idx = index[node.id]
+            for target in node.outbound_links:
+                dst = index.get(target)
+                if dst is not None:
+                    g.add_edge(idx, dst)
+            for source in node.inbound_links:
+                src = index.get(source)
+                if src is not None:
+                    g.add_edge(src, idx)
+        return g
+
+    def to_graph_data(self) -> GraphData:
+        ids = self.ids
+        return GraphData(nodes=[
+            GraphNode(
+                id=node_id,
+                content=self.content[idx],
+                aliases=list(self.aliases[idx]),
+                outbound_links=[ids[t] for t in self.out_adj[idx]],
+                inbound_links=[ids[s] for s in self.in_adj[idx]],
+            )
+            for idx, node_id in enumerate(ids)
+        ])
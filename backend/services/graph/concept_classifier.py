@@ -0,0 +1,170 @@
+"""
+conceptclassifier: embedding knn fast path for invalid-concept detection.
+concepts are scored against labelled exemplar embeddings (bundled seeds + verdicts learned from
+the llm validator); only the uncertain band between the two thresholds goes to the llm.
+learned verdicts are scoped to one owner (user, or project without one), so one upload's
+validator verdicts never shift another tenant's classification.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.config import get_settings
+from services.embedding_service import EmbeddingService
+from services.graph.exemplars import INVALID_EXEMPLARS, VALID_EXEMPLARS
+from services.kv_cache import content_key, get_kv_cache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# exemplar matrix of the last (embedding model, exemplar set) seen by this process
+_exemplar_matrix: Dict[Tuple, np.ndarray] = {}
+
+
+def knn_scores(queries: np.ndarray, exemplars: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    similarity-weighted vote of the k nearest exemplars (cosine; rows must be unit length).
+    returns (score in [0, 1] where 1 = all neighbours invalid, similarity of the nearest exemplar).
+    """
+    k = min(k, len(exemplars))
+    sims = queries @ exemplars.T
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    weights = np.clip(top_sims, 1e-6, None)
+    scores = (weights * labels[top]).sum(axis=1) / weights.sum(axis=1)
+    return scores, top_sims.max(axis=1)
+
+
+def _exemplar_text(concept_id: str) -> str:
+    # light normalization only: the text itself is what gets embedded
+    return " ".join(concept_id.lower().split())
+
+
+def _unit_rows(vectors: List[List[float]]) -> np.ndarray:
+    X = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return X / norms
+
+
+class ConceptKNNClassifier:
+    """
+    decides clearly invalid / clearly valid concept ids locally from their embeddings.
+    learn() folds validator verdicts back into the scope's exemplar set so the uncertain band shrinks over time.
+    """
+
+    LEARNED_NAMESPACE = "concept_exemplars"
+    MAX_LEARNED = 4000  # verdict entries per scope, newest kept
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        scope: Optional[str] = None,
+        k: int = None,
+        invalid_score: float = None,
+        valid_score: float = None,
+        min_similarity: float = None,
+        cache=None,
+        use_cache: bool = True,
+    ):
+        self.embedder = embedder
+        self.k = k or settings.CONCEPT_KNN_K
+        self.invalid_score = settings.CONCEPT_KNN_INVALID_SCORE if invalid_score is None else invalid_score
+        self.valid_score = settings.CONCEPT_KNN_VALID_SCORE if valid_score is None else valid_score
+        self.min_similarity = settings.CONCEPT_KNN_MIN_SIMILARITY if min_similarity is None else min_similarity
+        # no scope -> bundled seeds only (nothing is learned into a shared pool)
+        self.cache = (cache or get_kv_cache(self.LEARNED_NAMESPACE)) if use_cache and scope else None
+        self.learned_key = f"learned:{scope}"
+        self.last_stats = {"invalid": 0, "valid": 0, "uncertain": 0, "exemplars": 0}
+
+    async def partition(self, concept_ids: List[str]) -> Tuple[Set[str], Set[str], List[str]]:
+        """returns (invalid ids, valid ids, uncertain ids for the llm). on any failure everything is uncertain."""
+        self.last_stats = {"invalid": 0, "valid": 0, "uncertain": len(concept_ids), "exemplars": 0}
+        if not concept_ids:
+            return set(), set(), []
+
+        try:
+            texts, labels = await self._exemplars()
+            E = await self._embed_exemplars(texts)
+            Q = _unit_rows(await self.embedder.aget_embeddings(concept_ids))
+        except Exception as e:
+            logger.warning(f"knn concept classifier unavailable, deferring all to validator: {e}")
+            return set(), set(), list(concept_ids)
+
+        scores, nearest = knn_scores(Q, E, np.asarray(labels, dtype=np.float32), self.k)
+
+        invalid, valid, uncertain = set(), set(), []
+        for concept_id, score, sim in zip(concept_ids, scores, nearest):
+            if sim < self.min_similarity:
+                uncertain.append(concept_id)
+            elif score >= self.invalid_score:
+                invalid.add(concept_id)
+            elif score <= self.valid_score:
+                valid.add(concept_id)
+            else:
+                uncertain.append(concept_id)
+
+        self.last_stats = {
+            "invalid": len(invalid),
+            "valid": len(valid),
+            "uncertain": len(uncertain),
+            "exemplars": len(texts),
+        }
+        logger.info(f"knn concept classifier: {self.last_stats}")
+        return invalid, valid, uncertain
+
+    async def learn(self, verdicts: Dict[str, bool]):
+        """
+        appends validator verdicts ({concept id: is invalid}) to the scope's learned list.
+        an append (not a read-modify-write) so concurrent ingestions can't overwrite each other.
+        """
+        if self.cache is None or not verdicts:
+            return
+        entries = [[_exemplar_text(c), 1 if is_invalid else 0] for c, is_invalid in verdicts.items()]
+        try:
+            await asyncio.to_thread(self.cache.append, self.learned_key, entries, self.MAX_LEARNED)
+        except Exception as e:
+            logger.warning(f"failed to store learned concept exemplars: {e}")
+
+    async def learned(self) -> Dict[str, int]:
+        """learned verdicts for the scope ({exemplar text: label}); later entries win"""
+        if self.cache is None:
+            return {}
+        entries = await asyncio.to_thread(self.cache.get_list, self.learned_key)
+        return {text: label for text, label in entries}
+
+    async def _exemplars(self) -> Tuple[List[str], List[int]]:
+        """bundled seeds overridden by learned verdicts. labels: 1 = invalid, 0 = valid."""
+        merged = {_exemplar_text(t): 1 for t in INVALID_EXEMPLARS}
+        merged.update({_exemplar_text(t): 0 for t in VALID_EXEMPLARS})
+        try:
+            merged.update(await self.learned())
+        except Exception as e:
+            logger.warning(f"failed to load learned concept exemplars: {e}")
+        texts = sorted(merged)
+        return texts, [merged[t] for t in texts]
+
+    async def _embed_exemplars(self, texts: List[str]) -> np.ndarray:
+        key = (
+            self.embedder.provider,
+            self.embedder.model,
+            self.embedder.dimensions,
+            content_key(texts),
+        )
+        matrix = _exemplar_matrix.get(key)
+        if matrix is None:
+            matrix = _unit_rows(await self.embedder.aget_embeddings(texts))
+            _exemplar_matrix.clear()
+            _exemplar_matrix[key] = matrix
+        return matrix
+
+
+def get_knn_classifier(
+    embedder: Optional[EmbeddingService], scope: Optional[str] = None
+) -> Optional[ConceptKNNClassifier]:
+    """None when disabled or without an embedder. scope: owner whose learned exemplars are used"""
+    if embedder is None or not settings.CONCEPT_KNN_ENABLED:
+        return None
+    return ConceptKNNClassifier(embedder, scope=scope)
@@ -1,8 +1,8 @@
-from typing import List, Set, Dict, Any
-import networkx as nx
+from typing import List
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from schemas.graph import GraphData, GraphNode
+from schemas.graph import GraphData
+from services.graph.compact import CompactGraph
 from services.embedding_service import EmbeddingService
 import logging
 
@@ -23,22 +23,18 @@ class GraphConnector:
             raise ValueError("EmbeddingService not initialized in GraphConnector. Provide keys or an instance.")
         return self._embeddings
 
-    def connect_orphans(self, graph_data: GraphData) -> GraphData:
-        # build networkx graph (undirected for component analysis)
-        G = nx.Graph()
-        node_map = {n.id: n for n in graph_data.nodes}
-        G.add_nodes_from(node_map.keys())
-        
-        for n in graph_data.nodes:
-            for target in n.outbound_links:
-                if target in node_map:
-                    G.add_edge(n.id, target)
-        
-        # identify components
-        components = list(nx.connected_components(G))
+    async def connect_orphans(self, graph_data: GraphData) -> GraphData:
+        graph = CompactGraph.from_graph_data(graph_data)
+        graph = await self.connect_orphans_compact(graph)
+        return graph.to_graph_data()
+
+    async def connect_orphans_compact(self, graph: CompactGraph) -> CompactGraph:
+        """bridges every orphan component to the main one. mutates and returns graph."""
+        # identify components (undirected)
+        components = graph.components()
         if len(components) <= 1:
             logger.info("graph is already fully connected.")
-            return graph_data
+            return graph
             
         # sort by size (largest is main)
         components.sort(key=len, reverse=True)
@@ -48,25 +44,32 @@ class GraphConnector:
         logger.info(f"dimensions: main component={len(main_component)} nodes. orphans={len(orphans)}.")
         
         # get embeddings for main component representatives (top nodes by degree)
-        main_reps = self._get_representatives(G, main_component, limit=50)
+        main_reps = self._get_representatives(graph, main_component, limit=50)
         if not main_reps:
-            return graph_data
-            
+            return graph
+
+        # representatives for every orphan, embedded together with the main reps in one batched call
+        orphan_rep_lists = [self._get_representatives(graph, orphan, limit=10) for orphan in orphans]
+        all_reps = main_reps + [rep for reps in orphan_rep_lists for rep in reps]
+
         try:
-            main_emb = self.embeddings.get_embeddings(main_reps)
+            all_emb = await self.embeddings.aget_embeddings([graph.ids[i] for i in all_reps])
         except Exception as e:
-            logger.error(f"failed to get embeddings for main component: {e}")
-            return graph_data
+            logger.error(f"failed to get embeddings for graph components: {e}")
+            return graph
+
+        main_emb = all_emb[:len(main_reps)]
+        offset = len(main_reps)
 
         # link each orphan
-        for orphan in orphans:
-            orphan_reps = self._get_representatives(G, orphan, limit=10)
+        for orphan_reps in orphan_rep_lists:
             if not orphan_reps:
                 continue
+
+            orphan_emb = all_emb[offset:offset + len(orphan_reps)]
+            offset += len(orphan_reps)
                 
             try:
-                orphan_emb = self.embeddings.get_embeddings(orphan_reps)
-                
                 # compute similarity matrix (orphans x main)
                 sim_matrix = cosine_similarity(orphan_emb, main_emb)
                 
@@ -77,32 +80,22 @@ class GraphConnector:
                 score = sim_matrix[i, j]
                 
                 if score > 0.25: # lenient threshold to ensure connectivity
-                    logger.info(f"bridging orphan '{best_orphan_node}' -> main '{best_main_node}' (score: {score:.2f})")
-                    
-                    # update graph data objects
-                    orphan_obj = node_map[best_orphan_node]
-                    main_obj = node_map[best_main_node]
-                    
-                    # add bidirectional link
-                    if best_main_node not in orphan_obj.outbound_links:
-                        orphan_obj.outbound_links.append(best_main_node)
-                    
-                    # update inbound for consistency
-                    if best_orphan_node not in main_obj.inbound_links:
-                        main_obj.inbound_links.append(best_orphan_node)
+                    logger.info(
+                        f"bridging orphan '{graph.ids[best_orphan_node]}' -> main '{graph.ids[best_main_node]}' "
+                        f"(score: {score:.2f})"
+                    )
+                    # outbound on the orphan, mirrored inbound on the main node
+                    graph.add_edge(best_orphan_node, best_main_node)
                 else:
-                    logger.warning(f"orphan {orphan_reps[0]}... has no close semantic match (max: {score:.2f})")
+                    logger.warning(f"orphan {graph.ids[orphan_reps[0]]}... has no close semantic match (max: {score:.2f})")
                     
             except Exception as e:
-                logger.error(f"failed to bridge orphan component {orphan_reps}: {e}")
+                logger.error(f"failed to bridge orphan component {[graph.ids[r] for r in orphan_reps]}: {e}")
                 continue
 
-        return graph_data
+        return graph
 
-    def _get_representatives(self, G: nx.Graph, component: Set[str], limit: int = 5) -> List[str]:
+    def _get_representatives(self, graph: CompactGraph, component: List[int], limit: int = 5) -> List[int]:
         """selects high-degree nodes to represent a cluster"""
-        subgraph = G.subgraph(component)
-        # sort by degree (descending)
-        nodes_by_degree = sorted(subgraph.degree, key=lambda x: x[1], reverse=True)
-        # return ids
-        return [n for n, d in nodes_by_degree[:limit]]
+        # components are closed under adjacency, so global degree == degree within the component
+        return sorted(component, key=graph.degree, reverse=True)[:limit]
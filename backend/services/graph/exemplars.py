@@ -0,0 +1,58 @@
+"""
+exemplars: bundled seed exemplars for the embedding knn concept classifier.
+texts, not vectors, so they work with whichever embedding provider the project uses
+(their embeddings go through the shared embedding cache like any other text).
+"""
+
+# ids the validator rejects: document structure, metadata, dates, people, publishers, boilerplate
+INVALID_EXEMPLARS = [
+    # document structure
+    "chapter 1", "chapter summary", "section 3.2", "introduction", "preface", "foreword", "appendix b",
+    "table of contents", "index", "references", "bibliography", "further reading", "exercises",
+    "review questions", "practice problems", "solutions to exercises", "answers to odd-numbered problems",
+    "learning objectives", "key terms", "worked example", "example 4", "figure 2.1", "table 5",
+    "lecture notes", "lecture 12", "homework 3", "problem set 2", "midterm review", "final exam",
+    "course outline", "syllabus", "acknowledgements", "about the author", "notation", "glossary",
+    # metadata
+    "isbn", "doi", "copyright", "all rights reserved", "second edition", "revised edition",
+    "draft version", "errata", "page 14", "creative commons license", "printed in the united states",
+    "version 2.1", "last updated", "course code math 137", "university of waterloo", "department of mathematics",
+    # dates and times
+    "march 2019", "1 january 2020", "spring 2022", "fall term", "winter semester", "the 1990s", "19th century",
+    "week 3", "monday", "due date",
+    # people
+    "isaac newton", "gottfried leibniz", "leonhard euler", "carl friedrich gauss", "bernhard riemann",
+    "augustin-louis cauchy", "david hilbert", "emmy noether", "ada lovelace", "alan turing", "marie curie",
+    "charles darwin", "adam smith", "john maynard keynes", "sigmund freud", "the author", "professor smith",
+    "dr. jones", "instructor", "teaching assistant", "students",
+    # publishers and institutions
+    "pearson", "mcgraw-hill", "cengage learning", "springer", "wiley", "oxford university press",
+    "cambridge university press", "openstax", "mit opencourseware", "khan academy", "elsevier",
+    # boilerplate
+    "see also", "note", "remark", "recall", "for example", "in this chapter", "key takeaways",
+    "summary of results", "questions", "click here", "online resources",
+]
+
+# ids the validator keeps: concepts from a spread of subjects, including ones named after people
+VALID_EXEMPLARS = [
+    # mathematics
+    "limit", "derivative", "integral", "chain rule", "fundamental theorem of calculus", "taylor series",
+    "riemann sum", "eigenvalue", "eigenvector", "linear transformation", "determinant", "vector space",
+    "matrix multiplication", "gaussian elimination", "newton's method", "euler's formula", "cauchy sequence",
+    "prime number", "group homomorphism", "probability distribution", "bayes' theorem", "normal distribution",
+    "hypothesis testing", "differential equation", "fourier transform", "gradient descent", "convex function",
+    # sciences
+    "photosynthesis", "cellular respiration", "mitochondria", "natural selection", "dna replication",
+    "protein synthesis", "enzyme kinetics", "covalent bond", "oxidation state", "chemical equilibrium",
+    "entropy", "kinetic energy", "newton's second law", "electromagnetic induction", "quantum tunneling",
+    "wave-particle duality", "thermodynamic cycle", "plate tectonics", "carbon cycle", "ecosystem",
+    # computing
+    "binary search", "hash table", "recursion", "dynamic programming", "big o notation", "turing machine",
+    "linked list", "graph traversal", "compiler", "operating system scheduling", "neural network",
+    "backpropagation", "public key cryptography", "tcp handshake",
+    # social sciences and humanities
+    "supply and demand", "opportunity cost", "inflation", "comparative advantage", "keynesian economics",
+    "game theory", "classical conditioning", "cognitive dissonance", "social contract", "utilitarianism",
+    "categorical imperative", "industrial revolution", "cold war", "renaissance", "feudalism",
+    "separation of powers", "judicial review", "sonnet", "metaphor", "narrative structure",
+]
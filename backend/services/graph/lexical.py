@@ -0,0 +1,146 @@
+"""
+lexical: deterministic pre-resolution of trivially equivalent concept ids.
+collapses case, whitespace, edge punctuation, hyphen vs space, leading articles and regular
+plurals before any embedding call, so only one representative per group reaches semantic
+clustering. it only merges ids the semantic stage would merge anyway: irregular or ambiguous
+plurals ("bases", "series") and short stems are left alone, and acronym aliases are not merged
+here but returned as hints for the semantic stage (acronym_hints).
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from schemas.graph import GraphNode
+
+LEADING_ARTICLE = re.compile(r"^(the|a|an)\s+")
+SEPARATORS = re.compile(r"[-_/]+")
+EDGE_PUNCTUATION = re.compile(r"^[\s\"'`.,;:()\[\]]+|[\s\"'`.,;:()\[\]]+$")
+WHITESPACE = re.compile(r"\s+")
+
+# words skipped when forming acronyms ("fundamental theorem of calculus" -> "ftc")
+ACRONYM_STOPWORDS = {"of", "the", "and", "in", "for", "on", "to", "a", "an"}
+
+
+# words that end like plurals but are singular, invariant, or ambiguous ("bases": base or basis)
+PLURAL_EXCEPTIONS = {
+    "series", "species", "bases", "axes", "analyses", "theses", "crises", "diagnoses", "hypotheses",
+    "ellipses", "oases", "news", "lens", "gas", "bias", "alias", "atlas", "canvas", "chaos", "cosmos",
+    "ethos", "pathos", "kudos", "thermos", "means",
+}
+# -ies / -ches plurals of words ending in -ie / -che
+IE_SINGULARS = {"movie", "cookie", "calorie", "zombie", "rookie", "brownie", "prairie", "genie", "selfie"}
+CHE_SINGULARS = {"ache", "avalanche", "cache", "cliche", "headache", "moustache", "niche"}
+# shorter stems are too ambiguous to strip ("sets", "bus", "boxes")
+MIN_STEM = 4
+
+
+def singularize(word: str) -> str:
+    """guarded english singular form: regular plurals only, unchanged when in doubt"""
+    if word in PLURAL_EXCEPTIONS or word.endswith(("ss", "us", "is", "ics")):
+        return word
+    if word.endswith("ies"):
+        if word[:-1] in IE_SINGULARS:
+            return word[:-1]
+        stem = word[:-3]
+        return stem + "y" if len(stem) >= MIN_STEM else word
+    if word.endswith(("sses", "shes", "ches", "xes", "zzes")):
+        if word[:-1] in CHE_SINGULARS:
+            return word[:-1]
+        stem = word[:-2]
+        return stem if len(stem) >= MIN_STEM else word
+    if word.endswith("s") and len(word) - 1 >= MIN_STEM:
+        return word[:-1]
+    return word
+
+
+def normalize_concept_id(concept_id: str) -> str:
+    """lexical key: lowercase, unified separators, no leading article, singular last word"""
+    key = concept_id.strip().lower()
+    key = SEPARATORS.sub(" ", key)
+    key = EDGE_PUNCTUATION.sub("", key)
+    key = WHITESPACE.sub(" ", key).strip()
+    stripped = LEADING_ARTICLE.sub("", key)
+    if stripped:
+        key = stripped
+    words = key.split(" ")
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+def is_acronym_of(alias: str, concept_id: str) -> bool:
+    """true if alias is a single-token acronym of concept_id's initials (with or without stopwords)"""
+    alias = alias.strip().lower().replace(".", "")
+    if not alias.isalpha() or not 2 <= len(alias) <= 8:
+        return False
+    words = [w for w in SEPARATORS.sub(" ", concept_id.lower()).split() if w]
+    if len(words) < 2:
+        return False
+    full = "".join(w[0] for w in words)
+    content = "".join(w[0] for w in words if w not in ACRONYM_STOPWORDS)
+    return alias in (full, content)
+
+
+class _UnionFind:
+    def __init__(self, items: Iterable[str]):
+        self.parent = {i: i for i in items}
+
+    def find(self, a: str) -> str:
+        root = a
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[a] != root:
+            self.parent[a], a = root, self.parent[a]
+        return root
+
+    def union(self, a: str, b: str):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def lexical_groups(raw_nodes: List[GraphNode], raw_id_counts: Counter = None) -> Dict[str, List[str]]:
+    """
+    groups unique raw ids with the same normalized key.
+    returns {representative: [member ids]}; the representative is the most frequent member.
+    """
+    raw_id_counts = raw_id_counts or Counter(n.id for n in raw_nodes)
+    unique_ids = list(raw_id_counts)
+    uf = _UnionFind(unique_ids)
+
+    # same normalized key
+    by_key: Dict[str, str] = {}
+    for node_id in unique_ids:
+        key = normalize_concept_id(node_id)
+        if key in by_key:
+            uf.union(by_key[key], node_id)
+        else:
+            by_key[key] = node_id
+
+    members: Dict[str, List[str]] = {}
+    for node_id in unique_ids:
+        members.setdefault(uf.find(node_id), []).append(node_id)
+
+    groups = {}
+    for group in members.values():
+        rep = max(group, key=lambda x: raw_id_counts[x])
+        groups[rep] = group
+    return groups
+
+
+def acronym_hints(raw_nodes: List[GraphNode], groups: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """
+    representative pairs linked by an acronym alias that is itself an extracted id ("svd" alias on
+    "singular value decomposition", or the reverse). a hint only: the semantic stage decides.
+    """
+    rep_of = {member: rep for rep, members in groups.items() for member in members}
+    rep_by_key = {normalize_concept_id(member): rep for member, rep in rep_of.items()}
+    hints = set()
+    for n in raw_nodes:
+        rep = rep_of.get(n.id)
+        for alias in n.aliases:
+            other = rep_by_key.get(normalize_concept_id(alias))
+            if rep is None or other is None or other == rep:
+                continue
+            if is_acronym_of(alias, n.id) or is_acronym_of(n.id, alias):
+                hints.add(tuple(sorted((rep, other))))
+    return sorted(hints)
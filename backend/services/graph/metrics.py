@@ -1,6 +1,7 @@
 from typing import Dict
 import networkx as nx
 from schemas.graph import GraphData
+from services.graph.compact import CompactGraph
 
 class GraphMetrics:
     """
@@ -10,14 +11,16 @@ class GraphMetrics:
     @staticmethod
     def calculate_pagerank(graph: GraphData) -> Dict[str, float]:
         """calculates pagerank for all nodes based on directed outbound edges."""
-        G = nx.DiGraph()
-        
-        for node in graph.nodes:
-            G.add_node(node.id)
-            for neighbor in node.outbound_links:
-                G.add_edge(node.id, neighbor)
-                
-        if len(G) == 0:
+        return GraphMetrics.calculate_pagerank_compact(CompactGraph.from_graph_data(graph))
+
+    @staticmethod
+    def calculate_pagerank_compact(graph: CompactGraph) -> Dict[str, float]:
+        """pagerank over interned ids; networkx only sees ints, ids are mapped back at the end."""
+        if len(graph) == 0:
             return {}
-            
-        return nx.pagerank(G)
+
+        G = nx.DiGraph()
+        G.add_nodes_from(range(len(graph)))
+        G.add_edges_from(graph.edges())
+
+        return {graph.ids[idx]: score for idx, score in nx.pagerank(G).items()}
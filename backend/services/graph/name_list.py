@@ -0,0 +1,30 @@
+"""
+namelist: bundled given names for the person-name rule in node_filter.
+deliberately excludes names that are also common technical words (ray, norm, max, mark, will, ...).
+"""
+
+FIRST_NAMES = frozenset("""
+aaron abraham adam adolf adrien agnes alan albert alberto alessandro alexander alexandre alexei alfred alice
+alonzo amalie anatoly andre andrea andreas andrei andrew andrey angela ann anna anne antoine anton antonio
+arthur august augustin augustus barbara benjamin benoit bernhard bertrand blaise boris brian brook bruno
+camille carl carlo carlos caroline catherine charles christian christiaan christoph christopher claude
+claudia colin daniel david dmitri donald dorothy edmund edward edwin elena elias elizabeth emil emile emilie
+emmy enrico eric erich ernst evariste felix ferdinand francesco francis francois frederick friedrich gabriel
+galileo gaspard george georg georges gerhard giovanni girolamo giuseppe gottfried gottlob gregor guillaume
+gustav hans harald harold heinrich helmut henri henrik henry hermann hilbert howard hugo isaac ivan jacob
+jacques jakob james jan janos jean jerzy johann johannes john jonathan jose josef joseph julia julius jurgen
+karl katherine kenneth klaus kurt lars laurent leonardo leonhard leopold lev lord louis ludwig luigi luitzen
+marcel margaret maria marie marin mario martin mary maurice michael michel mikhail nathan nicolas
+nicolaus niccolo niels nikolai nikolaus norbert olga oliver oswald otto paul pavel peter philip philipp pierre
+pieter pyotr rene richard robert roger ronald rudolf samuel sergei simon sofia sophie srinivasa stefan stephen
+sylvester thomas tullio vladimir walter werner wilhelm william wolfgang yuri
+""".split())
+
+# last words that make "<first name> <word>" a concept rather than a person ("john's theorem" style ids
+# are already excluded by the apostrophe; these catch "<name> <concept>" headings)
+CONCEPT_HEADS = frozenset("""
+algebra algorithm approximation axiom bound conjecture constant criterion curve distribution equation
+equations expansion formula function functions identity inequality integral law lemma matrix method
+number numbers paradox polynomial polynomials principle problem process rule series set space spiral
+test theorem transform triangle
+""".split())
@@ -1,13 +1,18 @@
 """
 nodefilter: remove invalid concept nodes (dates, metadata, etc.) from graph.
+a compiled rule engine decides the obvious cases locally; only ambiguous ids go to the llm validator.
 """
 import re
 import logging
-from typing import Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from schemas.graph import GraphData, GraphNode
+from core.config import get_settings
+from schemas.graph import GraphData
+from services.graph.compact import CompactGraph
+from services.graph.name_list import CONCEPT_HEADS, FIRST_NAMES
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # month name + year (e.g. "november 1859", "december 1998")
 DATE_PATTERN = re.compile(
@@ -16,13 +21,145 @@ DATE_PATTERN = re.compile(
 )
 
 
+_MONTH = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_STRUCTURAL = (
+    r"(?:chapter|ch\.|section|sec\.|subsection|figure|fig\.|table|appendix|lecture|part|unit|"
+    r"exercise|problem|example|definition|theorem|lemma|proposition|corollary|remark|equation|eq\.)"
+)
+# well-formed roman numeral (canonical subtractive form, non-empty)
+_ROMAN = r"(?=[mdclxvi])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})"
+# digits may follow directly ("fig.4"); letters need a space so "exercises" is not "exercise s"
+_SECTION_NUMBER = rf"(?:\s*\d+(?:\.\d+)*[a-z]?|\s+(?:{_ROMAN}|[a-z]))"
+_ORDINAL = (
+    r"(?:\d+(?:st|nd|rd|th)|first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|"
+    r"revised|international|student|instructor'?s?)"
+)
+
+# one alternation, one pass: the named group that matched is the rule that fired.
+# every rule is anchored (fullmatch). hard rules only fire on structural forms that are never concepts:
+# words that double as concepts ("example", "index", "review") only count with a number or label,
+# roman numerals only inside a reference ("chapter iv") or as a list heading ("iv.", "(iv)"),
+# metadata only in its document shape ("isbn 978-...", "copyright © 2004", "2nd edition"), and
+# notation only for letterless fragments with punctuation ("(3.2)", "[12]"; "o(n)" and "π" stay).
+# bare numerals, years and integers ("cli", "mcm", "2048", "1024") can be concepts: see SOFT_RULES.
+RULES = [
+    ("date_month_year", rf"{_MONTH}\s+\d{{4}}"),
+    ("date_day_month_year", rf"\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}\s+\d{{4}}"),
+    ("date_month_day_year", rf"{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}"),
+    ("date_iso", r"\d{4}-\d{2}-\d{2}"),
+    ("date_numeric", r"\d{1,2}[/.]\d{1,2}[/.]\d{2,4}"),
+    ("decade", r"(?:1[5-9]|20)\d0s"),
+    ("year", r"(?:1[5-9]|20)\d{2}"),
+    ("roman_heading", rf"\(?{_ROMAN}[.)]"),
+    ("roman_numeral", rf"(?=[mdclxvi]{{3,}}$){_ROMAN}"),
+    ("structural_reference", rf"{_STRUCTURAL}{_SECTION_NUMBER}(?:\s*[-–]{_SECTION_NUMBER})?"),
+    ("page_reference", r"(?:pages?|pp?\.)\s*\d+(?:\s*[-–]\s*\d+)?"),
+    ("document_part", rf"(?:examples?|exercises?|introduction|summary|index|appendix|references|notes|"
+                      rf"homework|solutions?|review|answers?|quiz|assignment|problem set){_SECTION_NUMBER}"),
+    ("front_matter", r"(?:preface|foreword|table of contents|contents|bibliography|acknowledg(?:e)?ments)"),
+    ("document_metadata", rf"(?:{_ORDINAL}\s+edition|isbn(?:-1[03])?:?\s*[\dx][\dx\s-]{{8,}}|"
+                          r"doi:?\s*10\.\d{4,}/\S+|arxiv:?\s*\d{4}\.\d{4,5}(?:v\d+)?|"
+                          r"(?:copyright\s+(?:©|\(c\)|\d{4})|©\s*\d{4}).*|all rights reserved|"
+                          r"preliminary version|errata)"),
+    ("number", r"\d+"),
+    ("notation", r"(?=.*[^\d\s])[\d\s.,;:!?()\[\]{}'\"\-–—_#§•|]+"),
+    ("person_initials", r"(?:[a-z]\.?\s+){2,3}[a-z][a-z'\-]+"),
+]
+
+# heuristic verdicts that can be wrong on real concepts ("otto cycle", "cli", "2048"):
+# reported by classify() but sent to the llm validator as ambiguous instead of being dropped
+SOFT_RULES = {"person_name", "roman_numeral", "year", "number"}
+
+
+def _normalize(concept_id: str) -> str:
+    return re.sub(r"\s+", " ", concept_id.strip().lower())
+
+
+class RuleEngine:
+    """
+    compiled pre-filter for invalid concept ids.
+    deny list and rules are confident "invalid" hits; allow list ids are confidently valid;
+    soft (heuristic) hits and everything else are ambiguous and left to the llm validator.
+    """
+
+    def __init__(self, deny: Iterable[str] = None, allow: Iterable[str] = None):
+        self.deny = {_normalize(d) for d in (deny or []) if d.strip()}
+        self.allow = {_normalize(a) for a in (allow or []) if a.strip()}
+        self.pattern = re.compile("|".join(f"(?P<{name}>{body})" for name, body in RULES))
+
+    def classify(self, concept_id: str) -> Optional[str]:
+        """name of the rule that marks concept_id invalid, "allow" if allow-listed, or None (ambiguous)"""
+        key = _normalize(concept_id)
+        if key in self.allow:
+            return "allow"
+        if key in self.deny:
+            return "deny"
+        m = self.pattern.fullmatch(key)
+        if m:
+            return m.lastgroup
+        if self._looks_like_person(key):
+            return "person_name"
+        return None
+
+    def _looks_like_person(self, key: str) -> bool:
+        """"bernhard riemann", "carl friedrich gauss": known given name + 1-3 plain words, no concept head"""
+        tokens = key.split(" ")
+        if not 2 <= len(tokens) <= 4 or tokens[0] not in FIRST_NAMES:
+            return False
+        if tokens[-1] in CONCEPT_HEADS:
+            return False
+        return all(t.replace("-", "").isalpha() for t in tokens)
+
+    def partition(self, concept_ids: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """returns ({invalid id: rule}, ambiguous ids for the llm). allow-listed ids are in neither."""
+        invalid: Dict[str, str] = {}
+        ambiguous: List[str] = []
+        for concept_id in concept_ids:
+            verdict = self.classify(concept_id)
+            if verdict is None or verdict in SOFT_RULES:
+                ambiguous.append(concept_id)
+            elif verdict != "allow":
+                invalid[concept_id] = verdict
+        return invalid, ambiguous
+
+
+_rule_engine: Optional[RuleEngine] = None
+
+
+def get_rule_engine() -> RuleEngine:
+    """process-wide engine with NODE_FILTER_DENYLIST / NODE_FILTER_ALLOWLIST from settings"""
+    global _rule_engine
+    if _rule_engine is None:
+        _rule_engine = RuleEngine(deny=settings.NODE_FILTER_DENYLIST, allow=settings.NODE_FILTER_ALLOWLIST)
+    return _rule_engine
+
+
+def find_date_like_ids(ids: Iterable[str]) -> Set[str]:
+    """return ids that match date pattern (month + year)."""
+    return {i for i in ids if DATE_PATTERN.match(i.strip())}
+
+
 def get_date_like_ids(graph_data: GraphData) -> Set[str]:
     """return concept ids that match date pattern (month + year)."""
-    invalid = set()
-    for node in graph_data.nodes:
-        if DATE_PATTERN.match(node.id.strip()):
-            invalid.add(node.id)
-    return invalid
+    return find_date_like_ids(n.id for n in graph_data.nodes)
+
+
+def remove_invalid_nodes(graph: CompactGraph, invalid_ids: Set[str]) -> CompactGraph:
+    """
+    remove nodes whose ids are in invalid_ids (case-insensitive), along with every link touching them.
+    returns a new compactgraph (does not mutate input).
+    """
+    if not invalid_ids:
+        return graph
+
+    invalid_lower = {i.lower() for i in invalid_ids}
+    drop = {idx for idx, node_id in enumerate(graph.ids) if node_id.lower() in invalid_lower}
+
+    logger.info(f"filtered {len(invalid_ids)} invalid nodes: {invalid_ids}")
+    return graph.without(drop)
 
 
 def filter_invalid_nodes(graph_data: GraphData, invalid_ids: Set[str]) -> GraphData:
@@ -33,23 +170,5 @@ def filter_invalid_nodes(graph_data: GraphData, invalid_ids: Set[str]) -> GraphD
     """
     if not invalid_ids:
         return graph_data
-
-    invalid_lower = {i.lower() for i in invalid_ids}
-    node_map = {n.id: n for n in graph_data.nodes if n.id.lower() not in invalid_lower}
-
-    # build new nodes with cleaned links
-    new_nodes = []
-    for node in node_map.values():
-        outbound = [t for t in node.outbound_links if t.lower() not in invalid_lower]
-        inbound = [s for s in node.inbound_links if s.lower() not in invalid_lower]
-        new_nodes.append(
-            GraphNode(
-                id=node.id,
-                aliases=node.aliases,
-                outbound_links=outbound,
-                inbound_links=inbound,
-            )
-        )
-
-    logger.info(f"filtered {len(invalid_ids)} invalid nodes: {invalid_ids}")
-    return GraphData(nodes=new_nodes)
+    graph = CompactGraph.from_graph_data(graph_data)
+    return remove_invalid_nodes(graph, invalid_ids).to_graph_data()
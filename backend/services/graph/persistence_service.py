@@ -1,50 +1,202 @@
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from db import models
 from schemas.graph import GraphData
+from typing import Dict, List, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# rows per INSERT ... ON CONFLICT / DELETE statement
+BATCH_SIZE = 500
+
+
+def _canonical(structure) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(sorted(values or [])) for values in structure)
+
+
+def diff_nodes(
+    existing: Dict[str, Tuple[List[str], List[str], List[str]]],
+    graph_data: GraphData,
+) -> Tuple[List[dict], List[str]]:
+    """
+    compares incoming nodes with stored (aliases, outbound_links, inbound_links) by concept_id.
+    list order is ignored: extraction results are folded in completion order, so the same graph
+    can arrive with its links and aliases shuffled.
+    returns (rows to upsert: new or structurally changed, concept ids to delete).
+    """
+    upserts = []
+    seen = set()
+    for node in graph_data.nodes:
+        if node.id in seen:
+            continue
+        seen.add(node.id)
+        structure = (list(node.aliases), list(node.outbound_links), list(node.inbound_links))
+        stored = existing.get(node.id)
+        if stored is not None and _canonical(stored) == _canonical(structure) and node.content is None:
+            continue
+        upserts.append({
+            "concept_id": node.id,
+            "aliases": structure[0],
+            "outbound_links": structure[1],
+            "inbound_links": structure[2],
+            "content": node.content,
+        })
+    deletes = [concept_id for concept_id in existing if concept_id not in seen]
+    return upserts, deletes
+
+
+def edge_set(graph_data: GraphData) -> Set[Tuple[str, str]]:
+    """directed (source, target) pairs from outbound links and reversed inbound links; dangling links dropped"""
+    ids = {node.id for node in graph_data.nodes}
+    edges = set()
+    for node in graph_data.nodes:
+        for target in node.outbound_links:
+            edges.add((node.id, target))
+        for source in node.inbound_links:
+            edges.add((source, node.id))
+    return {(s, t) for s, t in edges if s != t and s in ids and t in ids}
+
+
 class GraphPersistenceService:
     """
     manages saving and retrieving concept graphs from postgresql.
     """
-    
+
     def __init__(self, db: Session):
         self.db = db
+        self.last_stats = {"inserted_or_updated": 0, "deleted": 0, "unchanged": 0, "edges_added": 0, "edges_removed": 0}
 
-    def save_graph(self, project_id: str, graph_data: GraphData):
+    def save_graph(self, project_id: str, graph_data: GraphData, mode: str = "diff"):
         """
-        wipes old nodes for a project and saves the new, consolidated graph state.
-        effectively an atomic refresh for the conceptual network.
+        persists the consolidated graph state for a project.
+        diff (default): upserts new/changed nodes and deletes vanished ones; unchanged rows and
+        every row's generated notes are left alone. replace: wipes the project's nodes and re-inserts.
         """
         try:
-            # 1. remove existing nodes for this project
-            num_deleted = self.db.query(models.GraphNode).filter(
-                models.GraphNode.project_id == project_id
-            ).delete()
-            
-            if num_deleted > 0:
-                logger.info(f"purged {num_deleted} nodes for project {project_id}")
-            
-            # 2. prepare db models from pydantic data
-            db_nodes = []
-            for node in graph_data.nodes:
-                db_nodes.append(models.GraphNode(
-                    project_id=project_id,
-                    concept_id=node.id,
-                    aliases=node.aliases,
-                    outbound_links=node.outbound_links,
-                    inbound_links=node.inbound_links,
-                    node_metadata={} 
-                ))
-            
-            # 3. commit
-            self.db.bulk_save_objects(db_nodes)
+            if mode == "replace":
+                self._replace(project_id, graph_data)
+            else:
+                self._diff(project_id, graph_data)
+            self._invalidate_snapshot(project_id)
             self.db.commit()
-            logger.info(f"successfully persisted {len(db_nodes)} nodes for project {project_id}")
-            
+            logger.info(f"successfully persisted graph for project {project_id}: {self.last_stats}")
+
         except Exception as e:
             self.db.rollback()
             logger.error(f"failed to persist graph for project {project_id}: {e}")
             raise e
+
+    def _invalidate_snapshot(self, project_id: str):
+        # the cached graph payload is stale once nodes change (committed with the node writes)
+        from services.graph.snapshot_service import GraphSnapshotService
+        project = self.db.query(models.Project).filter(models.Project.id == project_id).first()
+        if project is not None:
+            GraphSnapshotService(self.db).invalidate(project, commit=False)
+
+    def _diff(self, project_id: str, graph_data: GraphData):
+        existing = {
+            concept_id: (aliases or [], outbound or [], inbound or [])
+            for concept_id, aliases, outbound, inbound in self.db.query(
+                models.GraphNode.concept_id,
+                models.GraphNode.aliases,
+                models.GraphNode.outbound_links,
+                models.GraphNode.inbound_links,
+            ).filter(models.GraphNode.project_id == project_id)
+        }
+        upserts, deletes = diff_nodes(existing, graph_data)
+
+        table = models.GraphNode.__table__
+        for i in range(0, len(upserts), BATCH_SIZE):
+            stmt = insert(table).values([
+                {**row, "project_id": project_id, "node_metadata": {}}
+                for row in upserts[i:i + BATCH_SIZE]
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.project_id, table.c.concept_id],
+                set_={
+                    "aliases": stmt.excluded.aliases,
+                    "outbound_links": stmt.excluded.outbound_links,
+                    "inbound_links": stmt.excluded.inbound_links,
+                    # incoming graphs rarely carry notes; never overwrite stored ones with null
+                    "content": func.coalesce(stmt.excluded.content, table.c.content),
+                    "updated_at": func.now(),
+                },
+            )
+            self.db.execute(stmt)
+
+        for i in range(0, len(deletes), BATCH_SIZE):
+            self.db.query(models.GraphNode).filter(
+                models.GraphNode.project_id == project_id,
+                models.GraphNode.concept_id.in_(deletes[i:i + BATCH_SIZE]),
+            ).delete(synchronize_session=False)
+
+        stored_edges = set(self.db.query(models.GraphEdge.source, models.GraphEdge.target).filter(
+            models.GraphEdge.project_id == project_id,
+            models.GraphEdge.kind == "link",
+        ))
+        incoming_edges = edge_set(graph_data)
+        added = sorted(incoming_edges - stored_edges)
+        removed = sorted(stored_edges - incoming_edges)
+        self._insert_edges(project_id, added)
+        for i in range(0, len(removed), BATCH_SIZE):
+            self.db.query(models.GraphEdge).filter(
+                models.GraphEdge.project_id == project_id,
+                models.GraphEdge.kind == "link",
+                tuple_(models.GraphEdge.source, models.GraphEdge.target).in_(removed[i:i + BATCH_SIZE]),
+            ).delete(synchronize_session=False)
+
+        self.last_stats = {
+            "inserted_or_updated": len(upserts),
+            "deleted": len(deletes),
+            "unchanged": len(existing) - len(deletes) - sum(1 for r in upserts if r["concept_id"] in existing),
+            "edges_added": len(added),
+            "edges_removed": len(removed),
+        }
+
+    def _insert_edges(self, project_id: str, edges: List[Tuple[str, str]]):
+        table = models.GraphEdge.__table__
+        for i in range(0, len(edges), BATCH_SIZE):
+            self.db.execute(insert(table).values([
+                {"project_id": project_id, "source": source, "target": target, "kind": "link"}
+                for source, target in edges[i:i + BATCH_SIZE]
+            ]).on_conflict_do_nothing())
+
+    def _replace(self, project_id: str, graph_data: GraphData):
+        # 1. remove existing nodes for this project
+        num_deleted = self.db.query(models.GraphNode).filter(
+            models.GraphNode.project_id == project_id
+        ).delete()
+
+        if num_deleted > 0:
+            logger.info(f"purged {num_deleted} nodes for project {project_id}")
+
+        # 2. prepare db models from pydantic data
+        db_nodes = []
+        for node in graph_data.nodes:
+            db_nodes.append(models.GraphNode(
+                project_id=project_id,
+                concept_id=node.id,
+                aliases=node.aliases,
+                outbound_links=node.outbound_links,
+                inbound_links=node.inbound_links,
+                node_metadata={}
+            ))
+
+        # 3. insert
+        self.db.bulk_save_objects(db_nodes)
+
+        # 4. rebuild the edge table slice
+        edges_removed = self.db.query(models.GraphEdge).filter(
+            models.GraphEdge.project_id == project_id
+        ).delete()
+        edges = sorted(edge_set(graph_data))
+        self._insert_edges(project_id, edges)
+        self.last_stats = {
+            "inserted_or_updated": len(db_nodes),
+            "deleted": num_deleted,
+            "unchanged": 0,
+            "edges_added": len(edges),
+            "edges_removed": edges_removed,
+        }
@@ -0,0 +1,145 @@
+"""
+graphqueryservice: indexed neighbourhood and path queries over graph_edges.
+k-hop neighbourhoods are one recursive cte; shortest paths are a level-by-level bfs where each
+level is a single indexed query over the current frontier only.
+"""
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db import models
+
+logger = logging.getLogger(__name__)
+
+MAX_HOPS = 3
+MAX_PATH_DEPTH = 8
+
+# (step condition on edge e from walk row w, neighbour expression)
+_STEPS = {
+    "out": ("e.source = w.node", "e.target"),
+    "in": ("e.target = w.node", "e.source"),
+    "both": ("(e.source = w.node OR e.target = w.node)",
+             "CASE WHEN e.source = w.node THEN e.target ELSE e.source END"),
+}
+
+
+def bfs_path(
+    source: str,
+    target: str,
+    max_depth: int,
+    expand: Callable[[Set[str]], Iterable[Tuple[str, str]]],
+) -> Optional[List[str]]:
+    """
+    shortest path from source to target. expand(frontier) returns (from, to) steps leaving the frontier.
+    returns the node list (source..target) or None if target is not within max_depth.
+    """
+    if source == target:
+        return [source]
+    parent: Dict[str, Optional[str]] = {source: None}
+    frontier = {source}
+    for _ in range(max_depth):
+        next_frontier = set()
+        for node, neighbour in expand(frontier):
+            if node in frontier and neighbour not in parent:
+                parent[neighbour] = node
+                next_frontier.add(neighbour)
+        if target in parent:
+            path = [target]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            return path[::-1]
+        if not next_frontier:
+            return None
+        frontier = next_frontier
+    return None
+
+
+class GraphQueryService:
+    """
+    read-only queries over a project's normalized edges.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def neighborhood(
+        self,
+        project_id: str,
+        concept_id: str,
+        hops: int = 1,
+        direction: str = "both",
+        limit: int = 200,
+    ) -> Dict:
+        """
+        nodes within `hops` of concept_id (with their hop distance) and the edges among them.
+        direction: out (follow links), in (follow backlinks) or both.
+        """
+        hops = max(1, min(hops, MAX_HOPS))
+        condition, neighbour = _STEPS[direction]
+        rows = self.db.execute(text(f"""
+            WITH RECURSIVE walk(node, depth) AS (
+                SELECT CAST(:start AS TEXT), 0
+                UNION
+                SELECT {neighbour}, w.depth + 1
+                FROM walk w
+                JOIN graph_edges e ON e.project_id = :pid AND {condition}
+                WHERE w.depth < :hops
+            )
+            SELECT node, MIN(depth) AS depth
+            FROM walk
+            GROUP BY node
+            ORDER BY depth, node
+            LIMIT :limit
+        """), {"start": concept_id, "pid": project_id, "hops": hops, "limit": limit + 1}).all()
+
+        # one extra row tells a full page from a truncated one
+        truncated = len(rows) > limit
+        depths = {node: depth for node, depth in rows[:limit]}
+        names = list(depths)
+        edges = self.db.query(models.GraphEdge.source, models.GraphEdge.target).filter(
+            models.GraphEdge.project_id == project_id,
+            models.GraphEdge.source.in_(names),
+            models.GraphEdge.target.in_(names),
+        ).all() if len(names) > 1 else []
+        aliases = dict(self.db.query(models.GraphNode.concept_id, models.GraphNode.aliases).filter(
+            models.GraphNode.project_id == project_id,
+            models.GraphNode.concept_id.in_(names),
+        ).all())
+
+        return {
+            "center": concept_id,
+            "hops": hops,
+            "direction": direction,
+            "truncated": truncated,
+            "nodes": [{"id": n, "depth": depths[n], "aliases": aliases.get(n) or []} for n in names],
+            "edges": [{"source": s, "target": t} for s, t in sorted(edges)],
+        }
+
+    def shortest_path(
+        self,
+        project_id: str,
+        source: str,
+        target: str,
+        max_depth: int = 6,
+        directed: bool = False,
+    ) -> Optional[List[str]]:
+        """shortest path source -> target (following link direction only if directed), or None"""
+        max_depth = max(1, min(max_depth, MAX_PATH_DEPTH))
+
+        def expand(frontier: Set[str]) -> List[Tuple[str, str]]:
+            names = list(frontier)
+            outbound = self.db.query(models.GraphEdge.source, models.GraphEdge.target).filter(
+                models.GraphEdge.project_id == project_id,
+                models.GraphEdge.source.in_(names),
+            ).all()
+            if directed:
+                return outbound
+            inbound = self.db.query(models.GraphEdge.target, models.GraphEdge.source).filter(
+                models.GraphEdge.project_id == project_id,
+                models.GraphEdge.target.in_(names),
+            ).all()
+            return outbound + inbound
+
+        return bfs_path(source, target, max_depth, expand)
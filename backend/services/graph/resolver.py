@@ -1,20 +1,54 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import logging
 import numpy as np
 from collections import Counter
 from sklearn.cluster import AgglomerativeClustering
 from schemas.graph import GraphNode
 from services.embedding_service import EmbeddingService
+from services.graph.sparse_linkage import cluster_sparse
+from services.graph.lexical import acronym_hints, lexical_groups
+
+logger = logging.getLogger(__name__)
 
 class EntityResolver:
     """
     Handles conceptual deduplication (entity resolution) within the graph.
-    Uses semantic embeddings + agglomerative clustering to merge near-synonyms.
+    Collapses lexical variants first, then uses semantic embeddings + clustering to merge near-synonyms.
     No LLM. Step 3 Reduce phase.
+
+    method:
+      - "agglomerative": exact average-linkage over the dense distance matrix (O(n^2) time/memory)
+      - "ann": nearest-neighbour candidates + greedy average linkage (see sparse_linkage)
+      - "auto": agglomerative below ann_min_ids unique ids, ann above
+
+    lexical=False skips the lexical stage (every unique id is embedded); acronym aliases that are
+    themselves extracted ids are merged only when their embeddings reach acronym_threshold.
     """
 
-    def __init__(self, clustering_threshold: float = 0.88, embedder: EmbeddingService = None):
+    METHODS = ("auto", "agglomerative", "ann")
+
+    def __init__(
+        self,
+        clustering_threshold: float = 0.88,
+        embedder: EmbeddingService = None,
+        method: str = "auto",
+        ann_min_ids: int = 5000,
+        ann_neighbors: int = 15,
+        ann_dims: int = 128,
+        lexical: bool = True,
+        acronym_threshold: float = 0.8,
+    ):
+        if method not in self.METHODS:
+            raise ValueError(f"unknown resolution method '{method}', expected one of {self.METHODS}")
         self._embedder = embedder
         self.threshold = clustering_threshold
+        self.method = method
+        self.ann_min_ids = ann_min_ids
+        self.ann_neighbors = ann_neighbors
+        self.ann_dims = ann_dims
+        self.lexical = lexical
+        self.acronym_threshold = acronym_threshold
+        self.last_stats: Dict[str, int] = {}
 
     @property
     def embedder(self) -> EmbeddingService:
@@ -22,46 +56,106 @@ class EntityResolver:
             raise ValueError("EmbeddingService not initialized in EntityResolver. Provide keys or an instance.")
         return self._embedder
 
-    def get_id_map(self, raw_nodes: List[GraphNode]) -> Dict[str, str]:
+    async def get_id_map(self, raw_nodes: List[GraphNode], raw_id_counts: Counter = None) -> Dict[str, str]:
         """
-        computes mapping from original ids to resolved canonical ids
+        computes mapping from original ids to resolved canonical ids.
+        lexically equivalent ids are grouped first; only one representative per group is embedded.
+        raw_nodes may be a summary (one node per unique id) when raw_id_counts carries the occurrence counts.
         """
+        self.last_stats = {"unique_ids": 0, "lexical_removed": 0, "embedded": 0, "acronym_merges": 0}
         if not raw_nodes:
             return {}
 
-        unique_ids = list(set(n.id for n in raw_nodes))
+        raw_id_counts = raw_id_counts or Counter(n.id for n in raw_nodes)
+        unique_ids = list(raw_id_counts)
         if len(unique_ids) < 2:
             return {node_id: node_id for node_id in unique_ids}
 
-        # embed and normalize
-        embeddings = self.embedder.get_embeddings(unique_ids)
-        X = np.array(embeddings)
-        norms = np.linalg.norm(X, axis=1, keepdims=True)
-        norms[norms == 0] = 1
-        X_norm = X / norms
-
-        # cluster similar entities
-        dist_threshold = np.sqrt(2 * (1 - self.threshold))
-        clustering = AgglomerativeClustering(
-            n_clusters=None,
-            distance_threshold=dist_threshold,
-            metric="euclidean",
-            linkage="average"
+        # lexical stage: case, separators, articles, regular plurals
+        if self.lexical:
+            groups = lexical_groups(raw_nodes, raw_id_counts)
+            hints = acronym_hints(raw_nodes, groups)
+        else:
+            groups, hints = {node_id: [node_id] for node_id in unique_ids}, []
+        representatives = list(groups)
+        self.last_stats = {
+            "unique_ids": len(unique_ids),
+            "lexical_removed": len(unique_ids) - len(representatives),
+            "embedded": len(representatives),
+            "acronym_merges": 0,
+        }
+        logger.info(
+            f"lexical pre-resolution: {len(unique_ids)} ids -> {len(representatives)} representatives "
+            f"({self.last_stats['lexical_removed']} removed before embedding)"
         )
-        labels = clustering.fit_predict(X_norm)
 
-        # form clusters
+        # semantic stage over representatives only
+        if len(representatives) < 2:
+            labels = [0] * len(representatives)
+        else:
+            embeddings = np.asarray(await self.embedder.aget_embeddings(representatives), dtype=np.float32)
+            labels = self.cluster(embeddings)
+            if hints:
+                labels = self._apply_acronym_hints(representatives, embeddings, labels, hints)
+
+        # form clusters (each representative brings its whole lexical group)
         clusters: Dict[int, List[str]] = {}
-        for node_id, label in zip(unique_ids, labels):
-            clusters.setdefault(label, []).append(node_id)
+        for rep, label in zip(representatives, labels):
+            clusters.setdefault(label, []).extend(groups[rep])
 
         # canonicalize each cluster (pick most frequent id)
         id_map = {}
-        raw_id_counts = Counter(n.id for n in raw_nodes)
-
         for group in clusters.values():
             canonical = max(group, key=lambda x: raw_id_counts[x])
             for node_id in group:
                 id_map[node_id] = canonical
 
         return id_map
+
+    def _apply_acronym_hints(
+        self, representatives: List[str], X: np.ndarray, labels, hints: List[Tuple[str, str]]
+    ) -> List[int]:
+        """joins the clusters of hinted (acronym, expansion) pairs whose cosine reaches acronym_threshold"""
+        index = {rep: i for i, rep in enumerate(representatives)}
+        norms = np.linalg.norm(X, axis=1)
+        norms[norms == 0] = 1
+        relabel = {label: label for label in labels}
+
+        def find(label):
+            while relabel[label] != label:
+                label = relabel[label]
+            return label
+
+        for a, b in hints:
+            i, j = index[a], index[b]
+            la, lb = find(labels[i]), find(labels[j])
+            if la == lb:
+                continue
+            if float(X[i] @ X[j]) / (norms[i] * norms[j]) >= self.acronym_threshold:
+                relabel[lb] = la
+                self.last_stats["acronym_merges"] += 1
+        return [find(label) for label in labels]
+
+    def cluster(self, X: np.ndarray) -> np.ndarray:
+        """returns a cluster label per row of X (raw embeddings, normalized here)"""
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        X_norm = X / norms
+
+        method = self.method
+        if method == "auto":
+            method = "ann" if len(X_norm) >= self.ann_min_ids else "agglomerative"
+        logger.info(f"resolving {len(X_norm)} ids with {method} clustering")
+
+        if method == "ann":
+            return cluster_sparse(X_norm, self.threshold, k=self.ann_neighbors, dims=self.ann_dims)
+
+        # cluster similar entities
+        dist_threshold = np.sqrt(2 * (1 - self.threshold))
+        clustering = AgglomerativeClustering(
+            n_clusters=None,
+            distance_threshold=dist_threshold,
+            metric="euclidean",
+            linkage="average"
+        )
+        return clustering.fit_predict(X_norm.astype(np.float64))
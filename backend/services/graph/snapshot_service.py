@@ -0,0 +1,257 @@
+"""
+graphsnapshotservice: precomputed gzip'd json payloads for GET /project/{id}/graph.
+one snapshot per field projection (topology / aliases / full), built when ingestion or export
+finishes, stored in object storage and tracked in project_metadata["graph_snapshot"][fields].
+any node write invalidates all of them and bumps project_metadata["graph_generation"]; a build
+only records its snapshot if the generation is unchanged since it read the nodes. both write
+just their own keys (jsonb_set), so concurrent export progress updates are never reverted.
+"""
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import Integer, Text, cast, func, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from db import models
+from services.storage_service import get_storage_service
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEY = "graph_snapshot"
+GENERATION_KEY = "graph_generation"
+
+# graph_nodes columns selected per projection (response keys follow the endpoint's historic names)
+PROJECTIONS: Dict[str, Tuple[str, ...]] = {
+    "topology": ("concept_id", "outbound_links", "inbound_links"),
+    "aliases": ("concept_id", "aliases", "outbound_links", "inbound_links", "node_metadata"),
+    "full": ("concept_id", "aliases", "outbound_links", "inbound_links", "content", "node_metadata"),
+}
+DEFAULT_PROJECTION = "full"
+
+# recently served snapshots per process: (project_id, etag) -> gzip bytes
+_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+_memory: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_memory_bytes = 0
+
+
+def _remember(key: Tuple[str, str], payload: bytes):
+    global _memory_bytes
+    if len(payload) > _MEMORY_MAX_BYTES // 4:
+        return
+    old = _memory.pop(key, None)
+    if old is not None:
+        _memory_bytes -= len(old)
+    _memory[key] = payload
+    _memory_bytes += len(payload)
+    while _memory_bytes > _MEMORY_MAX_BYTES:
+        _, evicted = _memory.popitem(last=False)
+        _memory_bytes -= len(evicted)
+
+
+def snapshot_key(project_id: str, fields: str = DEFAULT_PROJECTION) -> str:
+    return f"snapshots/{project_id}/graph.{fields}.json.gz"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (comma-separated list, weak validators, or *)"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def generation_of(metadata: Optional[dict]) -> int:
+    return int((metadata or {}).get(GENERATION_KEY) or 0)
+
+
+def projection_columns(fields: str = DEFAULT_PROJECTION) -> list:
+    return [getattr(models.GraphNode, c) for c in PROJECTIONS[fields]]
+
+
+def node_payload(row, fields: str = DEFAULT_PROJECTION) -> dict:
+    """one node in the endpoint's shape, with only the projection's keys ("full" = historic payload)"""
+    columns = PROJECTIONS[fields]
+    node = {"id": str(row.concept_id)}
+    if "aliases" in columns:
+        node["aliases"] = row.aliases or []
+    node["outbound_links"] = row.outbound_links or []
+    node["inbound_links"] = row.inbound_links or []
+    if "content" in columns:
+        node["content"] = row.content
+    if "node_metadata" in columns:
+        node["metadata"] = row.node_metadata or {}
+    return node
+
+
+def serialize_graph(rows, fields: str = DEFAULT_PROJECTION) -> bytes:
+    """{"nodes": [...]} for a projection"""
+    return orjson.dumps({"nodes": [node_payload(row, fields) for row in rows]})
+
+
+class GraphSnapshotService:
+    """
+    builds, loads and invalidates per-project graph snapshots.
+    """
+
+    def __init__(self, db: Session, storage=None):
+        self.db = db
+        self._storage = storage
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    def build(self, project: models.Project, fields: str = DEFAULT_PROJECTION) -> Tuple[str, bytes]:
+        """
+        selects only the projection's columns, uploads the gzip'd payload and records its etag.
+        returns (etag, gzip bytes).
+        """
+        start = time.time()
+        project_id = str(project.id)
+        # read before the nodes: an invalidation after this point makes the build stale
+        generation = self.current_generation(project.id)
+        nodes = self.db.query(*projection_columns(fields)).filter(models.GraphNode.project_id == project.id).all()
+        raw = serialize_graph(nodes, fields)
+        etag = f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+        # mtime=0 keeps identical graphs byte-identical
+        payload = gzip.compress(raw, compresslevel=6, mtime=0)
+
+        key = snapshot_key(project_id, fields)
+        _remember((project_id, etag), payload)
+        try:
+            self.storage.upload_file(payload, key)
+        except Exception as e:
+            # still serve this payload; without a recorded snapshot the next read rebuilds
+            logger.warning(f"failed to store graph snapshot for {project_id}: {e}")
+            return etag, payload
+
+        recorded = self._record(project, fields, generation, {
+            "etag": etag,
+            "key": key,
+            "nodes": len(nodes),
+            "size": len(raw),
+            "gzip_size": len(payload),
+            "built_at": int(time.time()),
+        })
+        if not recorded:
+            logger.info(f"graph snapshot ({fields}) for {project_id} went stale during the build; not recorded")
+            return etag, payload
+        logger.info(
+            f"graph snapshot ({fields}) for {project_id}: {len(nodes)} nodes, {len(raw)} -> {len(payload)} bytes "
+            f"in {time.time() - start:.2f}s"
+        )
+        return etag, payload
+
+    def current_generation(self, project_id) -> int:
+        """committed generation (a column read, so not the session's cached project_metadata)"""
+        return generation_of({GENERATION_KEY: self.db.query(
+            models.Project.project_metadata[GENERATION_KEY].astext
+        ).filter(models.Project.id == project_id).scalar()})
+
+    def _record(self, project: models.Project, fields: str, generation: int, entry: dict) -> bool:
+        """
+        writes graph_snapshot[fields] under a row lock if the generation still matches; commits.
+        returns False (nothing written) when the graph was invalidated after the build's node read.
+        """
+        locked = self.db.query(models.Project.project_metadata).filter(
+            models.Project.id == project.id
+        ).with_for_update().scalar()
+        if generation_of(locked) != generation:
+            self.db.commit()  # releases the lock
+            return False
+        column = models.Project.project_metadata
+        metadata = self.db.execute(
+            update(models.Project)
+            .where(models.Project.id == project.id)
+            .values(project_metadata=func.jsonb_set(
+                func.coalesce(column, cast({}, JSONB)),
+                cast([METADATA_KEY], ARRAY(Text)),
+                func.coalesce(column[METADATA_KEY], cast({}, JSONB)).op("||")(
+                    func.jsonb_build_object(fields, cast(entry, JSONB))
+                ),
+            ))
+            .returning(column)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        self.db.commit()
+        set_committed_value(project, "project_metadata", metadata)
+        return True
+
+    def load(self, project: models.Project, fields: str = DEFAULT_PROJECTION) -> Optional[Tuple[str, bytes]]:
+        """(etag, gzip bytes) of the current snapshot, or None if there is none or it can't be read"""
+        meta = ((project.project_metadata or {}).get(METADATA_KEY) or {}).get(fields)
+        if not isinstance(meta, dict) or "etag" not in meta:
+            return None
+        cache_key = (str(project.id), meta["etag"])
+        payload = _memory.get(cache_key)
+        if payload is not None:
+            _memory.move_to_end(cache_key)
+            return meta["etag"], payload
+        try:
+            payload = self.storage.download_file(meta["key"])
+        except Exception as e:
+            logger.warning(f"failed to load graph snapshot for {project.id}: {e}")
+            return None
+        _remember(cache_key, payload)
+        return meta["etag"], payload
+
+    def get_or_build(self, project: models.Project, fields: str = DEFAULT_PROJECTION) -> Tuple[str, bytes]:
+        return self.load(project, fields) or self.build(project, fields)
+
+    def invalidate(self, project: models.Project, commit: bool = True):
+        """
+        drops the snapshot references and bumps the generation after node writes (only those two
+        keys); the next read (or build) recreates it, and builds already in flight don't record.
+        """
+        column = models.Project.project_metadata
+        metadata = self.db.execute(
+            update(models.Project)
+            .where(models.Project.id == project.id)
+            .values(project_metadata=func.jsonb_set(
+                func.coalesce(column, cast({}, JSONB)).op("-")(cast(METADATA_KEY, Text)),
+                cast([GENERATION_KEY], ARRAY(Text)),
+                func.to_jsonb(func.coalesce(column[GENERATION_KEY].astext.cast(Integer), 0) + 1),
+            ))
+            .returning(column)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if metadata is not None:
+            set_committed_value(project, "project_metadata", metadata)
+        if commit:
+            self.db.commit()
+
+    def delete(self, project_id: str):
+        for fields in PROJECTIONS:
+            try:
+                self.storage.delete_file(snapshot_key(project_id, fields))
+            except Exception as e:
+                logger.warning(f"failed to delete graph snapshot ({fields}) for {project_id}: {e}")
+
+
+def rebuild_snapshot(db: Session, project_id, projections=("aliases", "full")) -> Optional[str]:
+    """
+    best-effort rebuild after a pipeline finishes (the dashboard's and the cli's projections;
+    topology is built on first read). returns the last new etag or None.
+    """
+    try:
+        project = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not project:
+            return None
+        service = GraphSnapshotService(db)
+        etag = None
+        for fields in projections:
+            etag, _ = service.build(project, fields)
+        return etag
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"graph snapshot rebuild failed for {project_id}: {e}")
+        return None
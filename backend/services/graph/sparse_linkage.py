@@ -0,0 +1,150 @@
+"""
+sparselinkage: sub-quadratic-memory clustering for entity resolution.
+approximate nearest-neighbour candidate generation on a random projection, exact verification,
+then a greedy average-linkage merge over the thresholded similarity graph (union-find).
+"""
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def random_projection(X: np.ndarray, dims: int, seed: int = 0) -> np.ndarray:
+    """
+    gaussian (johnson-lindenstrauss) projection: z_i . z_j is an unbiased estimate of x_i . x_j
+    with standard deviation ~ 1 / sqrt(dims) for unit rows, independent of the data's spectrum.
+    """
+    n, d = X.shape
+    if d <= dims:
+        return X
+    rng = np.random.default_rng(seed)
+    R = (rng.standard_normal((d, dims)) / np.sqrt(dims)).astype(X.dtype)
+    return X @ R
+
+
+def candidate_pairs(
+    X: np.ndarray,
+    threshold: float,
+    k: int = 15,
+    dims: int = 128,
+    margin: float = 0.3,
+    block_size: int = 256,
+    verify_chunk: int = 8192,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    returns (i, j, sim) for i < j where x_i . x_j >= threshold.
+    candidates are each row's top-k neighbours on the projection with approx score >= threshold - margin,
+    verified with exact dot products on the full vectors. extra memory is O(block_size * n + n * k).
+    """
+    n = X.shape[0]
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    Z = random_projection(X, dims)
+    cutoff = threshold - margin
+
+    rows, cols = [], []
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        scores = Z[start:stop] @ Z.T
+        # exclude self matches
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        r, c = np.nonzero(scores >= cutoff)
+        if len(r) == 0:
+            continue
+        vals = scores[r, c]
+        # cap each row at its k best candidates (rows arrive grouped, best first after lexsort)
+        order = np.lexsort((-vals, r))
+        r, c = r[order], c[order]
+        first = np.searchsorted(r, r)
+        keep = (np.arange(len(r)) - first) < k
+        rows.append(r[keep] + start)
+        cols.append(c[keep])
+
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    i = np.concatenate(rows)
+    j = np.concatenate(cols)
+    # canonical undirected pairs, deduped
+    lo, hi = np.minimum(i, j), np.maximum(i, j)
+    pairs = np.unique(np.stack([lo, hi], axis=1), axis=0)
+    if len(pairs) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    lo, hi = pairs[:, 0], pairs[:, 1]
+    # exact verification, chunked so gathered rows stay bounded
+    sims = np.empty(len(lo), dtype=X.dtype)
+    for begin in range(0, len(lo), verify_chunk):
+        end = begin + verify_chunk
+        sims[begin:end] = np.einsum("ij,ij->i", X[lo[begin:end]], X[hi[begin:end]])
+    keep = sims >= threshold
+    return lo[keep], hi[keep], sims[keep]
+
+
+def greedy_average_linkage(
+    X: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    sims: np.ndarray,
+    threshold: float,
+) -> np.ndarray:
+    """
+    union-find over verified edges, strongest first. two clusters merge only if their
+    average pairwise cosine (sum_a . sum_b / (|a| |b|) for unit rows) stays >= threshold,
+    which mirrors average linkage and prevents single-linkage chaining. returns labels.
+    """
+    n = X.shape[0]
+    parent = np.arange(n)
+    size = np.ones(n, dtype=np.int64)
+    # cluster sum vectors, allocated only for non-singleton roots
+    sums: Dict[int, np.ndarray] = {}
+
+    def find(a: int) -> int:
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:
+            parent[a], a = root, parent[a]
+        return root
+
+    def cluster_sum(root: int) -> np.ndarray:
+        vec = sums.get(root)
+        return X[root] if vec is None else vec
+
+    for idx in np.argsort(-sims, kind="stable"):
+        a, b = find(int(lo[idx])), find(int(hi[idx]))
+        if a == b:
+            continue
+        sum_a, sum_b = cluster_sum(a), cluster_sum(b)
+        avg = float(sum_a @ sum_b) / (size[a] * size[b])
+        if avg < threshold:
+            continue
+        # union by size
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        sums[a] = sum_a + sum_b
+        sums.pop(b, None)
+
+    roots = np.array([find(i) for i in range(n)])
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels
+
+
+def cluster_sparse(
+    X: np.ndarray,
+    threshold: float,
+    k: int = 15,
+    dims: int = 128,
+) -> np.ndarray:
+    """labels for unit-normalized rows X using ann candidates + greedy average linkage"""
+    lo, hi, sims = candidate_pairs(X, threshold, k=k, dims=dims)
+    logger.info(f"sparse linkage: {len(sims)} verified pairs above {threshold} for {X.shape[0]} ids")
+    return greedy_average_linkage(X, lo, hi, sims, threshold)
@@ -4,26 +4,40 @@ import json
 import asyncio
 import logging
 import time
+import uuid
+from collections import Counter
 from typing import Dict, Any, List
 
+from core.config import get_settings
 from services.storage_service import get_storage_service
 from services.pdf_service import PDFService
-from services.chunking_service import RecursiveMarkdownSplitter, create_extraction_chunks
+from services.chunking_service import RecursiveMarkdownSplitter, create_extraction_chunks, locate_chunks
 from services.embedding_service import EmbeddingService
 from services.job_service import get_job_service
 from services.llm.seed_extractor import SeedExtractor
 from services.llm.chunk_extractor import ChunkExtractor
 from services.llm.orphan_link_service import OrphanLinkService
 from services.llm.concept_validator import ConceptValidator
-from services.graph.builder import GraphBuilder
+from services.graph.builder import GraphBuilder, GraphAccumulator
 from services.graph.connector import GraphConnector
-from services.graph.node_filter import get_date_like_ids, filter_invalid_nodes
+from services.graph.node_filter import get_rule_engine, remove_invalid_nodes
+from services.graph.concept_classifier import get_knn_classifier
 from services.graph.persistence_service import GraphPersistenceService
+from services.graph.snapshot_service import rebuild_snapshot
+from services.stage_executor import StageExecutor
+from schemas.graph import GraphData
 from db.session import SessionLocal
+from db.bulk import copy_chunks
+from services.retrieval_service import ChunkRetrievalService
+from services.provenance_service import ConceptProvenanceService, link_concepts
 from db import models
 
 logger = logging.getLogger(__name__)
 
+# extraction windows (~8k chars); provenance maps concepts back through the same windows
+EXTRACTION_CHUNK_SIZE = 8000
+EXTRACTION_OVERLAP = 200
+
 
 def extract_headers_for_seed(text: str) -> str:
     """extracts h1/h2/h3 headers for seed extraction. pure function, no side effects."""
@@ -36,7 +50,7 @@ def extract_headers_for_seed(text: str) -> str:
 class IngestionProcessor:
     """
     orchestrates multi-step ingestion pipeline:
-    download -> parse -> chunk -> embed -> extract graph -> resolve concepts
+    download -> parse -> (chunk -> embed -> store) || (seed -> extract graph) -> resolve concepts
     """
 
     def __init__(
@@ -67,6 +81,11 @@ class IngestionProcessor:
         db = SessionLocal()
         temp_path = f"/tmp/{self.job_id}.pdf"
         self.timings = {}
+        self.extraction_cache_stats = None  # set by _run_graph_extraction (stays None on a job-cache hit)
+        self.extraction_concurrency = None  # limiter snapshot, set alongside extraction_cache_stats
+        self.filter_stats = None
+        self.provenance_stats = None
+        self.stored_chunks: List[Dict[str, Any]] = []  # {id, start, end, content}, set by _embed_and_store_chunks
         pipeline_start = time.time()
         
         try:
@@ -144,74 +163,62 @@ class IngestionProcessor:
             self.jobs.update_progress(self.job_id, "processing", 40)
             await asyncio.sleep(0.1) # yield after heavy pdf parsing
 
-            # chunk text and generate embeddings
-            logger.info("chunking and embedding...")
-            embed_start = time.time()
-            chunks = self.splitter.split_text(markdown_content)
-            chunk_texts = [c.page_content for c in chunks]
-            vectors = self.embedder.get_embeddings(chunk_texts)
-            
-            db_chunks = [
-                models.Chunk(
-                    file_id=db_file.id,
-                    content=chunk.page_content,
-                    embedding=vectors[i],
-                    chunk_metadata=chunk.metadata
-                ) for i, chunk in enumerate(chunks)
-            ]
-            db.add_all(db_chunks)
-            db.commit()
-            self.timings['chunking_and_embedding'] = time.time() - embed_start
-            self.jobs.update_progress(self.job_id, "processing", 60)
-            await asyncio.sleep(0.1) # yield after heavy embeddings
-
-            # extract conceptual graph (stateful windowing)
-            logger.info("extracting conceptual graph...")
-            extract_start = time.time()
-            
-            # check for cached results first
-            cached_extraction = self.jobs.get_extraction_cache(self.job_id)
-            if cached_extraction:
-                logger.info(f"using cached extraction results for job {self.job_id}")
-                # reconstruct pydantic objects from cached dicts
-                from schemas.graph import GraphData
-                graph_data = [GraphData(**g) for g in cached_extraction]
-            else:
-                graph_data = await self._run_graph_extraction(
+            # chunk + embed + persist runs alongside seed + chunk extraction; joined before build
+            logger.info("chunking/embedding and extracting conceptual graph in parallel...")
+            # source offsets on every storage chunk (provenance maps extraction windows onto them)
+            chunks = locate_chunks(markdown_content, self.splitter.split_text(markdown_content))
+            file_id = db_file.id
+            executor = StageExecutor(self.timings)
+            results = await executor.run({
+                "chunking_and_embedding": lambda: self._embed_and_store_chunks(project_id, file_id, chunks),
+                "total_extraction": lambda: self._extract_or_load_cached(
                     markdown_content,
                     gemini_key=gemini_key,
                     openrouter_key=openrouter_key,
-                )
-                # cache the results for potential retries
-                self.jobs.set_extraction_cache(self.job_id, [g.model_dump() for g in graph_data])
-                
-            self.timings['total_extraction'] = time.time() - extract_start
+                ),
+            })
+            accumulator = results["total_extraction"]
             self.jobs.update_progress(self.job_id, "processing", 80)
             await asyncio.sleep(0.1)
             
             # resolve and merge concepts
             logger.info("resolving concepts...")
-            resolved_graph = self.builder.build(graph_data)
+            # stages below share one interned graph; it becomes graphdata again only for persistence
+            graph = await self.builder.finalize(accumulator)
 
-            # filter invalid nodes (date regex + llm validation)
+            # filter invalid nodes (compiled rules, then embedding knn, llm only for what's left)
             logger.info("filtering invalid concepts...")
             filter_start = time.time()
-            date_invalid = get_date_like_ids(resolved_graph)
-            remaining_ids = [n.id for n in resolved_graph.nodes if n.id not in date_invalid]
+            rule_invalid, ambiguous_ids = get_rule_engine().partition(graph.ids)
+            self.filter_stats = {
+                "total": len(graph.ids),
+                "rule_hits": dict(Counter(rule_invalid.values())),
+                "sent_to_llm": len(ambiguous_ids),
+            }
+            logger.info(f"rule pre-filter: {self.filter_stats}")
+            knn_invalid = set()
+            knn = get_knn_classifier(self.embedder, scope=user_id or project_id)
+            if knn is not None:
+                knn_invalid, _, ambiguous_ids = await knn.partition(ambiguous_ids)
+                self.filter_stats["knn"] = knn.last_stats
+                self.filter_stats["sent_to_llm"] = len(ambiguous_ids)
             validator = ConceptValidator(openrouter_key=openrouter_key)
-            llm_invalid = await validator.get_invalid_concepts(remaining_ids)
-            all_invalid = date_invalid | llm_invalid
-            filtered_graph = filter_invalid_nodes(resolved_graph, all_invalid)
+            llm_invalid = await validator.get_invalid_concepts(ambiguous_ids)
+            if knn is not None:
+                await knn.learn(validator.last_verdicts)
+            all_invalid = set(rule_invalid) | knn_invalid | llm_invalid
+            graph = remove_invalid_nodes(graph, all_invalid)
             self.timings['concept_validation'] = time.time() - filter_start
 
             # connectivity phase: ensure graph is a single connected component
             logger.info("connecting orphan components...")
-            connected_graph = self.connector.connect_orphans(filtered_graph)
+            graph = await self.connector.connect_orphans_compact(graph)
 
             # fix degree-0 nodes
             logger.info("fixing degree-0 nodes...")
-            orphan_svc = OrphanLinkService(openrouter_key=openrouter_key)
-            connected_graph = await orphan_svc.fix_degree_zero_nodes(connected_graph)
+            orphan_svc = OrphanLinkService(openrouter_key=openrouter_key, embedder=self.embedder)
+            graph = await orphan_svc.fix_degree_zero_compact(graph)
+            connected_graph = graph.to_graph_data()
 
             graph_dump = connected_graph.model_dump()
             
@@ -220,14 +227,32 @@ class IngestionProcessor:
             persistence = GraphPersistenceService(db)
             persistence.save_graph(str(project_id), connected_graph)
 
+            # concept -> chunk provenance for note generation
+            provenance_start = time.time()
+            self._record_provenance(db, project_id, connected_graph, accumulator, markdown_content)
+            self.timings['provenance'] = time.time() - provenance_start
+
+            # precompute the compressed payload served by GET /project/{id}/graph
+            snapshot_start = time.time()
+            rebuild_snapshot(db, project_id)
+            self.timings['graph_snapshot'] = time.time() - snapshot_start
+
             self.timings['total_pipeline'] = time.time() - pipeline_start
+            logger.info(f"embedding cache: {self.embedder.cache_stats}")
 
             # finalize job
             self.jobs.update_progress(self.job_id, "completed", 100, {
                 "chunks_count": len(chunks),
                 "graph_nodes": len(connected_graph.nodes),
                 "graph_preview": graph_dump,
-                "timings": self.timings
+                "timings": self.timings,
+                "embedding_cache": self.embedder.cache_stats,
+                "extraction_cache": self.extraction_cache_stats,
+                "extraction_concurrency": self.extraction_concurrency,
+                "concept_filter": self.filter_stats,
+                "persistence": persistence.last_stats,
+                "provenance": self.provenance_stats,
+                "resolution": self.builder.resolver.last_stats
             })
             
             # update project status to complete
@@ -264,13 +289,123 @@ class IngestionProcessor:
             if os.path.exists(temp_path):
                 os.remove(temp_path)
 
+    async def _embed_and_store_chunks(self, project_id, file_id, chunks: List[Any]) -> int:
+        """embeds storage chunks, then persists them in a worker thread with its own session."""
+        chunk_texts = [c.page_content for c in chunks]
+        vectors = await self.embedder.aget_embeddings(chunk_texts)
+
+        # ids assigned here so provenance can reference the rows without reading them back
+        chunk_ids = [uuid.uuid4() for _ in chunks]
+
+        def store() -> int:
+            session = SessionLocal()
+            try:
+                # binary COPY in bounded batches; no orm object per chunk
+                copy_chunks(session, (
+                    {
+                        "id": chunk_ids[i],
+                        "file_id": file_id,
+                        "project_id": project_id,
+                        "content": chunk.page_content,
+                        "embedding": vectors[i],
+                        "chunk_metadata": chunk.metadata,
+                    } for i, chunk in enumerate(chunks)
+                ))
+                session.commit()
+            except Exception:
+                session.rollback()
+                session.close()
+                raise
+            try:
+                # very large projects get a dedicated partial hnsw index (no-op below the threshold)
+                ChunkRetrievalService(session).ensure_project_index(project_id)
+            except Exception as e:
+                logger.warning(f"partial chunk index for project {project_id} not built: {e}")
+            finally:
+                session.close()
+            return len(chunks)
+
+        count = await asyncio.to_thread(store)
+        self.stored_chunks = [
+            {
+                "id": chunk_ids[i],
+                "start": chunk.metadata.get("start"),
+                "end": chunk.metadata.get("end"),
+                "content": chunk.page_content,
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        logger.info(f"embedded and stored {count} chunks")
+        return count
+
+    def _record_provenance(self, db, project_id, graph: GraphData, accumulator: GraphAccumulator, text: str):
+        """
+        maps each final concept's extraction windows onto the stored chunks that mention it.
+        best effort: notes fall back to vector search for concepts without provenance.
+        """
+        try:
+            sources = accumulator.canonical_sources(self.builder.last_id_map)
+            if not sources or not self.stored_chunks:
+                self.provenance_stats = {"concepts": 0, "rows": 0}
+                return
+            windows = [
+                (c.metadata["start"], c.metadata["end"])
+                for c in create_extraction_chunks(text, chunk_size=EXTRACTION_CHUNK_SIZE, overlap=EXTRACTION_OVERLAP)
+            ]
+            rows = link_concepts(
+                {node.id: node.aliases for node in graph.nodes},
+                sources,
+                windows,
+                self.stored_chunks,
+            )
+            ConceptProvenanceService(db).save(str(project_id), rows)
+            db.commit()
+            self.provenance_stats = {
+                "concepts": len({r["concept_id"] for r in rows}),
+                "rows": len(rows),
+            }
+            logger.info(f"provenance: {self.provenance_stats} for {len(graph.nodes)} concepts")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"provenance not recorded for project {project_id}: {e}")
+
+    async def _extract_or_load_cached(
+        self,
+        text: str,
+        gemini_key: str = None,
+        openrouter_key: str = None,
+    ) -> GraphAccumulator:
+        """returns cached extraction aggregates for this job, or runs extraction and caches them"""
+        cached_extraction = self.jobs.get_extraction_cache(self.job_id)
+        if cached_extraction:
+            logger.info(f"using cached extraction results for job {self.job_id}")
+            if isinstance(cached_extraction, dict):
+                return GraphAccumulator.from_dict(cached_extraction)
+            # older cache entries hold one graphdata dict per chunk
+            accumulator = GraphAccumulator()
+            for g in cached_extraction:
+                accumulator.add(GraphData(**g))
+            return accumulator
+
+        accumulator = await self._run_graph_extraction(
+            text,
+            gemini_key=gemini_key,
+            openrouter_key=openrouter_key,
+        )
+        # cache the results for potential retries
+        self.jobs.set_extraction_cache(self.job_id, accumulator.to_dict())
+        return accumulator
+
     async def _run_graph_extraction(
         self,
         text: str,
         gemini_key: str = None,
         openrouter_key: str = None,
-    ) -> List[Any]:
-        """runs per-chunk extraction (step 1 seed + step 2 map). no gemini cache."""
+    ) -> GraphAccumulator:
+        """
+        runs per-chunk extraction (step 1 seed + step 2 map). no gemini cache.
+        each chunk's result is folded into the accumulator as soon as it returns, then dropped.
+        """
 
         # step 1: global seed from headers (h1/h2/h3)
         header_text = self._extract_headers(text)
@@ -288,28 +423,47 @@ class IngestionProcessor:
                 logger.warning(f"seed extraction failed, continuing without seed: {e}")
 
         # step 2: create extraction chunks (~8k chars) and extract from each
-        extraction_chunks = create_extraction_chunks(text, chunk_size=8000, overlap=200)
-        logger.info(f"extracting graph from {len(extraction_chunks)} chunks...")
+        extraction_chunks = create_extraction_chunks(text, chunk_size=EXTRACTION_CHUNK_SIZE, overlap=EXTRACTION_OVERLAP)
+        total = len(extraction_chunks)
+        logger.info(f"extracting graph from {total} chunks...")
 
+        # concurrent openrouter calls are bounded by the extractor's adaptive per-key limiter
         chunk_extractor = ChunkExtractor(openrouter_key=openrouter_key)
-        sem = asyncio.Semaphore(5)  # limit concurrent OpenRouter calls
+        chunk_extractor.limiter.reset_peak()
 
         async def extract_one(chunk_obj, idx: int):
-            async with sem:
-                logger.info(f"extracting chunk {idx + 1}/{len(extraction_chunks)}...")
-                return await chunk_extractor.extract_from_chunk(
-                    chunk_obj.page_content,
-                    seed_list=seed_ids if seed_ids else None,
-                )
-
-        extracted_graphs = await asyncio.gather(
-            *(
-                extract_one(c, i)
-                for i, c in enumerate(extraction_chunks)
+            logger.info(f"extracting chunk {idx + 1}/{total}...")
+            return idx, await chunk_extractor.extract_from_chunk(
+                chunk_obj.page_content,
+                seed_list=seed_ids if seed_ids else None,
             )
-        )
 
-        return [g for g in extracted_graphs if g and g.nodes]
+        accumulator = GraphAccumulator()
+        last_progress_at = 0.0
+        interval = get_settings().INGESTION_PROGRESS_INTERVAL_SECONDS
+        for next_done in asyncio.as_completed([
+            extract_one(c, i)
+            for i, c in enumerate(extraction_chunks)
+        ]):
+            idx, result = await next_done
+            accumulator.add(result, source=idx)
+            # extraction spans 40-80% of the job; expose the partial graph size while it runs.
+            # rate-limited and off the event loop: the job store write is a blocking http call
+            now = time.monotonic()
+            if accumulator.chunks_added == total or now - last_progress_at >= interval:
+                last_progress_at = now
+                await asyncio.to_thread(
+                    self.jobs.update_progress,
+                    self.job_id,
+                    "processing",
+                    40 + (40 * accumulator.chunks_added) // max(total, 1),
+                    details={"extraction": {"chunks_total": total, **accumulator.progress()}},
+                )
+
+        self.extraction_cache_stats = chunk_extractor.cache_stats
+        self.extraction_concurrency = chunk_extractor.limiter.snapshot()
+        logger.info(f"chunk extraction cache: {chunk_extractor.cache_stats}")
+        return accumulator
 
     def _extract_headers(self, text: str) -> str:
         """extracts h1/h2/h3 headers for seed extraction (regex)"""
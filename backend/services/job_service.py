@@ -68,6 +68,9 @@ class UpstashJobService:
         if details:
             if status in ["completed", "failed"]:
                 updates["result"] = json.dumps(details)
+            else:
+                # intermediate stats while the job is still running
+                updates["partial"] = json.dumps(details)
         
         self.redis.hset(key, values=updates)
 
@@ -101,11 +104,12 @@ class UpstashJobService:
             except:
                 pass
                 
-        if "result" in data and isinstance(data["result"], str):
-            try:
-                data["result"] = json.loads(data["result"])
-            except:
-                pass
+        for field in ("result", "partial"):
+            if field in data and isinstance(data[field], str):
+                try:
+                    data[field] = json.loads(data[field])
+                except:
+                    pass
                 
         return data
 
@@ -169,6 +173,9 @@ class LocalJobService:
             
         if details and status in ["completed", "failed"]:
             self.store[job_id]["result"] = json.dumps(details)
+        elif details:
+            # intermediate stats while the job is still running
+            self.store[job_id]["partial"] = json.dumps(details)
 
     def set_extraction_cache(self, job_id: str, data: Any):
         """cache raw extraction results (expensive part)"""
@@ -197,11 +204,12 @@ class LocalJobService:
             except:
                 pass
                 
-        if "result" in data and isinstance(data["result"], str):
-            try:
-                data["result"] = json.loads(data["result"])
-            except:
-                pass
+        for field in ("result", "partial"):
+            if field in data and isinstance(data[field], str):
+                try:
+                    data[field] = json.loads(data[field])
+                except:
+                    pass
                 
         return data
 
@@ -0,0 +1,159 @@
+"""
+kvcache: small namespaced json key-value cache for llm results.
+redis (upstash) when configured, local disk otherwise. keys are caller-built content hashes.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import pathlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def content_key(*parts: Any) -> str:
+    """sha256 over the json encoding of parts (order-sensitive)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LocalKVCache:
+    """local disk backend: data/cache/<namespace>/<hh>/<key>.json (no expiry)"""
+
+    def __init__(self, namespace: str, base_dir: str = "data/cache"):
+        self.namespace = namespace
+        self.base_dir = pathlib.Path(base_dir) / namespace
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.base_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent readers never see a partial file
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(value), encoding="utf-8")
+        tmp.replace(path)
+
+    def set_many(self, entries: Dict[str, Any]):
+        for key, value in entries.items():
+            self.set(key, value)
+
+    def _list_path(self, key: str) -> pathlib.Path:
+        return self.base_dir / key[:2] / f"{key}.jsonl"
+
+    def get_list(self, key: str) -> List[Any]:
+        path = self._list_path(key)
+        if not path.exists():
+            return []
+        items = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return items
+
+    def append(self, key: str, items: List[Any], keep: int):
+        """appends items to the list at key, keeping the newest `keep` (locked read-modify-write)"""
+        if not items:
+            return
+        path = self._list_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            lines = f.read().splitlines() + [json.dumps(item) for item in items]
+            f.seek(0)
+            f.truncate()
+            f.write("".join(line + "\n" for line in lines[-keep:]))
+
+
+class RedisKVCache:
+    """upstash redis backend: keys 'cache:<namespace>:<key>' with a ttl"""
+
+    def __init__(self, namespace: str, ttl: int = None):
+        from upstash_redis import Redis
+        self.redis = Redis(
+            url=settings.UPSTASH_REDIS_REST_URL,
+            token=settings.UPSTASH_REDIS_REST_TOKEN
+        )
+        self.namespace = namespace
+        self.ttl = ttl or settings.LLM_CACHE_TTL_SECONDS
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.redis.get(self._key(key))
+        return json.loads(raw) if raw else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.redis.mget(*[self._key(k) for k in keys])
+        return {k: json.loads(v) for k, v in zip(keys, values) if v}
+
+    def set(self, key: str, value: Any):
+        self.redis.set(self._key(key), json.dumps(value), ex=self.ttl)
+
+    def set_many(self, entries: Dict[str, Any]):
+        """every SET (with its ttl) in one pipelined rest call"""
+        if not entries:
+            return
+        pipe = self.redis.pipeline()
+        for key, value in entries.items():
+            pipe.set(self._key(key), json.dumps(value), ex=self.ttl)
+        pipe.exec()
+
+    def get_list(self, key: str) -> List[Any]:
+        return [json.loads(v) for v in self.redis.lrange(self._key(key), 0, -1) or []]
+
+    def append(self, key: str, items: List[Any], keep: int):
+        """rpush + ltrim + expire in one multi/exec, so concurrent writers never drop each other's items"""
+        if not items:
+            return
+        name = self._key(key)
+        tx = self.redis.multi()
+        tx.rpush(name, *[json.dumps(item) for item in items])
+        tx.ltrim(name, -keep, -1)
+        tx.expire(name, self.ttl)
+        tx.exec()
+
+
+def get_kv_cache(namespace: str):
+    """
+    returns the cache for namespace, or None when disabled.
+    backend from LLM_CACHE_BACKEND: auto (redis if upstash is configured, else local) | redis | local | none
+    """
+    backend = settings.LLM_CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+    if backend == "auto":
+        backend = "redis" if settings.UPSTASH_REDIS_REST_URL and settings.UPSTASH_REDIS_REST_TOKEN else "local"
+    if backend == "redis":
+        return RedisKVCache(namespace)
+    return LocalKVCache(namespace)
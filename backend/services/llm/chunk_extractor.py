@@ -2,16 +2,19 @@
 chunkextractor: extract graphdata (nodes/edges) from a text chunk using openrouter.
 per-chunk extraction with seed list for cross-chunk linking.
 """
+import asyncio
 import json
 import logging
 from typing import List, Optional
 
-from openai import AsyncOpenAI
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 from pydantic import ValidationError
 from schemas.graph import GraphData
 from services.llm.prompt_service import get_prompt_service
+from services.llm.concurrency import get_limiter
+from services.llm.clients import get_openrouter_client
+from services.kv_cache import content_key, get_kv_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,18 +26,26 @@ class ChunkExtractor:
     """
 
     OPENROUTER_MODEL = "google/gemma-3-27b-it"
+    TEMPLATE = "chunk_extraction.jinja"
+    CACHE_NAMESPACE = "chunk_extraction"
 
-    def __init__(self, openrouter_key: str):
+    def __init__(self, openrouter_key: str, cache=None, use_cache: bool = True):
         if not openrouter_key:
             raise ValueError(
                 "OpenRouter API key is required for ChunkExtractor. "
                 "Add it via config (web app or CLI)."
             )
-        self._client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=openrouter_key,
-        )
+        self._openrouter_key = openrouter_key
+        self.limiter = get_limiter("openrouter", openrouter_key)
         self.prompts = get_prompt_service()
+        # results keyed by (chunk text, seed list, model, template version); shared across jobs
+        self.cache = (cache or get_kv_cache(self.CACHE_NAMESPACE)) if use_cache else None
+        self.cache_stats = {"hits": 0, "misses": 0}
+
+    @property
+    def _client(self):
+        # shared pooled client from the registry (rebuilt transparently for a new event loop)
+        return get_openrouter_client(self._openrouter_key)
 
     async def extract_from_chunk(
         self,
@@ -47,22 +58,62 @@ class ChunkExtractor:
         if not chunk_text.strip():
             return GraphData(nodes=[])
 
+        key = self.cache_key(chunk_text, seed_list)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            self.cache_stats["hits"] += 1
+            return cached
+        self.cache_stats["misses"] += 1
+
         prompt = self.prompts.render(
-            "chunk_extraction.jinja",
+            self.TEMPLATE,
             chunk_text=chunk_text.strip(),
             seed_list=seed_list or [],
         )
 
         try:
             raw = await self._call_openrouter(prompt)
-            return self._parse_graph_data(raw)
+            graph = self._parse_graph_data(raw)
         except Exception as e:
             logger.error(f"chunk extraction failed: {e}")
             return GraphData(nodes=[])
 
+        # failures and empty parses are not cached, so a retry asks the model again
+        if graph.nodes:
+            await self._cache_set(key, graph)
+        return graph
+
+    def cache_key(self, chunk_text: str, seed_list: Optional[List[str]] = None) -> str:
+        return content_key(
+            chunk_text.strip(),
+            seed_list or [],
+            self.OPENROUTER_MODEL,
+            self.prompts.template_version(self.TEMPLATE),
+        )
+
+    async def _cache_get(self, key: str) -> Optional[GraphData]:
+        if self.cache is None:
+            return None
+        try:
+            data = await asyncio.to_thread(self.cache.get, key)
+            return GraphData(**data) if data else None
+        except Exception as e:
+            # cache problems never fail an extraction
+            logger.warning(f"extraction cache read failed: {e}")
+            return None
+
+    async def _cache_set(self, key: str, graph: GraphData):
+        if self.cache is None:
+            return
+        try:
+            await asyncio.to_thread(self.cache.set, key, graph.model_dump())
+        except Exception as e:
+            logger.warning(f"extraction cache write failed: {e}")
+
     @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
     async def _call_openrouter(self, prompt: str) -> str:
-        response = await self._client.chat.completions.create(
+        response = await self.limiter.call(
+            self._client.chat.completions.create,
             model=self.OPENROUTER_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.0,
@@ -0,0 +1,126 @@
+"""
+clients: process-wide llm/embedding client registry keyed by (provider, api key hash).
+one pooled http client per key, reused across requests and warm lambda invocations.
+async clients are bound to the event loop they first run on and rebuilt if that loop changes.
+"""
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# keep-alive pool per key: enough for the adaptive limiter's max concurrency
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0)
+TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+# (provider, key hash) -> (client, loop it is bound to or None)
+_clients: Dict[Tuple[str, str], Tuple[Any, Optional[asyncio.AbstractEventLoop]]] = {}
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _get(provider: str, api_key: str, factory: Callable[[], Any], loop_bound: bool = True) -> Any:
+    key = (provider, _key_hash(api_key))
+    loop = _running_loop() if loop_bound else None
+    entry = _clients.get(key)
+    if entry is not None:
+        client, bound = entry
+        if not loop_bound or loop is None or bound is None or bound is loop:
+            if loop_bound and bound is None and loop is not None:
+                _clients[key] = (client, loop)
+            return client
+        # pooled connections belong to a different (usually closed) loop; they can't be reused
+        logger.info(f"rebuilding {provider} client for a new event loop")
+
+    client = factory()
+    _clients[key] = (client, loop)
+    return client
+
+
+def get_openrouter_client(api_key: str):
+    """AsyncOpenAI pointed at openrouter. sdk retries are off: tenacity + the adaptive limiter handle them."""
+    from openai import AsyncOpenAI
+    return _get("openrouter", api_key, lambda: AsyncOpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=api_key,
+        max_retries=0,
+        http_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=TIMEOUT),
+    ))
+
+
+def get_async_openai_client(api_key: str):
+    from openai import AsyncOpenAI
+    return _get("openai", api_key, lambda: AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=TIMEOUT),
+    ))
+
+
+def get_openai_client(api_key: str):
+    """sync client (thread-safe, not tied to any loop)"""
+    from openai import OpenAI
+    return _get("openai_sync", api_key, lambda: OpenAI(
+        api_key=api_key,
+        http_client=httpx.Client(limits=POOL_LIMITS, timeout=TIMEOUT),
+    ), loop_bound=False)
+
+
+def get_gemini_client(api_key: str):
+    """genai.Client with a pooled httpx async client for client.aio calls"""
+    from google import genai
+    from google.genai import types
+    return _get("gemini", api_key, lambda: genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            httpx_async_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=TIMEOUT),
+        ),
+    ))
+
+
+def reset():
+    """drops cached clients without closing them (tests, or after a fork)"""
+    _clients.clear()
+
+
+async def _close(client: Any):
+    from openai import AsyncOpenAI, OpenAI
+    if isinstance(client, AsyncOpenAI):
+        await client.close()
+    elif isinstance(client, OpenAI):
+        client.close()
+    else:
+        # genai.Client
+        aio = getattr(client, "aio", None)
+        if aio is not None and hasattr(aio, "aclose"):
+            await aio.aclose()
+        if hasattr(client, "close"):
+            client.close()
+
+
+async def aclose_all():
+    """closes every client usable from the current loop (app shutdown); others are just dropped"""
+    loop = _running_loop()
+    entries = list(_clients.items())
+    _clients.clear()
+    for (provider, _), (client, bound) in entries:
+        if bound is not None and bound is not loop:
+            continue
+        try:
+            await _close(client)
+        except Exception as e:
+            logger.warning(f"failed to close {provider} client: {e}")
+    logger.info(f"closed {len(entries)} llm clients")
@@ -1,15 +1,19 @@
 """
 conceptvalidator: llm pass to identify invalid concept ids (metadata, dates, etc.).
-c3 — single call per document to clean extraction noise.
+c3 — sharded concurrent calls per document, with a verdict cache shared across projects.
 """
+import asyncio
 import json
 import logging
-from typing import List, Set
+from typing import Dict, List, Optional, Set
 
-from openai import AsyncOpenAI
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 from services.llm.prompt_service import get_prompt_service
+from services.llm.concurrency import get_limiter
+from services.llm.clients import get_openrouter_client
+from services.kv_cache import content_key, get_kv_cache
+from services.graph.lexical import normalize_concept_id
 
 logger = logging.getLogger(__name__)
 
@@ -21,56 +25,120 @@ class ConceptValidator:
     """
 
     OPENROUTER_MODEL = "meta-llama/llama-4-scout"
+    TEMPLATE = "concept_validation.jinja"
+    CACHE_NAMESPACE = "concept_verdicts"
 
-    def __init__(self, openrouter_key: str):
+    def __init__(self, openrouter_key: str, shard_size: int = 150, cache=None, use_cache: bool = True):
         if not openrouter_key:
             raise ValueError("OpenRouter API key required for ConceptValidator.")
-        self._client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=openrouter_key,
-        )
+        self._openrouter_key = openrouter_key
+        self.limiter = get_limiter("openrouter", openrouter_key)
         self.prompts = get_prompt_service()
+        self.shard_size = max(1, shard_size)
+        # verdicts keyed by (normalized concept, model, prompt version); shared by every project and user
+        self.cache = (cache or get_kv_cache(self.CACHE_NAMESPACE)) if use_cache else None
+        # verdicts from the llm in the last call ({concept id: is invalid}); cached ones excluded
+        self.last_verdicts: Dict[str, bool] = {}
+
+    @property
+    def _client(self):
+        # shared pooled client from the registry (rebuilt transparently for a new event loop)
+        return get_openrouter_client(self._openrouter_key)
 
-    @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
     async def get_invalid_concepts(self, concept_ids: List[str]) -> Set[str]:
         """
         return set of concept ids that are invalid (dates, metadata, etc.).
+        cached verdicts are reused; the rest is split into shards classified concurrently.
         """
+        self.last_verdicts = {}
         if not concept_ids:
             return set()
 
         concept_list = sorted(set(concept_ids))
+        version = self.prompts.template_version(self.TEMPLATE)
+        keys = {c: content_key(normalize_concept_id(c), self.OPENROUTER_MODEL, version) for c in concept_list}
+
+        verdicts = await self._cache_get_many(list(set(keys.values())))
+        invalid = {c for c in concept_list if verdicts.get(keys[c]) is True}
+        pending = [c for c in concept_list if keys[c] not in verdicts]
+        logger.info(
+            f"concept validation: {len(concept_list) - len(pending)} cached verdicts, "
+            f"{len(pending)} to classify in shards of {self.shard_size}"
+        )
+
+        shards = [pending[i:i + self.shard_size] for i in range(0, len(pending), self.shard_size)]
+
+        async def run_shard(shard: List[str]) -> Optional[Set[str]]:
+            try:
+                return await self._classify_shard(shard)
+            except Exception as e:
+                logger.warning(f"concept validation failed for a shard of {len(shard)}: {e}")
+                return None
+
+        # shards run concurrently; the shared openrouter limiter bounds in-flight requests
+        results = await asyncio.gather(*(run_shard(shard) for shard in shards))
+
+        fresh = {}
+        for shard, flagged in zip(shards, results):
+            if flagged is None:
+                # failed shard: treat as valid for this run, but don't remember that
+                continue
+            invalid |= flagged
+            for c in shard:
+                fresh[keys[c]] = c in flagged
+                self.last_verdicts[c] = c in flagged
+        await self._cache_set_many(fresh)
+
+        if invalid:
+            logger.info(f"validator flagged {len(invalid)} invalid concepts: {invalid}")
+        return invalid
+
+    @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
+    async def _classify_shard(self, shard: List[str]) -> Set[str]:
+        """one llm call; raises on api or parse failure so the shard is retried and never cached"""
         prompt = self.prompts.render(
-            "concept_validation.jinja",
-            concept_list=concept_list,
+            self.TEMPLATE,
+            concept_list=shard,
+        )
+        response = await self.limiter.call(
+            self._client.chat.completions.create,
+            model=self.OPENROUTER_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.0,
         )
+        raw = response.choices[0].message.content.strip()
+        flagged = self._parse_json_array(raw)
+        if flagged is None:
+            raise ValueError(f"unparseable validator response: {raw[:200]}")
 
+        # only return ids that were in the shard (case-insensitive)
+        id_lower_to_orig = {c.lower(): c for c in shard}
+        result = set()
+        for x in flagged:
+            orig = id_lower_to_orig.get(str(x).strip().lower())
+            if orig:
+                result.add(orig)
+        return result
+
+    async def _cache_get_many(self, keys: List[str]) -> Dict[str, bool]:
+        if self.cache is None or not keys:
+            return {}
         try:
-            response = await self._client.chat.completions.create(
-                model=self.OPENROUTER_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.0,
-            )
-            raw = response.choices[0].message.content.strip()
-            invalid = self._parse_json_array(raw)
-
-            # only return ids that were in the original list (case-insensitive)
-            id_lower_to_orig = {c.lower(): c for c in concept_ids}
-            result = set()
-            for x in invalid:
-                orig = id_lower_to_orig.get(str(x).strip().lower())
-                if orig:
-                    result.add(orig)
-
-            if result:
-                logger.info(f"validator flagged {len(result)} invalid concepts: {result}")
-            return result
+            return await asyncio.to_thread(self.cache.get_many, keys)
+        except Exception as e:
+            logger.warning(f"verdict cache read failed: {e}")
+            return {}
 
+    async def _cache_set_many(self, entries: Dict[str, bool]):
+        if self.cache is None or not entries:
+            return
+        try:
+            await asyncio.to_thread(self.cache.set_many, entries)
         except Exception as e:
-            logger.warning(f"concept validation failed: {e}")
-            return set()
+            logger.warning(f"verdict cache write failed: {e}")
 
-    def _parse_json_array(self, raw: str) -> List[str]:
+    def _parse_json_array(self, raw: str) -> Optional[List[str]]:
+        """returns None when the response is not a json array (e.g. truncated)"""
         if raw.startswith("```json"):
             raw = raw[7:].strip()
         if raw.startswith("```"):
@@ -79,8 +147,8 @@ class ConceptValidator:
             raw = raw[:-3].strip()
         try:
             arr = json.loads(raw)
-            if not isinstance(arr, list):
-                return []
-            return [str(x).strip() for x in arr if x]
         except json.JSONDecodeError:
-            return []
+            return None
+        if not isinstance(arr, list):
+            return None
+        return [str(x).strip() for x in arr if x]
@@ -0,0 +1,196 @@
+"""
+concurrency: adaptive (aimd) in-flight limits for llm calls, shared per (provider, api key).
+grows by ~1 slot per window of healthy calls, halves on 429s/timeouts and pauses for retry-after.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# starting limits per provider (the old fixed semaphores); each key then finds its own level
+PROVIDER_INITIAL_LIMITS = {"openrouter": 5, "gemini": 10}
+
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    # openai sdk: status_code; google genai: code
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """seconds from a retry-after header on the error's response, if any"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_throttle(exc: BaseException) -> bool:
+    """429/503 responses and timeouts are treated as overload signals"""
+    if isinstance(exc, asyncio.TimeoutError) or "timeout" in type(exc).__name__.lower():
+        return True
+    return _status_code(exc) in THROTTLE_STATUS_CODES
+
+
+class AdaptiveLimiter:
+    """
+    additive-increase / multiplicative-decrease concurrency limit.
+    waiters are plain futures on the running loop, so one limiter survives across
+    lambda invocations (each asyncio.run gets a fresh loop; the learned limit carries over).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 5,
+        min_limit: int = 1,
+        max_limit: int = None,
+        slow_call_seconds: float = None,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit or settings.LLM_CONCURRENCY_MAX
+        # successful calls slower than this don't grow the limit
+        self.slow_call_seconds = slow_call_seconds or settings.LLM_SLOW_CALL_SECONDS
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self.peak_waiting = 0
+        self.throttled = 0
+        self._waiters: deque = deque()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # previous loop is gone (new invocation): its waiters and in-flight calls are dead
+            self._loop = loop
+            self._waiters.clear()
+            self.in_flight = 0
+
+    def _capacity(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def _wake(self):
+        # woken waiters re-check capacity, so over-waking is harmless
+        for _ in range(self._capacity() - self.in_flight):
+            if not self._waiters:
+                break
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def acquire(self):
+        self._bind_loop()
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                # retry-after from the provider applies to every caller on this key
+                await asyncio.sleep(delay)
+                continue
+            if self.in_flight < self._capacity():
+                break
+            waiter = self._loop.create_future()
+            self._waiters.append(waiter)
+            self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # pass on a wake-up this waiter may have consumed
+                self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake()
+
+    def on_success(self, latency: float):
+        if latency <= self.slow_call_seconds and self.limit < self.max_limit:
+            # +1 slot per window of `limit` healthy calls
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.throttled += 1
+        now = time.monotonic()
+        # one decrease per burst: calls already in flight fail together
+        if now - self._last_decrease > 1.0:
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+            self._last_decrease = now
+            logger.warning(f"{self.name}: throttled, concurrency limit -> {int(self.limit)}")
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """runs fn under the limit and feeds its outcome back into it"""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, Exception) and is_throttle(e):
+                self.on_throttle(_retry_after(e))
+            raise
+        else:
+            self.on_success(time.monotonic() - start)
+            return result
+        finally:
+            self.release()
+
+    def reset_peak(self):
+        self.peak_waiting = len(self._waiters)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "throttled": self.throttled,
+        }
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+
+
+def get_limiter(provider: str, api_key: str) -> AdaptiveLimiter:
+    """process-wide limiter for (provider, api key); the key is only kept as a hash"""
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    registry_key = (provider, key_hash)
+    limiter = _limiters.get(registry_key)
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            name=f"{provider}:{key_hash[:8]}",
+            initial=PROVIDER_INITIAL_LIMITS.get(provider, 5),
+        )
+        _limiters[registry_key] = limiter
+    return limiter
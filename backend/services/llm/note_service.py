@@ -1,15 +1,37 @@
-from google import genai
 from services.embedding_service import EmbeddingService
 from services.llm.prompt_service import get_prompt_service
 from services.llm.utils import repair_note_markdown
+from services.llm.concurrency import get_limiter
+from services.llm.clients import get_gemini_client
+from services.retrieval_service import ChunkRetrievalService
+from services.provenance_service import ConceptProvenanceService
 from sqlalchemy.orm import Session
 from db import models
-from typing import List
+from typing import Dict, List, Set, Tuple
+import asyncio
 import logging
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 logger = logging.getLogger(__name__)
 
+
+def load_valid_ids(db: Session, project_id: str) -> Set[str]:
+    """every concept id in the project (wikilink targets the markdown repair keeps)"""
+    return {concept_id for (concept_id,) in db.query(models.GraphNode.concept_id).filter(
+        models.GraphNode.project_id == project_id
+    )}
+
+
+def try_load_valid_ids(db: Session, project_id: str) -> Set[str] | None:
+    """load_valid_ids in a savepoint; None (links kept unchecked) if the query fails"""
+    try:
+        with db.begin_nested():
+            return load_valid_ids(db, project_id)
+    except Exception as e:
+        logger.error(f"failed to load concept ids for project {project_id}: {e}")
+        return None
+
+
 class NodeNoteService:
     """
     generates concise, obsidian-style study notes for graph nodes using rag.
@@ -19,11 +41,17 @@ class NodeNoteService:
     def __init__(self, gemini_key: str, openai_key: str = None):
         if not gemini_key:
             raise ValueError("gemini_key is required for NodeNoteService. Strict BYOK is enabled.")
-        self.client = genai.Client(api_key=gemini_key)
+        self._gemini_key = gemini_key
+        self.limiter = get_limiter("gemini", gemini_key)
         self.model_id = 'gemini-2.5-flash-lite'
         self.embedder = EmbeddingService(gemini_key=gemini_key, openai_key=openai_key)
         self.prompts = get_prompt_service()
 
+    @property
+    def client(self):
+        # shared pooled genai client; constructing this service per request is cheap
+        return get_gemini_client(self._gemini_key)
+
     async def generate_note(
         self,
         db: Session,
@@ -35,10 +63,45 @@ class NodeNoteService:
         Generates a short, study-focused note for a concept.
         Targeted synthesis - always uses RAG (top 3-5 chunks), no context cache.
         """
-        context_chunks = self._get_context(db, project_id, concept_id)
+        context_chunks = await self._get_context(db, project_id, concept_id)
         chunk_count = len(context_chunks.split("\n\n")) if context_chunks else 0
         logger.info(f"retrieved {chunk_count} RAG chunks for {concept_id}")
 
+        valid_ids = try_load_valid_ids(db, project_id)
+        return await self._compose_note(concept_id, context_chunks, valid_ids, outbound_links)
+
+    async def generate_notes_batch(
+        self,
+        db: Session,
+        project_id: str,
+        nodes: List[Tuple[str, List[str] | None]],
+    ) -> Dict[str, str]:
+        """
+        notes for many (concept_id, outbound_links) at once: one embedding call, one lateral-join
+        chunk query and one valid-id load for the whole batch; generation runs concurrently.
+        returns {concept_id: note}.
+        """
+        if not nodes:
+            return {}
+        concept_ids = [concept_id for concept_id, _ in nodes]
+        contexts = await self._get_contexts(db, project_id, concept_ids)
+        valid_ids = try_load_valid_ids(db, project_id)
+        logger.info(f"retrieved RAG context for {len(concept_ids)} concepts in one query")
+
+        notes = await asyncio.gather(*(
+            self._compose_note(concept_id, contexts[concept_id], valid_ids, outbound_links)
+            for concept_id, outbound_links in nodes
+        ))
+        return dict(zip(concept_ids, notes))
+
+    async def _compose_note(
+        self,
+        concept_id: str,
+        context_chunks: str,
+        valid_ids: Set[str] | None,
+        outbound_links: List[str] | None = None,
+    ) -> str:
+        """prompt + generation + markdown repair for one concept with its retrieved context"""
         links_str = ", ".join([f"[[{link}]]" for link in (outbound_links or [])])
 
         prompt = self.prompts.render(
@@ -53,9 +116,6 @@ class NodeNoteService:
             response = await self._generate_content_with_retry(prompt, config)
 
             note_content = response.text.strip().lower()
-            valid_ids = {n.concept_id for n in db.query(models.GraphNode).filter(
-                models.GraphNode.project_id == project_id
-            ).all()}
             note_content = repair_note_markdown(note_content, valid_concept_ids=valid_ids)
 
             # append missing links to content
@@ -75,24 +135,59 @@ class NodeNoteService:
 
     @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
     async def _generate_content_with_retry(self, prompt: str, config: dict):
-        return await self.client.aio.models.generate_content(
+        return await self.limiter.call(
+            self.client.aio.models.generate_content,
             model=self.model_id,
             contents=prompt,
             config=config
         )
 
-    def _get_context(self, db: Session, project_id: str, concept_id: str) -> str:
-        """rag: vector search for top 5 chunks relevant to concept_id."""
+    async def _get_contexts(self, db: Session, project_id: str, concept_ids: List[str]) -> Dict[str, str]:
+        """
+        rag for a batch: recorded provenance first (one query, no embedding); the rest are embedded
+        together and get their top 5 chunks from one vector query.
+        each lookup runs in a savepoint, so a failed query leaves the caller's transaction usable.
+        """
         try:
+            with db.begin_nested():
+                recorded = ConceptProvenanceService(db).contexts(project_id, concept_ids, k=5)
+        except Exception as e:
+            logger.error(f"failed to load provenance context for {len(concept_ids)} concepts: {e}")
+            recorded = {}
+        contexts = {concept_id: "\n\n".join(texts) for concept_id, texts in recorded.items()}
+        remaining = [c for c in dict.fromkeys(concept_ids) if c not in contexts]
+        logger.info(f"provenance context for {len(contexts)}/{len(contexts) + len(remaining)} concepts")
+        if not remaining:
+            return contexts
+
+        try:
+            query_vectors = await self.embedder.aget_embeddings(remaining)
+            with db.begin_nested():
+                hits = ChunkRetrievalService(db).search_many(project_id, query_vectors, k=5)
+        except Exception as e:
+            logger.error(f"failed to retrieve batch context for {len(remaining)} concepts: {e}")
+            hits = [None] * len(remaining)
+        for concept_id, chunks in zip(remaining, hits):
+            if chunks is None:
+                contexts[concept_id] = ""
+            else:
+                contexts[concept_id] = "\n\n".join(c.content for c in chunks) if chunks else "no specific course context found."
+        return contexts
+
+    async def _get_context(self, db: Session, project_id: str, concept_id: str) -> str:
+        """rag: recorded provenance chunks, else vector search for top 5 chunks relevant to concept_id."""
+        try:
+            with db.begin_nested():
+                recorded = ConceptProvenanceService(db).contexts(project_id, [concept_id], k=5)
+            if concept_id in recorded:
+                return "\n\n".join(recorded[concept_id])
+
             # get query embedding
-            query_vector = self.embedder.get_embedding(concept_id)
+            query_vector = await self.embedder.aget_embedding(concept_id)
             
-            # find top relevant chunks across all files in the project
-            chunks = db.query(models.Chunk).join(models.File).filter(
-                models.File.project_id == project_id
-            ).order_by(
-                models.Chunk.embedding.cosine_distance(query_vector)
-            ).limit(5).all()
+            # find top relevant chunks across all files in the project (plan depends on project size)
+            with db.begin_nested():
+                chunks = ChunkRetrievalService(db).search(project_id, query_vector, k=5)
             
             if not chunks:
                 return "no specific course context found."
@@ -1,15 +1,22 @@
 """
 orphanlinkservice: fix degree-0 nodes by suggesting related concepts via cheap openrouter model.
+orphans are packed into batched prompts that run concurrently; each orphan only sees its
+top-k semantically nearest canonical concepts when an embedder is available.
 """
+import asyncio
 import json
 import logging
-from typing import Dict, List, Set
+from typing import Dict, List, Optional
 
-from openai import AsyncOpenAI
+import numpy as np
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 from schemas.graph import GraphData
+from services.embedding_service import EmbeddingService
+from services.graph.compact import CompactGraph
 from services.llm.prompt_service import get_prompt_service
+from services.llm.concurrency import get_limiter
+from services.llm.clients import get_openrouter_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,87 +25,140 @@ class OrphanLinkService:
     """
     suggests outbound + inbound links for degree-0 nodes using cheap openrouter model.
     only runs for nodes with 0 outbound and 0 inbound links.
-    no rag — uses canonical list only.
+    no rag — candidates come from the canonical list (top-k nearest per orphan with an embedder, else all).
     """
 
     OPENROUTER_MODEL = "meta-llama/llama-3.1-8b-instruct"
     MAX_LINKS_PER_DIRECTION = 5
 
-    def __init__(self, openrouter_key: str):
+    def __init__(
+        self,
+        openrouter_key: str,
+        embedder: Optional[EmbeddingService] = None,
+        batch_size: int = 15,
+        candidates_k: int = 40,
+    ):
         if not openrouter_key:
             raise ValueError("OpenRouter API key required for OrphanLinkService.")
-        self._client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=openrouter_key,
-        )
+        self._openrouter_key = openrouter_key
+        self.limiter = get_limiter("openrouter", openrouter_key)
         self.prompts = get_prompt_service()
+        self.embedder = embedder
+        self.batch_size = max(1, batch_size)
+        self.candidates_k = candidates_k
+
+    @property
+    def _client(self):
+        # shared pooled client from the registry (rebuilt transparently for a new event loop)
+        return get_openrouter_client(self._openrouter_key)
 
     async def fix_degree_zero_nodes(self, graph_data: GraphData) -> GraphData:
         """
         for each degree-0 node, ask llm which concepts relate (outbound + inbound).
-        adds valid links in-place. returns the same graph_data (modified).
+        returns a new graphdata with the valid links added.
         """
-        node_map = {n.id: n for n in graph_data.nodes}
-        canonical_ids: Set[str] = set(node_map.keys())
-        canonical_list = sorted(canonical_ids)
+        graph = CompactGraph.from_graph_data(graph_data)
+        graph = await self.fix_degree_zero_compact(graph)
+        return graph.to_graph_data()
 
+    async def fix_degree_zero_compact(self, graph: CompactGraph) -> CompactGraph:
+        """same as fix_degree_zero_nodes on the interned graph. adds links in-place and returns graph."""
         orphans = [
-            n for n in graph_data.nodes
-            if not n.outbound_links and not n.inbound_links
+            idx for idx in range(len(graph))
+            if not graph.out_adj[idx] and not graph.in_adj[idx]
         ]
 
         if not orphans:
             logger.info("no degree-0 nodes to fix.")
-            return graph_data
+            return graph
 
-        logger.info(f"fixing {len(orphans)} degree-0 nodes via orphan link completion...")
+        logger.info(f"fixing {len(orphans)} degree-0 nodes via batched orphan link completion...")
 
-        id_lower_to_canonical = {c.lower(): c for c in canonical_ids}
+        id_lower_to_canonical = {c.lower(): c for c in graph.ids}
+        candidates = await self._candidate_lists(graph, orphans)
+        shared_candidates = sorted(graph.ids) if candidates is None else None
 
-        for node in orphans:
+        batches = [orphans[i:i + self.batch_size] for i in range(0, len(orphans), self.batch_size)]
+
+        async def run_batch(batch: List[int]) -> Dict[str, Dict[str, List[str]]]:
+            items = [
+                {
+                    "concept_id": graph.ids[idx],
+                    "candidates": candidates[idx] if candidates is not None else None,
+                }
+                for idx in batch
+            ]
             try:
-                result = await self._suggest_links(
-                    concept_id=node.id,
-                    canonical_list=canonical_list,
-                )
+                return await self._suggest_links_batch(items, shared_candidates)
+            except Exception as e:
+                logger.warning(f"orphan link completion failed for {[i['concept_id'] for i in items]}: {e}")
+                return {}
+
+        # batches run concurrently; the shared openrouter limiter bounds in-flight requests
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+        for batch, result in zip(batches, results):
+            for idx in batch:
+                node_id = graph.ids[idx]
+                suggestion = result.get(node_id.lower())
+                if not suggestion:
+                    continue
 
                 outbound_valid = self._filter_valid(
-                    result.get("outbound", []),
+                    suggestion.get("outbound", []),
                     id_lower_to_canonical,
-                    node.id,
+                    node_id,
                 )
                 inbound_valid = self._filter_valid(
-                    result.get("inbound", []),
+                    suggestion.get("inbound", []),
                     id_lower_to_canonical,
-                    node.id,
+                    node_id,
                 )
 
                 # add outbound: node -> target
                 for target_id in outbound_valid[: self.MAX_LINKS_PER_DIRECTION]:
-                    if target_id not in node.outbound_links:
-                        node.outbound_links.append(target_id)
-                    target_node = node_map.get(target_id)
-                    if target_node and node.id not in target_node.inbound_links:
-                        target_node.inbound_links.append(node.id)
+                    graph.add_edge(idx, graph.index[target_id])
 
                 # add inbound: source -> node
                 for source_id in inbound_valid[: self.MAX_LINKS_PER_DIRECTION]:
-                    if source_id not in node.inbound_links:
-                        node.inbound_links.append(source_id)
-                    source_node = node_map.get(source_id)
-                    if source_node and node.id not in source_node.outbound_links:
-                        source_node.outbound_links.append(node.id)
+                    graph.add_edge(graph.index[source_id], idx)
 
                 if outbound_valid or inbound_valid:
                     logger.info(
-                        f"orphan '{node.id}' linked: outbound={outbound_valid}, inbound={inbound_valid}"
+                        f"orphan '{node_id}' linked: outbound={outbound_valid}, inbound={inbound_valid}"
                     )
 
-            except Exception as e:
-                logger.warning(f"orphan link completion failed for {node.id}: {e}")
-                continue
+        return graph
 
-        return graph_data
+    async def _candidate_lists(self, graph: CompactGraph, orphans: List[int]) -> Optional[Dict[int, List[str]]]:
+        """
+        top-k nearest canonical ids per orphan by embedding cosine (self excluded).
+        returns None (use the full canonical list) without an embedder, for small graphs, or on failure.
+        """
+        if self.embedder is None or len(graph) - 1 <= self.candidates_k:
+            return None
+        try:
+            vectors = await self.embedder.aget_embeddings(graph.ids)
+        except Exception as e:
+            logger.warning(f"failed to embed concepts for orphan candidates, using full list: {e}")
+            return None
+
+        X = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        X /= norms
+
+        rows = np.asarray(orphans)
+        sims = X[rows] @ X.T
+        sims[np.arange(len(rows)), rows] = -np.inf
+        k = self.candidates_k
+        top = np.argpartition(-sims, k, axis=1)[:, :k]
+
+        candidates = {}
+        for r, idx in enumerate(orphans):
+            ordered = top[r][np.argsort(-sims[r, top[r]])]
+            candidates[idx] = [graph.ids[j] for j in ordered]
+        return candidates
 
     def _filter_valid(
         self,
@@ -119,28 +179,29 @@ class OrphanLinkService:
         return valid
 
     @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
-    async def _suggest_links(
+    async def _suggest_links_batch(
         self,
-        concept_id: str,
-        canonical_list: List[str],
-    ) -> Dict[str, List[str]]:
-        """call cheap llm to suggest outbound + inbound links."""
+        items: List[Dict],
+        shared_candidates: Optional[List[str]],
+    ) -> Dict[str, Dict[str, List[str]]]:
+        """one llm call for several orphans. returns {lowercased concept id: {"outbound", "inbound"}}."""
         prompt = self.prompts.render(
-            "orphan_link_completion.jinja",
-            concept_id=concept_id,
-            canonical_list=canonical_list,
+            "orphan_link_batch.jinja",
+            orphans=items,
+            shared_candidates=shared_candidates,
         )
 
-        response = await self._client.chat.completions.create(
+        response = await self.limiter.call(
+            self._client.chat.completions.create,
             model=self.OPENROUTER_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.0,
         )
         raw = response.choices[0].message.content.strip()
-        return self._parse_structured(raw)
+        return self._parse_batch(raw)
 
-    def _parse_structured(self, raw: str) -> Dict[str, List[str]]:
-        """parse {"outbound": [...], "inbound": [...]} from string."""
+    def _parse_batch(self, raw: str) -> Dict[str, Dict[str, List[str]]]:
+        """parse {"concept": {"outbound": [...], "inbound": [...]}, ...} from string."""
         if raw.startswith("```json"):
             raw = raw[7:].strip()
         if raw.startswith("```"):
@@ -149,13 +210,21 @@ class OrphanLinkService:
             raw = raw[:-3].strip()
         try:
             obj = json.loads(raw)
-            if not isinstance(obj, dict):
-                return {"outbound": [], "inbound": []}
-            outbound = obj.get("outbound", [])
-            inbound = obj.get("inbound", [])
-            return {
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(obj, dict):
+            return {}
+
+        parsed = {}
+        for concept_id, links in obj.items():
+            if not isinstance(links, dict):
+                continue
+            outbound = links.get("outbound") or []
+            inbound = links.get("inbound") or []
+            if not isinstance(outbound, list) or not isinstance(inbound, list):
+                continue
+            parsed[str(concept_id).strip().lower()] = {
                 "outbound": [str(x).strip().lower() for x in outbound if x],
                 "inbound": [str(x).strip().lower() for x in inbound if x],
             }
-        except json.JSONDecodeError:
-            return {"outbound": [], "inbound": []}
+        return parsed
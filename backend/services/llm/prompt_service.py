@@ -1,4 +1,5 @@
 import os
+import hashlib
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 class PromptService:
@@ -24,6 +25,11 @@ class PromptService:
         template = self.env.get_template(template_name)
         return template.render(**kwargs)
 
+    def template_version(self, template_name: str) -> str:
+        """short content hash of the template source; changes whenever the prompt is edited"""
+        source, _, _ = self.env.loader.get_source(self.env, template_name)
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
 # singleton instance
 _prompt_service = None
 
@@ -2,14 +2,17 @@
 SeedExtractor: extract canonical concept IDs from document headers.
 Uses OpenRouter (cheap model). OpenRouter key is REQUIRED (no fallback).
 """
+import asyncio
 import json
 import logging
 from typing import List
 
-from openai import AsyncOpenAI
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 from services.llm.prompt_service import get_prompt_service
+from services.llm.concurrency import get_limiter
+from services.llm.clients import get_openrouter_client
+from services.kv_cache import content_key, get_kv_cache
 
 logger = logging.getLogger(__name__)
 
@@ -21,18 +24,25 @@ class SeedExtractor:
     """
 
     OPENROUTER_MODEL = "meta-llama/llama-3.1-8b-instruct"
+    TEMPLATE = "global_seed_header.jinja"
+    CACHE_NAMESPACE = "seed_extraction"
 
-    def __init__(self, openrouter_key: str):
+    def __init__(self, openrouter_key: str, cache=None, use_cache: bool = True):
         if not openrouter_key:
             raise ValueError(
                 "OpenRouter API key is required for SeedExtractor. "
                 "There is no fallback. Add it via config (web app or CLI)."
             )
-        self._client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=openrouter_key,
-        )
+        self._openrouter_key = openrouter_key
+        self.limiter = get_limiter("openrouter", openrouter_key)
         self.prompts = get_prompt_service()
+        # a stable seed list is what makes per-chunk extraction cache keys repeat on re-upload
+        self.cache = (cache or get_kv_cache(self.CACHE_NAMESPACE)) if use_cache else None
+
+    @property
+    def _client(self):
+        # shared pooled client from the registry (rebuilt transparently for a new event loop)
+        return get_openrouter_client(self._openrouter_key)
 
     async def extract_seed_from_headers(self, header_text: str) -> List[str]:
         """
@@ -43,20 +53,42 @@ class SeedExtractor:
             logger.warning("empty header text, returning empty seed")
             return []
 
+        key = content_key(
+            header_text.strip(),
+            self.OPENROUTER_MODEL,
+            self.prompts.template_version(self.TEMPLATE),
+        )
+        if self.cache is not None:
+            try:
+                cached = await asyncio.to_thread(self.cache.get, key)
+                if cached is not None:
+                    logger.info("using cached seed list")
+                    return cached
+            except Exception as e:
+                logger.warning(f"seed cache read failed: {e}")
+
         prompt = self.prompts.render(
-            "global_seed_header.jinja",
+            self.TEMPLATE,
             header_text=header_text.strip(),
         )
 
         try:
-            return await self._call_openrouter(prompt)
+            seed_ids = await self._call_openrouter(prompt)
         except Exception as e:
             logger.error(f"seed extraction failed: {e}")
             return []
 
+        if seed_ids and self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.set, key, seed_ids)
+            except Exception as e:
+                logger.warning(f"seed cache write failed: {e}")
+        return seed_ids
+
     @retry(wait=wait_exponential(multiplier=1, max=10), stop=stop_after_attempt(3))
     async def _call_openrouter(self, prompt: str) -> List[str]:
-        response = await self._client.chat.completions.create(
+        response = await self.limiter.call(
+            self._client.chat.completions.create,
             model=self.OPENROUTER_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.0,
@@ -0,0 +1,124 @@
+"""
+conceptprovenanceservice: concept -> chunk provenance for note rag.
+ingestion knows which extraction window (create_extraction_chunks, ~8k chars) each concept was
+extracted from; the stored chunks overlapping those windows that mention the concept (id or an
+alias) are recorded in concept_chunks, ranked by mention count. note generation reads them
+instead of embedding the concept and running a vector search.
+"""
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Integer, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db import models
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNKS_PER_CONCEPT = 8
+MIN_CONTEXT_CHUNKS = 2  # fewer recorded chunks than this -> vector search instead
+BATCH_SIZE = 500
+
+
+def mention_pattern(terms: Sequence[str]) -> Optional[re.Pattern]:
+    """whole-word, case-insensitive match for any term (plural endings allowed); None if no usable term"""
+    usable = sorted({t.lower().strip() for t in terms if t and len(t.strip()) >= 3}, key=len, reverse=True)
+    if not usable:
+        return None
+    alternation = "|".join(r"\s+".join(re.escape(w) for w in t.split()) for t in usable)
+    return re.compile(rf"\b(?:{alternation})(?:s|es)?\b", re.IGNORECASE)
+
+
+def link_concepts(
+    concepts: Dict[str, List[str]],
+    sources: Dict[str, Set[int]],
+    windows: List[Tuple[int, int]],
+    chunks: List[Dict],
+    limit: int = MAX_CHUNKS_PER_CONCEPT,
+) -> List[Dict]:
+    """
+    provenance rows for concepts ({id: aliases}).
+    sources: extraction window indices per concept id; windows: (start, end) offsets of each window;
+    chunks: stored chunks as {id, start, end, content} (chunks without offsets are skipped).
+    returns [{concept_id, chunk_id, score}] with up to `limit` chunks per concept.
+    """
+    located = [c for c in chunks if c.get("start") is not None and c.get("end") is not None]
+    in_window = [
+        [i for i, c in enumerate(located) if c["start"] < end and c["end"] > start]
+        for start, end in windows
+    ]
+
+    rows = []
+    for concept_id, aliases in concepts.items():
+        pattern = mention_pattern([concept_id, *aliases])
+        window_ids = sources.get(concept_id)
+        if pattern is None or not window_ids:
+            continue
+        candidates = sorted({i for w in window_ids if 0 <= w < len(in_window) for i in in_window[w]})
+        scored = []
+        for i in candidates:
+            score = len(pattern.findall(located[i]["content"]))
+            if score:
+                scored.append((score, i))
+        # most mentions first, then document order
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        rows.extend(
+            {"concept_id": concept_id, "chunk_id": located[i]["id"], "score": score}
+            for score, i in scored[:limit]
+        )
+    return rows
+
+
+class ConceptProvenanceService:
+    """
+    reads and writes concept_chunks.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save(self, project_id: str, rows: List[Dict]) -> int:
+        """upserts provenance rows (caller commits)"""
+        table = models.ConceptChunk.__table__
+        for i in range(0, len(rows), BATCH_SIZE):
+            stmt = insert(table).values([{**row, "project_id": project_id} for row in rows[i:i + BATCH_SIZE]])
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.project_id, table.c.concept_id, table.c.chunk_id],
+                set_={"score": stmt.excluded.score},
+            ))
+        return len(rows)
+
+    def contexts(self, project_id: str, concept_ids: List[str], k: int = 5) -> Dict[str, List[str]]:
+        """
+        up to k recorded chunk texts per concept (best first) from one query.
+        concepts with fewer than MIN_CONTEXT_CHUNKS recorded chunks are left out.
+        """
+        if not concept_ids:
+            return {}
+        ranked = select(
+            models.ConceptChunk.concept_id,
+            models.Chunk.content,
+            func.row_number().over(
+                partition_by=models.ConceptChunk.concept_id,
+                order_by=(
+                    models.ConceptChunk.score.desc(),
+                    models.Chunk.chunk_metadata["start"].astext.cast(Integer),
+                ),
+            ).label("rank"),
+        ).join(
+            models.Chunk, models.Chunk.id == models.ConceptChunk.chunk_id
+        ).where(
+            models.ConceptChunk.project_id == project_id,
+            models.ConceptChunk.concept_id.in_(list(dict.fromkeys(concept_ids))),
+        ).subquery()
+
+        found: Dict[str, List[str]] = {}
+        for concept_id, content in self.db.execute(
+            select(ranked.c.concept_id, ranked.c.content)
+            .where(ranked.c.rank <= k)
+            .order_by(ranked.c.concept_id, ranked.c.rank)
+        ):
+            found.setdefault(concept_id, []).append(content)
+        return {c: texts for c, texts in found.items() if len(texts) >= MIN_CONTEXT_CHUNKS}
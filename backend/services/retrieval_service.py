@@ -0,0 +1,262 @@
+"""
+chunkretrievalservice: project-scoped vector search over chunks for note rag.
+the query plan is picked from the project's chunk count:
+- small / medium projects: exact scan of the project's rows (idx_chunks_project_id), perfect recall
+- large projects: hnsw walk with an ef_search sized for the query (plus an iterative scan on
+  pgvector 0.8+); the largest projects get their own partial hnsw index, which the planner picks
+  up automatically
+a filtered hnsw walk that comes back short falls back to the exact scan.
+"""
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DIMS = 1536
+MAX_EF_SEARCH = 1000  # pgvector's upper bound for hnsw.ef_search
+
+# project chunk counts, refreshed after a few minutes (new uploads add chunks)
+_SIZE_TTL_SECONDS = 300
+_SIZE_MEMO_MAX = 4096
+_sizes: Dict[str, Tuple[int, float]] = {}
+
+# whether the installed pgvector has iterative index scans (0.8+); probed once per process
+_iterative_scan: Optional[bool] = None
+
+
+def ef_search_for(k: int, project_size: int, table_size: int, floor: int = 64) -> int:
+    """
+    hnsw.ef_search for one query: enough candidates for k results after the project filter.
+    without iterative scans a global walk keeps roughly project_size / table_size of its
+    candidates, so the candidate list is widened by that selectivity (capped at pgvector's max).
+    """
+    ef = max(floor, 4 * k)
+    if project_size > 0 and table_size > project_size:
+        ef = max(ef, int(k * table_size / project_size))
+    return min(ef, MAX_EF_SEARCH)
+
+
+def supports_iterative_scan(version: Optional[str]) -> bool:
+    """True for pgvector extversion strings 0.8 and up (hnsw.iterative_scan / hnsw.max_scan_tuples)"""
+    try:
+        parts = tuple(int(p) for p in (version or "").split(".")[:2])
+    except ValueError:
+        return False
+    return len(parts) == 2 and parts >= (0, 8)
+
+
+def partial_index_name(project_id) -> str:
+    return f"chunks_embedding_p_{uuid.UUID(str(project_id)).hex}"
+
+
+_EXACT_SQL = text("""
+    SELECT id, content, distance
+    FROM (
+        SELECT id, content, embedding <=> :q AS distance
+        FROM chunks
+        WHERE project_id = :pid
+        OFFSET 0  -- optimisation fence, so the outer sort can't use the global hnsw index
+    ) c
+    ORDER BY distance
+    LIMIT :k
+""").bindparams(bindparam("q", type_=Vector(DIMS)))
+
+_HNSW_SQL = text("""
+    WITH hits AS MATERIALIZED (
+        SELECT id, content, embedding <=> :q AS distance
+        FROM chunks
+        WHERE project_id = :pid
+        ORDER BY embedding <=> :q
+        LIMIT :k
+    )
+    SELECT id, content, distance FROM hits ORDER BY distance
+""").bindparams(bindparam("q", type_=Vector(DIMS)))
+
+
+# one row per (query, hit): every query's top-k in a single round trip.
+# queries travel as a text[] of vector literals; {inner} is the per-plan top-k subquery
+_BATCH_SQL = """
+    WITH queries AS (
+        SELECT (u.ord - 1)::int AS idx, CAST(u.v AS vector) AS embedding
+        FROM unnest(CAST(:vecs AS text[])) WITH ORDINALITY AS u(v, ord)
+    )
+    SELECT q.idx, hit.id, hit.content, hit.distance
+    FROM queries q
+    CROSS JOIN LATERAL (
+        {inner}
+    ) hit
+    ORDER BY q.idx, hit.distance
+"""
+
+_BATCH_EXACT_INNER = """
+        SELECT id, content, distance
+        FROM (
+            SELECT c.id, c.content, c.embedding <=> q.embedding AS distance
+            FROM chunks c
+            WHERE c.project_id = :pid
+            OFFSET 0
+        ) c
+        ORDER BY distance
+        LIMIT :k
+"""
+
+_BATCH_HNSW_INNER = """
+        SELECT c.id, c.content, c.embedding <=> q.embedding AS distance
+        FROM chunks c
+        WHERE c.project_id = :pid
+        ORDER BY c.embedding <=> q.embedding
+        LIMIT :k
+"""
+
+
+def vector_literal(values: Sequence[float]) -> str:
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+class ChunkRetrievalService:
+    """
+    top-k chunk search within one project.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.settings = get_settings()
+        self.last_plan: Optional[str] = None
+
+    def search(self, project_id: str, query_vector: Sequence[float], k: int = 5) -> List:
+        """rows (id, content, distance) nearest to query_vector by cosine distance, closest first"""
+        size = self.project_size(project_id)
+        if size == 0:
+            self.last_plan = "empty"
+            return []
+        if size <= self.settings.CHUNK_EXACT_SCAN_MAX:
+            self.last_plan = "exact"
+            return self._exact(project_id, query_vector, k)
+
+        rows = self._hnsw(project_id, query_vector, k, size)
+        if len(rows) >= min(k, size):
+            self.last_plan = "hnsw"
+            return rows
+        # the filtered walk exhausted its budget before finding k of this project's rows
+        logger.info(f"hnsw returned {len(rows)}/{k} chunks for project {project_id}; exact scan fallback")
+        self.last_plan = "exact_fallback"
+        return self._exact(project_id, query_vector, k)
+
+    def search_many(self, project_id: str, query_vectors: Sequence[Sequence[float]], k: int = 5) -> List[List]:
+        """
+        top-k rows (id, content, distance) for each query vector, in input order, from one
+        lateral-join query. same plan choice (and short-result fallback) as search().
+        """
+        results: List[List] = [[] for _ in query_vectors]
+        if not query_vectors:
+            return results
+        size = self.project_size(project_id)
+        if size == 0:
+            self.last_plan = "empty"
+            return results
+
+        exact = size <= self.settings.CHUNK_EXACT_SCAN_MAX
+        if not exact:
+            self._configure_hnsw(k, size)
+        sql = text(_BATCH_SQL.format(inner=_BATCH_EXACT_INNER if exact else _BATCH_HNSW_INNER))
+        rows = self.db.execute(sql, {
+            "vecs": [vector_literal(v) for v in query_vectors],
+            "pid": str(project_id),
+            "k": k,
+        }).all()
+        for row in rows:
+            results[row.idx].append(row)
+        self.last_plan = "exact" if exact else "hnsw"
+
+        short = [i for i, hits in enumerate(results) if len(hits) < min(k, size)]
+        if short and not exact:
+            logger.info(f"hnsw returned short results for {len(short)}/{len(results)} queries; exact scan fallback")
+            for i in short:
+                results[i] = self._exact(project_id, query_vectors[i], k)
+        return results
+
+    def project_size(self, project_id: str) -> int:
+        key = str(project_id)
+        cached = _sizes.get(key)
+        if cached and time.time() - cached[1] < _SIZE_TTL_SECONDS:
+            return cached[0]
+        size = self.db.execute(
+            text("SELECT count(*) FROM chunks WHERE project_id = :pid"), {"pid": key}
+        ).scalar_one()
+        if len(_sizes) >= _SIZE_MEMO_MAX:
+            _sizes.clear()
+        _sizes[key] = (size, time.time())
+        return size
+
+    def _exact(self, project_id: str, query_vector: Sequence[float], k: int) -> List:
+        return self.db.execute(_EXACT_SQL, {"q": query_vector, "pid": str(project_id), "k": k}).all()
+
+    def _hnsw(self, project_id: str, query_vector: Sequence[float], k: int, size: int) -> List:
+        self._configure_hnsw(k, size)
+        return self.db.execute(_HNSW_SQL, {"q": query_vector, "pid": str(project_id), "k": k}).all()
+
+    def _configure_hnsw(self, k: int, size: int):
+        # reltuples is the planner's row estimate: free, and close enough for sizing ef_search
+        table_size = self.db.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'chunks'::regclass")
+        ).scalar() or size
+        ef = ef_search_for(k, size, table_size, floor=self.settings.CHUNK_HNSW_EF_SEARCH)
+        # transaction-local settings (set_config(..., true) == SET LOCAL). pgvector < 0.8 has no
+        # hnsw.iterative_scan / hnsw.max_scan_tuples: setting them there raises and aborts the
+        # transaction, so they're only set on 0.8+ (older versions rely on the short-result fallback)
+        if self._has_iterative_scan():
+            self.db.execute(text("""
+                SELECT set_config('hnsw.ef_search', :ef, true),
+                       set_config('hnsw.iterative_scan', 'relaxed_order', true),
+                       set_config('hnsw.max_scan_tuples', :max_scan, true)
+            """), {"ef": str(ef), "max_scan": str(self.settings.CHUNK_HNSW_MAX_SCAN_TUPLES)})
+        else:
+            self.db.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef)})
+
+    def _has_iterative_scan(self) -> bool:
+        global _iterative_scan
+        if _iterative_scan is None:
+            version = self.db.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar()
+            _iterative_scan = supports_iterative_scan(version)
+            if not _iterative_scan:
+                logger.info(f"pgvector {version} has no iterative index scans; using ef_search only")
+        return _iterative_scan
+
+    def ensure_project_index(self, project_id: str, min_chunks: Optional[int] = None) -> bool:
+        """
+        builds a partial hnsw index for one project once it reaches min_chunks (default
+        CHUNK_PARTIAL_INDEX_MIN) chunks, concurrently and outside the session's transaction.
+        returns True if the index exists afterwards.
+        """
+        threshold = self.settings.CHUNK_PARTIAL_INDEX_MIN if min_chunks is None else min_chunks
+        if threshold <= 0:
+            return False
+        _sizes.pop(str(project_id), None)
+        if self.project_size(project_id) < threshold:
+            return False
+        name = partial_index_name(project_id)
+        start = time.time()
+        with self.db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # project_id is a validated uuid literal: partial index predicates can't be bind parameters
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON chunks "
+                f"USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64) "
+                f"WHERE project_id = '{uuid.UUID(str(project_id))}'"
+            ))
+        logger.info(f"partial hnsw index {name} ready in {time.time() - start:.1f}s")
+        return True
+
+    def drop_project_index(self, project_id: str):
+        _sizes.pop(str(project_id), None)
+        with self.db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {partial_index_name(project_id)}"))
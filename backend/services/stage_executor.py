@@ -0,0 +1,49 @@
+"""
+stageexecutor: runs independent pipeline branches concurrently and joins them.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class StageExecutor:
+    """
+    runs named async branches side by side and records per-branch wall time.
+    if any branch fails, the remaining branches are cancelled and the error is re-raised.
+    """
+
+    def __init__(self, timings: Dict[str, float]):
+        self.timings = timings
+
+    async def run(self, branches: Dict[str, Callable[[], Awaitable[Any]]]) -> Dict[str, Any]:
+        """
+        runs every branch concurrently. returns {branch_name: result} once all have finished.
+        timings are written as timings[branch_name] (seconds).
+        """
+        async def timed(name: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+            start = time.time()
+            try:
+                return await factory()
+            finally:
+                self.timings[name] = time.time() - start
+                logger.info(f"stage '{name}' finished in {self.timings[name]:.2f}s")
+
+        tasks = {
+            name: asyncio.create_task(timed(name, factory))
+            for name, factory in branches.items()
+        }
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            # wait for cancellations so no branch outlives the pipeline
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from db.session import async_database_url
+
+
+def test_async_url_swaps_driver_and_translates_ssl():
+    url = async_database_url(
+        "postgresql://user:pw@ep-x-pooler.us-east-2.aws.neon.tech/neondb?sslmode=require&channel_binding=require"
+    )
+    assert url.drivername == "postgresql+asyncpg"
+    assert url.host == "ep-x-pooler.us-east-2.aws.neon.tech"
+    assert dict(url.query) == {"ssl": "require"}
+
+
+def test_async_url_keeps_plain_local_urls():
+    url = async_database_url("postgresql+psycopg2://u:p@localhost:5432/db")
+    assert url.render_as_string(hide_password=False) == "postgresql+asyncpg://u:p@localhost:5432/db"
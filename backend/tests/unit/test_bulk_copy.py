@@ -0,0 +1,47 @@
+import os
+import struct
+import sys
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from db.bulk import CHUNK_COLUMNS, encode_chunk_row, encode_jsonb, encode_vector
+
+
+def read_fields(row: bytes):
+    (count,) = struct.unpack_from("!h", row, 0)
+    offset, fields = 2, []
+    for _ in range(count):
+        (length,) = struct.unpack_from("!i", row, offset)
+        offset += 4
+        if length == -1:
+            fields.append(None)
+            continue
+        fields.append(row[offset:offset + length])
+        offset += length
+    assert offset == len(row)
+    return fields
+
+
+def test_vector_and_jsonb_binary_encoding():
+    payload = encode_vector([1.0, -0.5, 0.25])
+    assert struct.unpack("!ihh3f", payload) == (4 + 12, 3, 0, 1.0, -0.5, 0.25)
+    assert encode_vector(None) == struct.pack("!i", -1)
+    assert encode_jsonb({"page": 2})[4:] == b'\x01{"page": 2}'
+
+
+def test_chunk_row_layout():
+    chunk_id, file_id = uuid.uuid4(), uuid.uuid4()
+    fields = read_fields(encode_chunk_row({
+        "id": chunk_id,
+        "file_id": str(file_id),
+        "content": "limits\x00 and continuity",
+        "embedding": [0.5] * 4,
+        "chunk_metadata": None,
+    }))
+
+    assert len(fields) == len(CHUNK_COLUMNS)
+    assert fields[0] == chunk_id.bytes and fields[1] == file_id.bytes
+    assert fields[2] == "limits and continuity".encode()
+    assert struct.unpack("!hh4f", fields[3]) == (4, 0, 0.5, 0.5, 0.5, 0.5)
+    assert fields[4] == b"\x01{}"
@@ -0,0 +1,85 @@
+import os
+import sys
+import uuid
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import retrieval_service
+from services.retrieval_service import (
+    ChunkRetrievalService, ef_search_for, partial_index_name, supports_iterative_scan,
+)
+
+
+def test_ef_search_scales_with_selectivity():
+    assert ef_search_for(5, 1000, 1000) == 64
+    assert ef_search_for(5, 50_000, 1_000_000) == 100
+    assert ef_search_for(5, 1_000, 10_000_000) == 1000
+
+
+def test_partial_index_name_is_a_safe_identifier():
+    project_id = uuid.uuid4()
+    name = partial_index_name(str(project_id))
+    assert name == f"chunks_embedding_p_{project_id.hex}" and len(name) < 63
+
+
+def make_service(size, hnsw_rows):
+    service = ChunkRetrievalService(MagicMock())
+    service.settings = MagicMock(CHUNK_EXACT_SCAN_MAX=20_000)
+    service.project_size = lambda project_id: size
+    service._exact = MagicMock(return_value=["exact"] * 5)
+    service._hnsw = MagicMock(return_value=hnsw_rows)
+    return service
+
+
+def test_plan_follows_project_size():
+    small = make_service(500, [])
+    assert small.search("p", [0.0], k=5) == ["exact"] * 5 and small.last_plan == "exact"
+    small._hnsw.assert_not_called()
+
+    large = make_service(80_000, ["hnsw"] * 5)
+    assert large.search("p", [0.0], k=5) == ["hnsw"] * 5 and large.last_plan == "hnsw"
+
+    assert make_service(0, []).search("p", [0.0]) == []
+
+
+def test_short_hnsw_result_falls_back_to_exact():
+    service = make_service(80_000, ["hnsw"] * 2)
+    assert service.search("p", [0.0], k=5) == ["exact"] * 5
+    assert service.last_plan == "exact_fallback"
+
+
+def test_search_many_groups_rows_by_query():
+    from types import SimpleNamespace
+
+    db = MagicMock()
+    db.execute.return_value.all.return_value = [
+        SimpleNamespace(idx=0, content="a"), SimpleNamespace(idx=2, content="b"), SimpleNamespace(idx=0, content="c"),
+    ]
+    service = ChunkRetrievalService(db)
+    service.settings = MagicMock(CHUNK_EXACT_SCAN_MAX=20_000)
+    service.project_size = lambda project_id: 3
+
+    results = service.search_many("p", [[0.1], [0.2], [0.3]], k=2)
+    assert [[r.content for r in hits] for hits in results] == [["a", "c"], [], ["b"]]
+    assert db.execute.call_count == 1
+    assert db.execute.call_args[0][1]["vecs"] == ["[0.1]", "[0.2]", "[0.3]"]
+
+
+def test_iterative_scan_needs_pgvector_0_8():
+    assert supports_iterative_scan("0.8.0") and supports_iterative_scan("0.10.1")
+    assert not supports_iterative_scan("0.7.4")
+    assert not supports_iterative_scan(None) and not supports_iterative_scan("dev")
+
+
+def test_old_pgvector_only_sets_ef_search():
+    db = MagicMock()
+    db.execute.return_value.scalar.side_effect = [1_000_000, "0.7.4"]
+    service = ChunkRetrievalService(db)
+    service.settings = MagicMock(CHUNK_HNSW_EF_SEARCH=64, CHUNK_HNSW_MAX_SCAN_TUPLES=20_000)
+
+    with patch.object(retrieval_service, "_iterative_scan", None):
+        service._configure_hnsw(5, 50_000)
+    statements = [str(c.args[0]) for c in db.execute.call_args_list]
+    assert "extversion" in statements[-2]
+    assert "hnsw.ef_search" in statements[-1] and "iterative_scan" not in statements[-1]
@@ -0,0 +1,94 @@
+"""unit tests for the interned graph and the stages built on it"""
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schemas.graph import GraphData, GraphNode
+from services.graph.builder import GraphBuilder, GraphAccumulator
+from services.graph.compact import CompactGraph
+from services.graph.node_filter import filter_invalid_nodes, get_date_like_ids
+
+
+class IdentityResolver:
+    async def get_id_map(self, raw_nodes, raw_id_counts=None):
+        return {n.id: n.id for n in raw_nodes}
+
+
+def _node(node_id, out=(), inb=(), aliases=()):
+    return GraphNode(id=node_id, aliases=list(aliases), outbound_links=list(out), inbound_links=list(inb))
+
+
+def test_round_trip_unions_links_and_drops_dangling():
+    graph = GraphData(nodes=[
+        _node("a", out=["b", "missing"]),
+        _node("b", inb=["c"]),
+        _node("c", aliases=["see"]),
+    ])
+    g = CompactGraph.from_graph_data(graph)
+    out = {n.id: n for n in g.to_graph_data().nodes}
+
+    assert out["a"].outbound_links == ["b"]
+    assert sorted(out["b"].inbound_links) == ["a", "c"]
+    assert out["c"].outbound_links == ["b"]
+    assert out["c"].aliases == ["see"]
+
+
+def test_components_and_degree():
+    g = CompactGraph()
+    a, b, c, d = (g.intern(x) for x in "abcd")
+    g.add_edge(a, b)
+    g.add_edge(b, a)
+    g.add_edge(c, b)
+    assert not g.add_edge(d, d)
+
+    assert g.degree(b) == 2
+    assert sorted(map(sorted, g.components())) == [[a, b, c], [d]]
+
+
+def test_builder_merges_and_keeps_links_symmetric():
+    extracted = [
+        GraphData(nodes=[_node("limit", out=["derivative", "unknown"]), _node("derivative", inb=["limit"])]),
+        GraphData(nodes=[_node("derivative", out=["derivative"], aliases=["d/dx"])]),
+    ]
+    built = asyncio.run(GraphBuilder(resolver=IdentityResolver()).build(extracted))
+    nodes = {n.id: n for n in built.nodes}
+
+    assert list(nodes) == ["limit", "derivative"]
+    assert nodes["limit"].outbound_links == ["derivative"]
+    assert nodes["derivative"].inbound_links == ["limit"]
+    assert nodes["derivative"].outbound_links == []
+    assert nodes["derivative"].aliases == ["d/dx"]
+
+
+def test_accumulator_folds_incrementally_and_round_trips():
+    acc = GraphAccumulator()
+    acc.add(GraphData(nodes=[_node("limit", out=["derivative"], aliases=["lim"])]))
+    acc.add(None)
+    acc.add(GraphData(nodes=[_node("limit", aliases=["lim", "limits"]), _node("derivative", inb=["limit"])]))
+
+    assert acc.chunks_added == 3
+    assert acc.raw_id_counts == {"limit": 2, "derivative": 1}
+    summary = {n.id: n.aliases for n in acc.summary_nodes()}
+    assert summary == {"limit": ["lim", "limits"], "derivative": []}
+
+    restored = GraphAccumulator.from_dict(acc.to_dict())
+    built = asyncio.run(GraphBuilder(resolver=IdentityResolver()).finalize(restored)).to_graph_data()
+    nodes = {n.id: n for n in built.nodes}
+    assert nodes["limit"].outbound_links == ["derivative"]
+    assert nodes["derivative"].inbound_links == ["limit"]
+
+
+def test_filter_invalid_nodes_is_case_insensitive():
+    graph = GraphData(nodes=[
+        _node("limit", out=["November 1859"]),
+        _node("November 1859", inb=["limit"]),
+    ])
+    invalid = get_date_like_ids(graph)
+    filtered = filter_invalid_nodes(graph, {i.lower() for i in invalid})
+
+    assert [n.id for n in filtered.nodes] == ["limit"]
+    assert filtered.nodes[0].outbound_links == []
+    # input is not mutated
+    assert graph.nodes[0].outbound_links == ["November 1859"]
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.graph.concept_classifier import ConceptKNNClassifier
+from services.graph.exemplars import INVALID_EXEMPLARS, VALID_EXEMPLARS
+from services.kv_cache import LocalKVCache
+
+
+class FakeEmbedder:
+    """invalid-looking text on axis 0, concepts on axis 1, anything unknown on axis 2"""
+
+    provider, model, dimensions = "fake", "fake", 3
+
+    def __init__(self, extra_invalid=()):
+        self.invalid = set(INVALID_EXEMPLARS) | set(extra_invalid)
+        self.valid = set(VALID_EXEMPLARS) | {"gradient", "torque"}
+
+    async def aget_embeddings(self, texts):
+        vectors = []
+        for t in texts:
+            if t in self.invalid or t.startswith("appendix"):
+                vectors.append([1.0, 0.0, 0.0])
+            elif t in self.valid:
+                vectors.append([0.0, 1.0, 0.0])
+            elif t == "borderline":
+                vectors.append([1.0, 1.0, 0.0])
+            else:
+                vectors.append([0.0, 0.0, 1.0])
+        return vectors
+
+
+def test_partition_decides_clear_cases_and_defers_the_rest():
+    # k spans every exemplar so the equidistant "borderline" id gets a split vote, not a tie-break
+    knn = ConceptKNNClassifier(FakeEmbedder(), k=1000, use_cache=False, min_similarity=0.5)
+    invalid, valid, uncertain = asyncio.run(
+        knn.partition(["appendix c", "torque", "gradient", "borderline", "zeta function"])
+    )
+
+    assert invalid == {"appendix c"}
+    assert valid == {"torque", "gradient"}
+    # split neighbourhood and far-from-everything both go to the llm
+    assert uncertain == ["borderline", "zeta function"]
+
+
+def test_learned_verdicts_extend_exemplars(tmp_path):
+    cache = LocalKVCache("concept_exemplars", base_dir=str(tmp_path))
+    embedder = FakeEmbedder(extra_invalid={"lab safety rules"})
+    knn = ConceptKNNClassifier(embedder, scope="user-a", cache=cache, min_similarity=0.5)
+
+    asyncio.run(knn.learn({"Lab Safety Rules": True, "Torque": False}))
+    texts, labels = asyncio.run(knn._exemplars())
+    assert labels[texts.index("lab safety rules")] == 1
+    assert labels[texts.index("torque")] == 0
+
+    # a later opposite verdict replaces the earlier one
+    asyncio.run(knn.learn({"torque": True}))
+    assert asyncio.run(knn.learned())["torque"] == 1
+
+
+def test_learned_verdicts_stay_in_their_scope(tmp_path):
+    cache = LocalKVCache("concept_exemplars", base_dir=str(tmp_path))
+    mine = ConceptKNNClassifier(FakeEmbedder(), scope="user-a", cache=cache)
+    theirs = ConceptKNNClassifier(FakeEmbedder(), scope="user-b", cache=cache)
+    unscoped = ConceptKNNClassifier(FakeEmbedder(), cache=cache)
+
+    asyncio.run(mine.learn({"entropy": True}))
+    asyncio.run(unscoped.learn({"entropy": True}))
+
+    assert asyncio.run(mine.learned()) == {"entropy": 1}
+    assert asyncio.run(theirs.learned()) == {}
+    assert asyncio.run(unscoped.learned()) == {}
+
+
+def test_learned_list_keeps_concurrent_appends_and_trims(tmp_path):
+    cache = LocalKVCache("concept_exemplars", base_dir=str(tmp_path))
+
+    async def writers():
+        await asyncio.gather(*(
+            asyncio.to_thread(cache.append, "learned:u", [[f"concept {i}", i % 2]], 50) for i in range(40)
+        ))
+
+    asyncio.run(writers())
+    assert sorted(text for text, _ in cache.get_list("learned:u")) == sorted(f"concept {i}" for i in range(40))
+
+    cache.append("learned:u", [[f"extra {i}", 0] for i in range(20)], 50)
+    entries = cache.get_list("learned:u")
+    assert len(entries) == 50 and entries[-1] == ["extra 19", 0]
@@ -0,0 +1,63 @@
+"""unit tests for sharded concept validation and the verdict cache (llm is faked)"""
+import asyncio
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+from tenacity import wait_none
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.kv_cache import LocalKVCache
+from services.llm.concept_validator import ConceptValidator
+
+INVALID = {"november 1859", "chapter 1", "bernhard riemann"}
+
+
+def _validator(tmp_path, calls, shard_size=2, fail_first=False):
+    validator = ConceptValidator("test-key", shard_size=shard_size, cache=LocalKVCache("verdicts", str(tmp_path)))
+
+    async def fake_create(model, messages, temperature):
+        prompt = messages[0]["content"]
+        calls.append(prompt)
+        if fail_first and len(calls) == 1:
+            content = '["chapter 1", "trunc'
+        else:
+            listed = prompt.split("concept IDs: ")[1].split("\n")[0].split(", ")
+            content = json.dumps([c for c in listed if c.lower() in INVALID])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def passthrough(fn, *args, **kwargs):
+        return await fake_create(*args, **kwargs)
+
+    validator.limiter = SimpleNamespace(call=passthrough)
+    return validator
+
+
+def test_shards_are_merged_and_verdicts_cached(tmp_path):
+    calls = []
+    concepts = ["derivative", "November 1859", "limit", "chapter 1", "integral"]
+
+    validator = _validator(tmp_path, calls)
+    invalid = asyncio.run(validator.get_invalid_concepts(concepts))
+    assert invalid == {"November 1859", "chapter 1"}
+    assert len(calls) == 3
+
+    # another project: known concepts are never re-classified, normalized variants included
+    calls.clear()
+    validator = _validator(tmp_path, calls)
+    invalid = asyncio.run(validator.get_invalid_concepts(["derivatives", "Chapter 1", "bernhard riemann"]))
+    assert invalid == {"Chapter 1", "bernhard riemann"}
+    assert len(calls) == 1
+    assert "bernhard riemann" in calls[0] and "derivatives" not in calls[0]
+
+
+def test_unparseable_shard_is_retried_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConceptValidator._classify_shard.retry, "wait", wait_none())
+    calls = []
+    validator = _validator(tmp_path, calls, shard_size=10, fail_first=True)
+
+    invalid = asyncio.run(validator.get_invalid_concepts(["chapter 1", "limit"]))
+    assert invalid == {"chapter 1"}
+    assert len(calls) == 2
@@ -0,0 +1,64 @@
+"""unit tests for the adaptive llm concurrency limiter"""
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.llm.concurrency import AdaptiveLimiter, get_limiter
+
+
+class FakeThrottle(Exception):
+    def __init__(self, retry_after=None):
+        self.status_code = 429
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def test_limit_bounds_in_flight_and_grows_when_healthy():
+    limiter = AdaptiveLimiter("test", initial=2, max_limit=4)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def run():
+        return await asyncio.gather(*(limiter.call(work) for _ in range(20)))
+
+    assert sum(asyncio.run(run())) == 20
+    assert peak <= 4
+    assert limiter.limit > 2
+    assert limiter.in_flight == 0
+    assert limiter.snapshot()["peak_queue_depth"] > 0
+
+
+def test_throttle_halves_limit_and_pauses():
+    limiter = AdaptiveLimiter("test", initial=8)
+
+    async def throttled():
+        raise FakeThrottle(retry_after=0.05)
+
+    async def run():
+        try:
+            await limiter.call(throttled)
+        except FakeThrottle:
+            pass
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire()
+        limiter.release()
+        return loop.time() - start
+
+    waited = asyncio.run(run())
+    assert limiter.limit == 4
+    assert limiter.throttled == 1
+    assert waited >= 0.04
+
+
+def test_registry_is_per_provider_and_key():
+    assert get_limiter("openrouter", "key-a") is get_limiter("openrouter", "key-a")
+    assert get_limiter("openrouter", "key-a") is not get_limiter("openrouter", "key-b")
+    assert get_limiter("gemini", "key-a").limit == 10
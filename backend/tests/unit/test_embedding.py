@@ -6,7 +6,15 @@ from unittest.mock import MagicMock, patch
 # fix path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from services.embedding_service import EmbeddingService
+from services.embedding_service import CHARS_PER_TOKEN, EmbeddingService
+from services.llm import clients
+
+@pytest.fixture(autouse=True)
+def fresh_client_registry():
+    # clients are pooled per api key; each test patches its own sdk mocks
+    clients.reset()
+    yield
+    clients.reset()
 
 @pytest.fixture
 def mock_openai():
@@ -58,3 +66,111 @@ def test_get_embeddings_batch(mock_openai):
     assert len(embeddings) == 2
     assert embeddings[0] == [0.1]
     assert embeddings[1] == [0.2]
+
+def test_plan_batches_respects_item_and_token_limits():
+    from services.embedding_service import plan_batches, estimate_tokens
+
+    texts = ["a" * 30] * 7  # ~11 tokens each
+    batches = plan_batches(texts, max_items=3, max_tokens=1000)
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+    per_text = estimate_tokens(texts[0])
+    batches = plan_batches(texts, max_items=100, max_tokens=per_text * 2)
+    assert all(len(b) <= 2 for b in batches)
+    assert [i for b in batches for i in b] == list(range(7))
+
+@patch("openai.AsyncOpenAI")
+def test_aget_embeddings_batches_concurrently_in_order(mock_async_openai, mock_openai):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    calls = []
+
+    async def fake_create(input, model):
+        calls.append(list(input))
+        # later batches finish first to prove ordering is restored
+        await asyncio.sleep(0.01 * (10 - len(calls)))
+        response = MagicMock()
+        response.data = [MagicMock(embedding=[float(t.split()[-1])]) for t in input]
+        return response
+
+    mock_async_client = MagicMock()
+    mock_async_client.embeddings.create = AsyncMock(side_effect=fake_create)
+    mock_async_openai.return_value = mock_async_client
+
+    service = EmbeddingService(openai_key="test_key", max_concurrency=3, use_cache=False)
+    service.limits = {**service.limits, "max_items_per_request": 4}
+
+    texts = [f"text {i}" for i in range(10)]
+    embeddings = asyncio.run(service.aget_embeddings(texts))
+
+    assert embeddings == [[float(i)] for i in range(10)]
+    assert [len(c) for c in calls] == [4, 4, 2]
+
+def test_cache_serves_hits_and_batches_only_misses(mock_openai):
+    from services.embedding_cache import EmbeddingCache, LRUEmbeddingTier
+
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+
+    def fake_create(input, model):
+        response = MagicMock()
+        response.data = [MagicMock(embedding=[float(len(t))]) for t in input]
+        return response
+
+    mock_client.embeddings.create.side_effect = fake_create
+
+    cache = EmbeddingCache(LRUEmbeddingTier(max_entries=100))
+    service = EmbeddingService(openai_key="test_key", cache=cache)
+
+    first = service.get_embeddings(["limit", "derivative", "limit"])
+    assert first == [[5.0], [10.0], [5.0]]
+    # duplicate text in one call is embedded once
+    assert mock_client.embeddings.create.call_args.kwargs["input"] == ["limit", "derivative"]
+
+    second = service.get_embeddings(["derivative", "integral"])
+    assert second == [[10.0], [8.0]]
+    assert mock_client.embeddings.create.call_args.kwargs["input"] == ["integral"]
+    assert service.cache_stats == {"memory_hits": 1, "persistent_hits": 0, "misses": 3}
+
+    # a second service (e.g. note generation) shares the same cache
+    other = EmbeddingService(openai_key="test_key", cache=cache)
+    other.get_embedding("limit")
+    assert other.cache_stats["memory_hits"] == 1
+    assert mock_client.embeddings.create.call_count == 2
+
+def test_embedding_errors_are_wrapped_once_and_keep_their_cause(mock_openai):
+    service = EmbeddingService(openai_key="test_key")
+    service._embed_batch = MagicMock(side_effect=ValueError("rate limited"))
+
+    with pytest.raises(Exception) as excinfo:
+        service.get_embedding("an uncached text for the error path")
+
+    assert str(excinfo.value) == "failed to get batch embeddings: rate limited"
+    assert isinstance(excinfo.value.__cause__, ValueError)
+
+def test_overlong_inputs_are_truncated_with_a_warning(mock_openai, caplog):
+    service = EmbeddingService(openai_key="test_key")
+    max_chars = service.limits["max_tokens_per_input"] * CHARS_PER_TOKEN
+
+    with caplog.at_level("WARNING"):
+        cleaned = service._clean(["x" * (max_chars + 10), "short\ntext"])
+
+    assert [len(t) for t in cleaned] == [max_chars, 10] and cleaned[1] == "short text"
+    assert "truncating embedding input" in caplog.text
+
+def test_local_store_round_trips_and_drops_truncated_entries(tmp_path):
+    import numpy as np
+    from services.embedding_cache import LocalEmbeddingStore
+
+    store = LocalEmbeddingStore(base_dir=str(tmp_path))
+    good, bad = ("openai", "m", 3, "a" * 64), ("openai", "m", 3, "b" * 64)
+    store.put_many({good: np.array([0.1, 0.2, 0.3]), bad: np.array([1.0, 2.0, 3.0])})
+    assert not list(tmp_path.rglob("*.tmp"))
+
+    # a partially written file: two of the three floats
+    store._path(bad).write_bytes(store._path(bad).read_bytes()[:8])
+
+    found = store.get_many([good, bad])
+    assert set(found) == {good} and np.allclose(found[good], [0.1, 0.2, 0.3])
+    assert not store._path(bad).exists()
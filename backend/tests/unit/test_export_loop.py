@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import export_processor
+from services.export_processor import BatchClock, time_budget
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_batches_continue_until_the_expected_batch_no_longer_fits():
+    now = FakeClock()
+    clock = BatchClock(60.0, now=now)
+    assert clock.has_time_for_batch()  # first batch always runs
+
+    now.t += 10
+    clock.record(10)
+    assert clock.has_time_for_batch()  # 50s left, ~15s needed
+
+    now.t += 38
+    clock.record(10)
+    assert clock.time_left() == 12
+    assert not clock.has_time_for_batch()
+    assert clock.batches == 2
+
+
+def test_ewma_tracks_slower_batches():
+    clock = BatchClock(None)
+    clock.record(10)
+    clock.record(20)
+    assert abs(clock.ewma - 13.0) < 1e-9
+    assert clock.has_time_for_batch()  # no deadline outside lambda
+
+
+def test_budget_comes_from_lambda_remaining_time():
+    settings = export_processor.get_settings()
+    with patch.object(settings, "EXPORT_DEADLINE_MARGIN_SECONDS", 60.0), \
+            patch.object(settings, "EXPORT_TIME_BUDGET_SECONDS", 0.0):
+        assert time_budget(lambda: 900_000) == 840.0
+        assert time_budget(lambda: 30_000) == 0.0
+        assert time_budget(None) is None
+
+
+def test_failed_batch_rolls_back_before_committing():
+    processor = export_processor.ExportProcessor.__new__(export_processor.ExportProcessor)
+    processor.project_id = "p"
+    processor.note_service = MagicMock(generate_notes_batch=AsyncMock(side_effect=RuntimeError("query failed")))
+    db = MagicMock()
+    node = SimpleNamespace(concept_id="limit", outbound_links=[], content=None)
+
+    with patch.object(export_processor, "GraphSnapshotService"):
+        generated = asyncio.run(processor._process_batch(db, [node]))
+
+    assert generated == set() and node.content is None
+    calls = [c[0] for c in db.method_calls if c[0] in ("rollback", "commit")]
+    assert calls == ["rollback", "commit"]
@@ -0,0 +1,71 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.dialects import postgresql
+
+from schemas.graph import GraphData, GraphNode
+from services.graph.persistence_service import GraphPersistenceService, diff_nodes, edge_set
+
+
+def test_diff_nodes_only_touches_new_changed_and_vanished():
+    existing = {
+        "limit": ([], ["derivative"], []),
+        "derivative": ([], [], ["limit"]),
+        "old concept": ([], [], []),
+    }
+    incoming = GraphData(nodes=[
+        GraphNode(id="limit", outbound_links=["derivative"]),
+        GraphNode(id="derivative", inbound_links=["limit", "integral"]),
+        GraphNode(id="integral", outbound_links=["derivative"]),
+    ])
+
+    upserts, deletes = diff_nodes(existing, incoming)
+
+    assert [row["concept_id"] for row in upserts] == ["derivative", "integral"]
+    assert deletes == ["old concept"]
+
+
+def test_diff_nodes_ignores_link_and_alias_order():
+    existing = {
+        "limit": (["lim", "limits"], ["derivative", "continuity"], ["sequence", "function"]),
+    }
+    incoming = GraphData(nodes=[
+        GraphNode(
+            id="limit",
+            aliases=["limits", "lim"],
+            outbound_links=["continuity", "derivative"],
+            inbound_links=["function", "sequence"],
+        ),
+    ])
+
+    assert diff_nodes(existing, incoming) == ([], [])
+
+
+def test_upsert_keeps_stored_notes():
+    db = MagicMock()
+    # queries: stored nodes, stored edges, then the project (for snapshot invalidation)
+    db.query.return_value.filter.side_effect = [[("limit", [], [], [])], [], MagicMock(first=lambda: None)]
+    service = GraphPersistenceService(db)
+
+    service.save_graph("00000000-0000-0000-0000-000000000001", GraphData(nodes=[
+        GraphNode(id="limit", outbound_links=["derivative"]),
+    ]))
+
+    sql = str(db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (project_id, concept_id) DO UPDATE" in sql
+    assert "content = coalesce(excluded.content, graph_nodes.content)" in sql
+    assert service.last_stats["inserted_or_updated"] == 1
+    assert service.last_stats["unchanged"] == 0
+    db.commit.assert_called_once()
+
+
+def test_edge_set_unions_both_link_directions():
+    graph = GraphData(nodes=[
+        GraphNode(id="limit", outbound_links=["derivative", "missing"]),
+        GraphNode(id="derivative", inbound_links=["limit", "continuity"]),
+        GraphNode(id="continuity", outbound_links=["continuity"]),
+    ])
+    assert edge_set(graph) == {("limit", "derivative"), ("continuity", "derivative")}
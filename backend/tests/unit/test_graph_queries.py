@@ -0,0 +1,62 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.graph.query_service import GraphQueryService, bfs_path
+
+EDGES = [
+    ("limit", "continuity"), ("limit", "derivative"), ("derivative", "chain rule"),
+    ("continuity", "intermediate value theorem"), ("integral", "derivative"),
+]
+
+
+def expander(directed):
+    calls = []
+
+    def expand(frontier):
+        calls.append(set(frontier))
+        steps = [(s, t) for s, t in EDGES if s in frontier]
+        if not directed:
+            steps += [(t, s) for s, t in EDGES if t in frontier]
+        return steps
+
+    return expand, calls
+
+
+def test_bfs_path_undirected_and_directed():
+    expand, calls = expander(directed=False)
+    assert bfs_path("integral", "chain rule", 6, expand) == ["integral", "derivative", "chain rule"]
+    # one query per level, each only over the frontier
+    assert calls == [{"integral"}, {"derivative"}]
+
+    expand, _ = expander(directed=True)
+    assert bfs_path("chain rule", "limit", 6, expand) is None
+    assert bfs_path("limit", "chain rule", 6, expand) == ["limit", "derivative", "chain rule"]
+
+
+def test_bfs_path_respects_max_depth():
+    expand, _ = expander(directed=False)
+    assert bfs_path("integral", "intermediate value theorem", 3, expand) is None
+    assert bfs_path("integral", "intermediate value theorem", 4, expand) == [
+        "integral", "derivative", "limit", "continuity", "intermediate value theorem",
+    ]
+
+
+def neighbourhood_db(walk_rows):
+    """mock session: the walk returns at most the requested LIMIT rows; edge/alias lookups are empty"""
+    db = MagicMock()
+    db.execute.side_effect = lambda stmt, params: MagicMock(all=lambda: walk_rows[:params["limit"]])
+    db.query.return_value.filter.return_value.all.return_value = []
+    return db
+
+
+def test_neighborhood_truncation_needs_more_than_limit_nodes():
+    rows = [("limit", 0), ("continuity", 1), ("derivative", 1)]
+
+    exact = GraphQueryService(neighbourhood_db(rows)).neighborhood("p", "limit", limit=3)
+    assert not exact["truncated"] and len(exact["nodes"]) == 3
+
+    cut = GraphQueryService(neighbourhood_db(rows)).neighborhood("p", "limit", limit=2)
+    assert cut["truncated"] and [n["id"] for n in cut["nodes"]] == ["limit", "continuity"]
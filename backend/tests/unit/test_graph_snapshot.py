@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import sys
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.dialects import postgresql
+
+from db import models
+from services.graph import snapshot_service
+from services.graph.snapshot_service import GraphSnapshotService, etag_matches
+
+
+class DictStorage:
+    def __init__(self):
+        self.files = {}
+
+    def upload_file(self, content, filename):
+        self.files[filename] = content
+        return filename
+
+    def download_file(self, filename):
+        return self.files[filename]
+
+
+def node(concept_id, content=None):
+    return SimpleNamespace(
+        concept_id=concept_id, aliases=[], outbound_links=[], inbound_links=[],
+        content=content, node_metadata=None,
+    )
+
+
+def snapshot_db(nodes, generation=0, locked_generation=None, stored=None):
+    """mock session: node rows, the generation read, the locked re-read, and jsonb_set updates"""
+    stored = dict(stored or {})
+    db = MagicMock()
+    chain = db.query.return_value.filter.return_value
+    chain.all.return_value = nodes
+    chain.scalar.return_value = str(generation)
+    locked = generation if locked_generation is None else locked_generation
+    chain.with_for_update.return_value.scalar.return_value = {**stored, "graph_generation": locked}
+    statements = []
+
+    def execute(stmt):
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        statements.append(str(compiled))
+        entry = next((v for v in compiled.params.values() if isinstance(v, dict) and "etag" in v), None)
+        if entry is not None:
+            fields = next(v for k, v in compiled.params.items() if k.startswith("jsonb_build_object"))
+            stored.setdefault("graph_snapshot", {})[fields] = entry
+        else:
+            stored.pop("graph_snapshot", None)
+            stored["graph_generation"] = stored.get("graph_generation", 0) + 1
+        return MagicMock(scalar_one=lambda: dict(stored), scalar_one_or_none=lambda: dict(stored))
+
+    db.execute.side_effect = execute
+    return db, statements
+
+
+def test_build_load_and_invalidate():
+    db, statements = snapshot_db([node("limit", "# limit"), node("derivative")], stored={"export": {"progress": 40}})
+    storage = DictStorage()
+    project = models.Project(id=uuid.uuid4(), title="calc", project_metadata={})
+    service = GraphSnapshotService(db, storage=storage)
+
+    etag, payload = service.build(project)
+    body = json.loads(gzip.decompress(payload))
+    assert [n["id"] for n in body["nodes"]] == ["limit", "derivative"]
+    assert body["nodes"][0]["content"] == "# limit" and body["nodes"][1]["metadata"] == {}
+    assert project.project_metadata["graph_snapshot"]["full"]["etag"] == etag
+    # only the snapshot key is written: the export worker's progress is left alone
+    assert "jsonb_set" in statements[-1] and project.project_metadata["export"] == {"progress": 40}
+
+    # topology projection: ids and links only, tracked separately
+    topo_etag, topo = service.build(project, "topology")
+    assert json.loads(gzip.decompress(topo))["nodes"][0] == {"id": "limit", "outbound_links": [], "inbound_links": []}
+    assert topo_etag != etag and set(project.project_metadata["graph_snapshot"]) == {"full", "topology"}
+
+    # served from storage when the process cache is cold
+    snapshot_service._memory.clear()
+    assert service.load(project) == (etag, payload)
+
+    service.invalidate(project)
+    assert "graph_snapshot" not in project.project_metadata
+    assert project.project_metadata["graph_generation"] == 1
+    assert service.load(project) is None and service.load(project, "topology") is None
+
+
+def test_build_invalidated_midway_is_not_recorded():
+    # the nodes were read at generation 2; an invalidation bumped it to 3 before the record
+    db, statements = snapshot_db([node("limit")], generation=2, locked_generation=3)
+    project = models.Project(id=uuid.uuid4(), title="calc", project_metadata={})
+    service = GraphSnapshotService(db, storage=DictStorage())
+
+    etag, payload = service.build(project)
+
+    assert json.loads(gzip.decompress(payload))["nodes"][0]["id"] == "limit"
+    assert statements == [] and project.project_metadata == {}
+    db.query.return_value.filter.return_value.with_for_update.assert_called_once()
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schemas.graph import GraphData
+from services import ingestion_processor
+from services.ingestion_processor import IngestionProcessor
+
+
+class FakeExtractor:
+    def __init__(self, **kwargs):
+        self.limiter = MagicMock()
+        self.cache_stats = {"hits": 0, "misses": 0}
+
+    async def extract_from_chunk(self, text, seed_list=None):
+        await asyncio.sleep(0)
+        return GraphData(nodes=[])
+
+
+def test_extraction_progress_is_throttled_and_off_the_event_loop():
+    processor = IngestionProcessor.__new__(IngestionProcessor)
+    processor.job_id = "job"
+    processor.jobs = MagicMock()
+    writer_threads = []
+    processor.jobs.update_progress.side_effect = lambda *a, **kw: writer_threads.append(threading.get_ident())
+    chunks = [SimpleNamespace(page_content=f"chunk {i}") for i in range(20)]
+    settings = ingestion_processor.get_settings()
+
+    with patch.object(ingestion_processor, "ChunkExtractor", FakeExtractor), \
+            patch.object(ingestion_processor, "create_extraction_chunks", return_value=chunks), \
+            patch.object(settings, "INGESTION_PROGRESS_INTERVAL_SECONDS", 3600.0):
+        accumulator = asyncio.run(processor._run_graph_extraction("plain text"))
+
+    assert accumulator.chunks_added == 20
+    # first chunk and the final one; everything in between falls inside the interval
+    progress = [c.args[2] for c in processor.jobs.update_progress.call_args_list]
+    assert progress == [42, 80]
+    assert threading.get_ident() not in writer_threads
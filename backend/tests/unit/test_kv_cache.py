@@ -0,0 +1,68 @@
+"""unit tests for the llm result cache (local backend) and chunk extraction caching"""
+import asyncio
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.kv_cache import LocalKVCache, RedisKVCache, content_key
+from services.llm.chunk_extractor import ChunkExtractor
+
+
+def test_local_kv_cache_round_trip(tmp_path):
+    cache = LocalKVCache("test", base_dir=str(tmp_path))
+    key = content_key("chunk", ["seed"], "model", "v1")
+
+    assert cache.get(key) is None
+    cache.set(key, {"nodes": []})
+    assert cache.get(key) == {"nodes": []}
+    assert cache.get_many([key, content_key("other")]) == {key: {"nodes": []}}
+
+
+def test_redis_set_many_is_one_pipelined_call():
+    cache = RedisKVCache.__new__(RedisKVCache)
+    cache.redis, cache.namespace, cache.ttl = MagicMock(), "test", 60
+    pipe = cache.redis.pipeline.return_value
+
+    cache.set_many({"a": 1, "b": [2]})
+    cache.set_many({})
+
+    cache.redis.pipeline.assert_called_once()
+    assert [c.args for c in pipe.set.call_args_list] == [("cache:test:a", "1"), ("cache:test:b", "[2]")]
+    assert all(c.kwargs == {"ex": 60} for c in pipe.set.call_args_list)
+    pipe.exec.assert_called_once()
+    cache.redis.set.assert_not_called()
+
+
+def test_content_key_depends_on_every_part():
+    base = content_key("chunk", ["a", "b"], "model", "v1")
+    assert base == content_key("chunk", ["a", "b"], "model", "v1")
+    assert base != content_key("chunk", ["b", "a"], "model", "v1")
+    assert base != content_key("chunk", ["a", "b"], "model", "v2")
+
+
+def test_chunk_extractor_caches_successes_only(tmp_path):
+    extractor = ChunkExtractor("test-key", cache=LocalKVCache("chunks", base_dir=str(tmp_path)))
+    responses = ['not json', '{"nodes": [{"id": "limit"}]}']
+    calls = []
+
+    async def fake_call(prompt):
+        calls.append(prompt)
+        return responses[len(calls) - 1]
+
+    extractor._call_openrouter = fake_call
+
+    async def run():
+        first = await extractor.extract_from_chunk("limits and continuity", seed_list=["limit"])
+        second = await extractor.extract_from_chunk("limits and continuity", seed_list=["limit"])
+        third = await extractor.extract_from_chunk("limits and continuity", seed_list=["limit"])
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    # unparseable response is not cached; the next call hits the model, the third hits the cache
+    assert first.nodes == []
+    assert [n.id for n in second.nodes] == ["limit"]
+    assert [n.id for n in third.nodes] == ["limit"]
+    assert len(calls) == 2
+    assert extractor.cache_stats == {"hits": 1, "misses": 2}
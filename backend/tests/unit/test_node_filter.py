@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.graph.node_filter import RuleEngine
+
+
+def test_rules_catch_common_noise():
+    engine = RuleEngine()
+    expected = {
+        "November 1859": "date_month_year",
+        "march 3, 2004": "date_month_day_year",
+        "2019-09-01": "date_iso",
+        "1990s": "decade",
+        "iv.": "roman_heading",
+        "(xii)": "roman_heading",
+        "Chapter 12": "structural_reference",
+        "section 2.3": "structural_reference",
+        "pp. 45-47": "page_reference",
+        "exercises 4": "document_part",
+        "solutions 3.2": "document_part",
+        "homework 2": "document_part",
+        "table of contents": "front_matter",
+        "chapter ii": "structural_reference",
+        "second edition": "document_metadata",
+        "3rd edition": "document_metadata",
+        "isbn 978-0-13-110362-7": "document_metadata",
+        "copyright © 2004 pearson": "document_metadata",
+        "copyright 2019": "document_metadata",
+        "(3.2)": "notation",
+        "[12]": "notation",
+        "d. r. wilkins": "person_initials",
+        "carl friedrich gauss": "person_name",
+    }
+    for concept_id, rule in expected.items():
+        assert engine.classify(concept_id) == rule, concept_id
+
+
+def test_real_concepts_stay_ambiguous():
+    engine = RuleEngine()
+    for concept_id in [
+        "derivative", "riemann integral", "cramer's rule", "gauss–jordan elimination",
+        "line in r 2", "taylor series", "john theorem", "secant (trigonometry)",
+    ]:
+        assert engine.classify(concept_id) is None, concept_id
+
+
+def test_words_that_double_as_concepts_are_not_dropped():
+    engine = RuleEngine()
+    for concept_id in [
+        # document words without a number or label
+        "solution", "index", "review", "answer", "example",
+        # acronyms that parse as two-letter roman numerals
+        "ml", "dl", "ci", "xi", "mv", "cc",
+        # complexity and math notation
+        "o(n)", "o(n log n)", "π", "f(x)", "∞",
+    ]:
+        assert engine.classify(concept_id) is None, concept_id
+
+
+def test_metadata_words_that_are_concepts_survive():
+    engine = RuleEngine()
+    for concept_id in ["transcription", "draft", "copyright law", "copyright infringement", "edition"]:
+        assert engine.classify(concept_id) is None, concept_id
+
+
+def test_bare_numerals_and_numbers_go_to_the_llm():
+    engine = RuleEngine()
+    # well-formed numerals that are also acronyms / words, and numbers that are concepts
+    ids = ["xii", "mix", "cli", "div", "dvi", "mcm", "dcc", "dci", "mmc", "1024", "2048", "1969"]
+    invalid, ambiguous = engine.partition(ids + ["chapter iv", "part xii"])
+    assert invalid == {"chapter iv": "structural_reference", "part xii": "structural_reference"}
+    assert ambiguous == ids
+    assert engine.classify("2048") == "year" and engine.classify("1024") == "number"
+    # malformed numerals are not numerals at all
+    assert engine.classify("chapter iiii") is None
+
+
+def test_name_heuristic_hits_go_to_the_llm():
+    engine = RuleEngine()
+    names = ["otto cycle", "gabriel graph", "julia programming language", "galileo transformation"]
+    invalid, ambiguous = engine.partition(names + ["carl friedrich gauss"])
+    assert invalid == {}
+    assert ambiguous == names + ["carl friedrich gauss"]
+
+
+def test_partition_with_deny_and_allow_lists():
+    engine = RuleEngine(deny=["Worked Solutions"], allow=["Example"])
+    invalid, ambiguous = engine.partition(["limit", "worked solutions", "example", "chapter 2"])
+
+    assert invalid == {"worked solutions": "deny", "chapter 2": "structural_reference"}
+    # allow-listed ids are kept without asking the llm
+    assert ambiguous == ["limit"]
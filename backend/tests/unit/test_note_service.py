@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.llm import note_service
+from services.llm.note_service import NodeNoteService
+
+
+def test_batch_shares_one_embedding_call_query_and_valid_id_load():
+    service = NodeNoteService.__new__(NodeNoteService)
+    service.embedder = MagicMock(aget_embeddings=AsyncMock(return_value=[[1.0], [2.0]]))
+    service.prompts = MagicMock(render=lambda template, **kw: kw["context_chunks"])
+    service._generate_content_with_retry = AsyncMock(
+        side_effect=lambda prompt, config: SimpleNamespace(text=f"see [[limit]] and [[ghost]]. {prompt}")
+    )
+
+    retrieval = MagicMock()
+    retrieval.search_many.return_value = [[SimpleNamespace(content="chunk one")], []]
+    no_provenance = MagicMock(contexts=MagicMock(return_value={}))
+    with patch.object(note_service, "ChunkRetrievalService", return_value=retrieval), \
+            patch.object(note_service, "ConceptProvenanceService", return_value=no_provenance), \
+            patch.object(note_service, "load_valid_ids", return_value={"limit", "derivative"}) as load:
+        notes = asyncio.run(service.generate_notes_batch(
+            MagicMock(), "p", [("derivative", ["limit"]), ("limit", None)]
+        ))
+
+    service.embedder.aget_embeddings.assert_awaited_once_with(["derivative", "limit"])
+    retrieval.search_many.assert_called_once()
+    load.assert_called_once()
+    assert set(notes) == {"derivative", "limit"}
+    assert "chunk one" in notes["derivative"] and "[[ghost]]" not in notes["derivative"]
+    assert "no specific course context found." in notes["limit"]
+
+
+def test_recorded_provenance_skips_embedding_and_vector_search():
+    service = NodeNoteService.__new__(NodeNoteService)
+    service.embedder = MagicMock(aget_embeddings=AsyncMock(return_value=[[2.0]]))
+    retrieval = MagicMock()
+    retrieval.search_many.return_value = [[SimpleNamespace(content="searched")]]
+    provenance = MagicMock(contexts=MagicMock(return_value={"derivative": ["recorded one", "recorded two"]}))
+
+    with patch.object(note_service, "ChunkRetrievalService", return_value=retrieval), \
+            patch.object(note_service, "ConceptProvenanceService", return_value=provenance):
+        contexts = asyncio.run(service._get_contexts(MagicMock(), "p", ["derivative", "limit"]))
+
+    assert contexts == {"derivative": "recorded one\n\nrecorded two", "limit": "searched"}
+    service.embedder.aget_embeddings.assert_awaited_once_with(["limit"])
+
+
+def test_failed_retrieval_query_rolls_back_its_savepoint():
+    service = NodeNoteService.__new__(NodeNoteService)
+    service.embedder = MagicMock(aget_embeddings=AsyncMock(return_value=[[1.0]]))
+    service.prompts = MagicMock(render=lambda template, **kw: kw["context_chunks"])
+    service._generate_content_with_retry = AsyncMock(
+        side_effect=lambda prompt, config: SimpleNamespace(text=f"note: {prompt}")
+    )
+    retrieval = MagicMock()
+    retrieval.search_many.side_effect = RuntimeError("current transaction is aborted")
+    provenance = MagicMock(contexts=MagicMock(return_value={}))
+    savepoint = MagicMock()
+    db = MagicMock()
+    db.begin_nested.return_value = savepoint
+
+    with patch.object(note_service, "ChunkRetrievalService", return_value=retrieval), \
+            patch.object(note_service, "ConceptProvenanceService", return_value=provenance), \
+            patch.object(note_service, "load_valid_ids", return_value={"limit"}):
+        notes = asyncio.run(service.generate_notes_batch(db, "p", [("limit", None)]))
+
+    # the query ran inside a savepoint whose context manager saw the error (and rolled it back)
+    exits = [c.args for c in savepoint.__exit__.call_args_list]
+    assert any(args[0] is RuntimeError for args in exits)
+    assert notes == {"limit": "note:"}
@@ -0,0 +1,77 @@
+"""unit tests for batched orphan link completion (llm and embeddings are faked)"""
+import asyncio
+import json
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.graph.compact import CompactGraph
+from services.llm.orphan_link_service import OrphanLinkService
+
+
+class FakeEmbedder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    async def aget_embeddings(self, texts):
+        return [self.vectors[t] for t in texts]
+
+
+def _graph():
+    g = CompactGraph()
+    for node_id in ["limit", "derivative", "integral", "matrix", "vector", "chain rule", "eigenvalue"]:
+        g.intern(node_id)
+    g.add_edge(g.index["limit"], g.index["derivative"])
+    g.add_edge(g.index["derivative"], g.index["integral"])
+    g.add_edge(g.index["matrix"], g.index["vector"])
+    return g
+
+
+def test_orphans_are_batched_with_top_k_candidates():
+    rng = np.random.default_rng(0)
+    calculus, algebra = rng.standard_normal(16), rng.standard_normal(16)
+    vectors = {
+        "limit": calculus, "derivative": calculus + 0.1, "integral": calculus - 0.1, "chain rule": calculus + 0.05,
+        "matrix": algebra, "vector": algebra + 0.1, "eigenvalue": algebra - 0.05,
+    }
+    service = OrphanLinkService("test-key", embedder=FakeEmbedder(vectors), batch_size=5, candidates_k=2)
+    prompts = []
+
+    async def fake_batch(items, shared_candidates):
+        prompts.append((items, shared_candidates))
+        return service._parse_batch(json.dumps({
+            "Chain Rule": {"outbound": [], "inbound": ["derivative", "unknown"]},
+            "eigenvalue": {"outbound": ["matrix"], "inbound": []},
+        }))
+
+    service._suggest_links_batch = fake_batch
+    graph = asyncio.run(service.fix_degree_zero_compact(_graph()))
+
+    # both orphans share one request, each with its own nearest candidates
+    assert len(prompts) == 1
+    items, shared = prompts[0]
+    assert shared is None
+    candidates = {i["concept_id"]: i["candidates"] for i in items}
+    assert set(candidates["chain rule"]) <= {"limit", "derivative", "integral"}
+    assert set(candidates["eigenvalue"]) == {"matrix", "vector"}
+
+    assert graph.has_edge(graph.index["derivative"], graph.index["chain rule"])
+    assert graph.has_edge(graph.index["eigenvalue"], graph.index["matrix"])
+
+
+def test_without_embedder_full_list_is_sent_once_per_batch():
+    service = OrphanLinkService("test-key", batch_size=1)
+    prompts = []
+
+    async def fake_batch(items, shared_candidates):
+        prompts.append((items, shared_candidates))
+        return {}
+
+    service._suggest_links_batch = fake_batch
+    asyncio.run(service.fix_degree_zero_compact(_graph()))
+
+    assert len(prompts) == 2
+    assert all(shared == sorted(_graph().ids) for _, shared in prompts)
@@ -0,0 +1,45 @@
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2026-01-02T03:04:05+00:00", "6f1c0d8e-0000-4000-8000-000000000001")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == ["2026-01-02T03:04:05+00:00", "6f1c0d8e-0000-4000-8000-000000000001"]
+    assert decode_cursor(encode_cursor("matrix inverse"), 1) == ["matrix inverse"]
+    assert decode_cursor(None, 1) is None
+
+
+@pytest.mark.parametrize("bad", ["not-base64!", encode_cursor("only one"), encode_cursor({"a": 1})])
+def test_invalid_cursor_is_a_400(bad):
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(bad, 2)
+    assert err.value.status_code == 400
+
+
+@pytest.mark.parametrize("tampered", [
+    encode_cursor("yesterday", "6f1c0d8e-0000-4000-8000-000000000001"),
+    encode_cursor("2026-01-02T03:04:05+00:00", "not-a-uuid"),
+    encode_cursor(20260102, None),
+])
+def test_tampered_project_cursor_is_a_400(tampered):
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(tampered, 2, types=(datetime.fromisoformat, uuid.UUID))
+    assert err.value.status_code == 400
+
+
+def test_typed_cursor_converts_parts():
+    created, project_id = decode_cursor(
+        encode_cursor("2026-01-02T03:04:05+00:00", "6f1c0d8e-0000-4000-8000-000000000001"),
+        2, types=(datetime.fromisoformat, uuid.UUID),
+    )
+    assert created.year == 2026 and project_id == uuid.UUID("6f1c0d8e-0000-4000-8000-000000000001")
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schemas.graph import GraphData, GraphNode
+from services.chunking_service import RecursiveMarkdownSplitter, create_extraction_chunks, locate_chunks
+from services.graph.builder import GraphAccumulator
+from services.provenance_service import link_concepts
+
+
+def test_storage_chunks_get_source_offsets():
+    text = "# Limits\n\nA limit   describes\nbehaviour near a point. " + "Derivatives measure change. " * 60
+    chunks = locate_chunks(text, RecursiveMarkdownSplitter(chunk_size=300).split_text(text))
+
+    assert all("start" in c.metadata for c in chunks)
+    for c in chunks:
+        span = text[c.metadata["start"]:c.metadata["end"]]
+        assert " ".join(span.split()) == " ".join(c.text.split())
+    starts = [c.metadata["start"] for c in chunks]
+    assert starts == sorted(set(starts))
+
+
+def test_accumulator_tracks_sources_through_resolution():
+    acc = GraphAccumulator()
+    acc.add(GraphData(nodes=[GraphNode(id="derivatives")]), source=0)
+    acc.add(GraphData(nodes=[GraphNode(id="derivative"), GraphNode(id="limit")]), source=2)
+    restored = GraphAccumulator.from_dict(acc.to_dict())
+
+    merged = restored.canonical_sources({"derivatives": "derivative"})
+    assert merged == {"derivative": {0, 2}, "limit": {2}}
+
+
+def test_link_concepts_keeps_mentioning_chunks_in_the_source_window():
+    text = "limits are defined first. " * 20 + "the derivative of a function is a limit. " * 20
+    windows = [(c.metadata["start"], c.metadata["end"]) for c in create_extraction_chunks(text, chunk_size=600, overlap=50)]
+    chunks = [
+        {"id": f"c{i}", "start": s, "end": min(s + 300, len(text)), "content": text[s:s + 300]}
+        for i, s in enumerate(range(0, len(text), 300))
+    ]
+    rows = link_concepts(
+        {"derivative": ["differentiation"], "limit": [], "integral": []},
+        {"derivative": {1}, "limit": {0}, "integral": {0}},
+        windows,
+        chunks,
+    )
+    by_concept = {}
+    for row in rows:
+        by_concept.setdefault(row["concept_id"], []).append(row["chunk_id"])
+
+    assert "integral" not in by_concept
+    assert by_concept["limit"][:2] == ["c0", "c1"]
+    # only chunks overlapping window 1 that mention "derivative" are kept
+    start, end = windows[1]
+    expected = {c["id"] for c in chunks if c["start"] < end and c["end"] > start and "derivative" in c["content"]}
+    assert expected and set(by_concept["derivative"]) == expected
@@ -0,0 +1,179 @@
+"""unit tests for entity resolution (no api calls; embeddings are faked)"""
+import asyncio
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schemas.graph import GraphNode
+from services.graph.resolver import EntityResolver
+from services.graph.sparse_linkage import cluster_sparse
+from services.graph.lexical import normalize_concept_id, is_acronym_of, lexical_groups
+
+
+class FakeEmbedder:
+    """returns fixed vectors per id; records what was embedded"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    async def aget_embeddings(self, texts):
+        self.calls.append(list(texts))
+        return [self.vectors[t] for t in texts]
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _synonym_vectors():
+    rng = np.random.default_rng(1)
+    base = {name: rng.standard_normal(64) for name in ["limit", "derivative", "integral"]}
+    return {
+        "limit": _unit(base["limit"]),
+        "limits of functions": _unit(base["limit"] + 0.1 * rng.standard_normal(64)),
+        "derivative": _unit(base["derivative"]),
+        "differentiation": _unit(base["derivative"] + 0.1 * rng.standard_normal(64)),
+        "integral": _unit(base["integral"]),
+    }
+
+
+@pytest.mark.parametrize("method", ["agglomerative", "ann"])
+def test_id_map_merges_synonyms_to_most_frequent(method):
+    vectors = _synonym_vectors()
+    resolver = EntityResolver(embedder=FakeEmbedder(vectors), method=method)
+    raw_nodes = [GraphNode(id=i) for i in [
+        "limit", "limit", "limits of functions",
+        "differentiation", "differentiation", "derivative",
+        "integral",
+    ]]
+
+    id_map = asyncio.run(resolver.get_id_map(raw_nodes))
+
+    assert id_map["limits of functions"] == "limit"
+    assert id_map["derivative"] == "differentiation"
+    assert id_map["integral"] == "integral"
+
+
+def test_sparse_linkage_agrees_with_agglomerative():
+    rng = np.random.default_rng(7)
+    centers = rng.standard_normal((40, 128))
+    X = np.vstack([c + 0.05 * rng.standard_normal((3, 128)) for c in centers])
+    X = (X / np.linalg.norm(X, axis=1, keepdims=True)).astype(np.float32)
+
+    dense = EntityResolver(method="agglomerative").cluster(X)
+    sparse = cluster_sparse(X, 0.88, dims=64)
+
+    # same partition (labels may be permuted)
+    pairs_dense = {(a, b) for a in range(len(X)) for b in range(a) if dense[a] == dense[b]}
+    pairs_sparse = {(a, b) for a in range(len(X)) for b in range(a) if sparse[a] == sparse[b]}
+    assert pairs_dense == pairs_sparse
+    assert len(set(sparse)) == 40
+
+
+def test_unknown_method_rejected():
+    with pytest.raises(ValueError):
+        EntityResolver(method="kmeans")
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("Eigenvalues", "eigenvalue"),
+    ("the derivative", "derivative"),
+    ("chain-rule", "chain rule"),
+    ("Taylor_Series", "taylor series"),
+    ("analysis", "analysis"),
+    ("an integral", "integral"),
+    ("probabilities", "probability"),
+    ("matches", "match"),
+    ("caches", "cache"),
+    ("bases", "bases"),
+    ("sets", "sets"),
+    ("physics", "physics"),
+])
+def test_normalize_concept_id(raw, expected):
+    assert normalize_concept_id(raw) == expected
+
+
+def test_is_acronym_of():
+    assert is_acronym_of("svd", "singular value decomposition")
+    assert is_acronym_of("ftc", "fundamental theorem of calculus")
+    assert not is_acronym_of("svd", "derivative")
+    assert not is_acronym_of("limit", "linear independence matrix")
+
+
+def test_lexical_stage_embeds_only_representatives():
+    """lexical variants collapse before embedding; acronym aliases merge through the semantic stage"""
+    rng = np.random.default_rng(3)
+    svd = rng.standard_normal(64)
+    vectors = {
+        "eigenvalue": _unit(rng.standard_normal(64)),
+        "singular value decomposition": _unit(svd),
+        # acronym embeddings sit further from their expansion than the clustering threshold
+        "svd": _unit(svd + 0.6 * _unit(rng.standard_normal(64)) * np.linalg.norm(svd)),
+        "integral": _unit(rng.standard_normal(64)),
+    }
+    embedder = FakeEmbedder(vectors)
+    resolver = EntityResolver(embedder=embedder)
+    raw_nodes = [
+        GraphNode(id="eigenvalue"),
+        GraphNode(id="eigenvalue"),
+        GraphNode(id="eigenvalues"),
+        GraphNode(id="the eigenvalue"),
+        GraphNode(id="singular value decomposition", aliases=["svd"]),
+        GraphNode(id="singular value decomposition"),
+        GraphNode(id="svd"),
+        GraphNode(id="integral"),
+    ]
+
+    id_map = asyncio.run(resolver.get_id_map(raw_nodes))
+
+    assert sorted(embedder.calls[0]) == ["eigenvalue", "integral", "singular value decomposition", "svd"]
+    assert id_map["eigenvalues"] == "eigenvalue"
+    assert id_map["the eigenvalue"] == "eigenvalue"
+    assert id_map["svd"] == "singular value decomposition"
+    assert id_map["integral"] == "integral"
+    assert resolver.last_stats == {"unique_ids": 6, "lexical_removed": 2, "embedded": 4, "acronym_merges": 1}
+
+
+def test_lexical_groups_pick_most_frequent_representative():
+    raw_nodes = [GraphNode(id="vector spaces")] * 3 + [GraphNode(id="vector space")]
+    groups = lexical_groups(raw_nodes)
+    assert groups == {"vector spaces": ["vector spaces", "vector space"]}
+
+
+def test_lexical_stage_keeps_the_semantic_id_map():
+    """same fixture through the resolver with and without the lexical stage: identical id_map"""
+    rng = np.random.default_rng(11)
+    meanings = {name: rng.standard_normal(64) for name in [
+        "eigenvalue", "vector space", "base", "bases", "series", "machine learning", "ml", "integral",
+    ]}
+
+    def variant(meaning):
+        return _unit(meanings[meaning] + 0.02 * rng.standard_normal(64))
+
+    vectors = {
+        "eigenvalue": variant("eigenvalue"), "Eigenvalues": variant("eigenvalue"),
+        "the eigenvalue": variant("eigenvalue"),
+        "vector space": variant("vector space"), "vector-spaces": variant("vector space"),
+        # distinct concepts a loose plural rule would merge: base (numeral) vs bases (chemistry)
+        "base": variant("base"), "bases": variant("bases"),
+        "series": variant("series"),
+        # "ml" here means maximum likelihood: the alias hint must not force the merge
+        "machine learning": variant("machine learning"), "ml": variant("ml"),
+        "integral": variant("integral"), "integrals": variant("integral"),
+    }
+    raw_nodes = [GraphNode(id=i) for i in vectors] + [
+        GraphNode(id="eigenvalue"), GraphNode(id="vector space"), GraphNode(id="integrals"),
+        GraphNode(id="machine learning", aliases=["ml"]),
+    ]
+
+    semantic = asyncio.run(EntityResolver(embedder=FakeEmbedder(vectors), lexical=False).get_id_map(raw_nodes))
+    lexical = EntityResolver(embedder=FakeEmbedder(vectors))
+    assert asyncio.run(lexical.get_id_map(raw_nodes)) == semantic
+    assert lexical.last_stats["lexical_removed"] == 4
+    assert semantic["bases"] == "bases" and semantic["series"] == "series" and semantic["ml"] == "ml"
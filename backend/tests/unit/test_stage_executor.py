@@ -0,0 +1,65 @@
+"""unit tests for the pipelined stage executor"""
+import asyncio
+import time
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.stage_executor import StageExecutor
+
+
+def test_branches_run_concurrently_and_report_timings():
+    """both branches overlap, results are keyed by name, timings recorded per branch."""
+    timings = {}
+    started = []
+
+    async def branch(name: str, delay: float):
+        started.append(name)
+        await asyncio.sleep(delay)
+        return name.upper()
+
+    async def run():
+        executor = StageExecutor(timings)
+        return await executor.run({
+            "embed": lambda: branch("embed", 0.2),
+            "extract": lambda: branch("extract", 0.2),
+        })
+
+    wall_start = time.time()
+    results = asyncio.run(run())
+    wall = time.time() - wall_start
+
+    assert wall < 0.35  # overlapped, not 0.4s sequential
+    assert results == {"embed": "EMBED", "extract": "EXTRACT"}
+    assert set(timings) == {"embed", "extract"}
+    assert all(t >= 0.2 for t in timings.values())
+    assert sorted(started) == ["embed", "extract"]
+
+
+def test_failure_cancels_other_branches():
+    """a failing branch cancels the slow sibling and re-raises."""
+    timings = {}
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        executor = StageExecutor(timings)
+        await executor.run({"slow": slow, "failing": failing})
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(run())
+    assert cancelled == [True]
+    assert "failing" in timings
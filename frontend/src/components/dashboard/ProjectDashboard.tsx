@@ -225,7 +225,7 @@ export default function ProjectDashboard() {
       return;
     }
     setGraphLoading(true);
-    apiFetch(`${API_BASE}/project/${projectIdFromUrl}/graph`, undefined, userId)
+    apiFetch(`${API_BASE}/project/${projectIdFromUrl}/graph?fields=aliases`, undefined, userId)
       .then((res) => {
         if (!res.ok) throw new Error(`http error! status: ${res.status}`);
         return res.json();